@@ -0,0 +1,38 @@
+import zipfile
+
+from atcf import read_stormdata_atcf
+
+def make_bdeck(basin, number, times, lat=150, lon=450):
+    rows = []
+    for i, time in enumerate(times):
+        rows.append(f"{basin}, {number}, {time},   , BEST,   0, {lat + 5 * i}N,  {lon + 5 * i}W,  30, 1000, TS,"
+                    f"  34, NEQ,    0,    0,    0,    0, 1012,  200,  20,   0,   0,   L,   0,    ,   0,   0,    TEST,")
+    return "\n".join(rows) + "\n"
+
+def read_zip(tmp_path, members):
+    path = tmp_path / "bdecks.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, text in members.items():
+            zf.writestr(name, text)
+    return read_stormdata_atcf(str(path), True)
+
+def test_members_with_same_number_in_other_basins_stay_apart(tmp_path):
+    storms = read_zip(tmp_path, {
+        "bal012004.dat": make_bdeck("AL", "01", ["2004080100", "2004080106", "2004080112"]),
+        "bep012004.dat": make_bdeck("EP", "01", ["2004062000", "2004062006"], lon=1100),
+    })
+    assert [(storm["basin"], storm["id"], len(storm["positions"])) for storm in storms] == [("AL", "01", 3), ("EP", "01", 2)]
+
+def test_members_with_same_number_in_other_seasons_stay_apart(tmp_path):
+    storms = read_zip(tmp_path, {
+        "bal012004.dat": make_bdeck("AL", "01", ["2004080100", "2004080106"]),
+        "bal012005.dat": make_bdeck("AL", "01", ["2005060900", "2005060906", "2005060912"]),
+    })
+    assert [(storm["year"], len(storm["positions"])) for storm in storms] == [(2004, 2), (2005, 3)]
+
+def test_storm_running_past_new_year_stays_whole(tmp_path):
+    storms = read_zip(tmp_path, {
+        "bsh052004.dat": make_bdeck("SH", "05", ["2004123112", "2004123118", "2005010100", "2005010106"], lat=100),
+    })
+    assert len(storms) == 1
+    assert len(storms[0]["positions"]) == 4
@@ -0,0 +1,16 @@
+import pytest
+
+pytest.importorskip("cartopy")
+
+from cone import get_cone_radii
+
+TABLE = {"basins": {"ALL": {"leads": [0, 24, 48], "radii_nmi": [20, 60, 120]}}}
+STORM = {"basin": "AL", "year": 2005, "positions": [{"month": 8, "day": 1, "hour": hour} for hour in (0, 6, 12)]}
+
+@pytest.mark.parametrize("table", [None, TABLE])
+def test_cone_radii_of_no_positions_is_empty(table):
+    assert len(get_cone_radii(STORM, 3, None, table)) == 0
+
+@pytest.mark.parametrize("table", [None, TABLE])
+def test_cone_radii_to_the_end(table):
+    assert len(get_cone_radii(STORM, 1, None, table)) == 2
@@ -0,0 +1,30 @@
+import argparse
+
+import pytest
+from PIL import Image
+
+from api import Renderer
+from track import get_view, get_map_layout, get_fixed_layout
+
+STORM = {"id": 1, "name": "TEST", "year": 2000, "positions": [
+    {"lat": 15.0 + i * 0.8, "lon": -40.0 - i * 1.3, "wind": 35 + 5 * i, "pres": 1000 - 3 * i,
+     "type": "TROPICAL", "month": 8, "day": 1 + i // 4, "hour": i % 4 * 6}
+    for i in range(12)]}
+
+def get_expected_size(options):
+    args = argparse.Namespace(**options)
+    for key, value in get_view([STORM], None, None, None, None).items():
+        setattr(args, key, value)
+    width, height, lon_span = get_map_layout(args)
+    map_w, map_h, style_width = get_fixed_layout(args, width, height, lon_span)
+    return map_w, map_h
+
+@pytest.mark.parametrize("res", [201, 333, 457, 1001, 1999])
+def test_fixed_layout_is_exactly_res_wide(tmp_path, res):
+    renderer = Renderer(bg=str(tmp_path / "missing.png"), layout="fixed", res=res)
+    output = renderer.render([STORM], str(tmp_path / "map.png"))
+
+    map_w, map_h = get_expected_size(renderer.options)
+    assert map_w == res
+    with Image.open(output) as img:
+        assert img.size == (map_w, map_h)
@@ -0,0 +1,20 @@
+import os
+
+import pngio
+from api import Renderer
+from test_layout import STORM
+
+def test_failed_write_leaves_no_files(tmp_path, monkeypatch):
+    def fail(self, rows):
+        raise OSError("disk full")
+    monkeypatch.setattr(pngio.PNGWriter, "write_rows", fail)
+    renderer = Renderer(bg=str(tmp_path / "missing.png"), backend="numpy", res=300)
+    renderer.render([STORM], str(tmp_path / "map.png"))
+    assert os.listdir(tmp_path) == []
+
+def test_palette_encoding_writes_indexed_png(tmp_path):
+    from PIL import Image
+    renderer = Renderer(bg=str(tmp_path / "missing.png"), backend="numpy", res=300, encoding="palette")
+    with Image.open(renderer.render([STORM], str(tmp_path / "map.png"))) as img:
+        assert img.mode == "P"
+        assert img.width == 300
@@ -0,0 +1,15 @@
+import pytest
+
+from server import query_to_argv
+from track import build_parser
+
+def test_query_to_argv_maps_fields_to_flags():
+    argv = query_to_argv("year=2005&name=Katrina&show_names=1&dedupe=0", build_parser())
+    assert build_parser().parse_args(argv).show_names
+    assert argv[:4] == ["--year", "2005", "--name", "Katrina"]
+    assert "--dedupe" not in argv
+
+@pytest.mark.parametrize("query", ["output=/etc/passwd", "nosuchoption=1"])
+def test_query_to_argv_rejects_unsupported_fields(query):
+    with pytest.raises(ValueError):
+        query_to_argv(query, build_parser())
@@ -0,0 +1,175 @@
+import copy
+from datetime import date
+
+import numpy as np
+
+from track import build_parser, read_storms, filter_storms, compute_view, generate_track_map
+from climatology import get_fix_hours
+
+KM_PER_DEGREE = 111.2
+
+def get_day_of_year(pos):
+    try:
+        return date(2001, pos["month"], pos["day"]).timetuple().tm_yday
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def get_track_hours(storm):
+    """Returns the storm's fix hours, or None when its fixes carry no usable dates."""
+    try:
+        return get_fix_hours(storm)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def resample_track(hours, lats, lons, start_hour, duration, points):
+    """Interpolates a track at points evenly spaced times from start_hour to start_hour + duration."""
+    times = start_hour + np.linspace(0, duration, points)
+    return np.interp(times, hours, lats), np.interp(times, hours, lons)
+
+def batch_track_distance(query, candidates, metric="dtw"):
+    """Returns the DTW or discrete Fréchet distance between query and every candidate.
+
+    query is a (points, 2) array and candidates a (count, points, 2) array,
+    both in km. The dynamic program runs cell by cell over the point grid,
+    but each step covers all candidates at once.
+    """
+    cost = np.linalg.norm(candidates[:, :, None, :] - query[None, None, :, :], axis=-1)
+    combine = np.add if metric == "dtw" else np.maximum
+    n, m = cost.shape[1], cost.shape[2]
+    acc = np.full((cost.shape[0], n + 1, m + 1), np.inf)
+    acc[:, 0, 0] = 0
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            best = np.minimum(np.minimum(acc[:, i - 1, j], acc[:, i, j - 1]), acc[:, i - 1, j - 1])
+            acc[:, i, j] = combine(cost[:, i - 1, j - 1], best)
+    distance = acc[:, n, m]
+    return distance / (n + m) if metric == "dtw" else distance
+
+class AnalogIndex:
+    """Per-storm bounding boxes, seasons and fix times of an archive, built once for repeated searches.
+
+    A search first keeps storms whose bounding box (plus a margin) holds
+    the query's first fix and whose season overlaps the query's day of
+    year, then ranks the survivors by trajectory distance over the same
+    time span starting from their fix nearest the query.
+    """
+
+    def __init__(self, storms):
+        # storms without fix times cannot be compared over a time span
+        self.storms, self.hours, self.skipped = [], [], 0
+        for storm in storms:
+            hours = get_track_hours(storm) if storm["positions"] else None
+            if hours is None:
+                self.skipped += bool(storm["positions"])
+                continue
+            self.storms.append(storm)
+            self.hours.append(hours)
+        self.lats = [np.array([pos["lat"] for pos in storm["positions"]], dtype=float) for storm in self.storms]
+        # unwrapped so tracks crossing the dateline get a tight box
+        self.lons = [np.degrees(np.unwrap(np.radians([pos["lon"] for pos in storm["positions"]])))
+                     for storm in self.storms]
+        self.bounds = np.array([[lats.min(), lats.max(), lons.min(), lons.max()]
+                                for lats, lons in zip(self.lats, self.lons)]).reshape(-1, 4)
+        doys = [(get_day_of_year(storm["positions"][0]), get_day_of_year(storm["positions"][-1]))
+                for storm in self.storms]
+        self.doy_start = np.array([np.nan if start is None else start for start, end in doys])
+        self.doy_span = np.array([np.nan if start is None or end is None else (end - start) % 365
+                                  for start, end in doys])
+
+    def prune(self, lat, lon, doy, margin, window):
+        """Returns the indices of storms that pass near (lat, lon) around day of year doy."""
+        lat_ok = (self.bounds[:, 0] - margin <= lat) & (lat <= self.bounds[:, 1] + margin)
+        lon_ok = np.zeros(len(self.storms), dtype=bool)
+        for shift in (-360, 0, 360):
+            lon_ok |= (self.bounds[:, 2] - margin <= lon + shift) & (lon + shift <= self.bounds[:, 3] + margin)
+        keep = lat_ok & lon_ok
+        if doy is not None and window is not None:
+            after_start = (doy - self.doy_start) % 365
+            before_start = (self.doy_start - doy) % 365
+            in_season = (after_start <= self.doy_span + window) | (before_start <= window)
+            keep &= in_season | np.isnan(self.doy_start)
+        return np.nonzero(keep)[0]
+
+    def search(self, query, top=10, margin=5.0, window=30, metric="dtw", points=24):
+        """Returns up to top (distance in km, storm, first fix index) tuples, closest first."""
+        q_lats = np.array([pos["lat"] for pos in query["positions"]], dtype=float)
+        q_lons = np.degrees(np.unwrap(np.radians([pos["lon"] for pos in query["positions"]])))
+        q_hours = get_fix_hours(query)
+        duration = max(q_hours[-1], 6.0)
+
+        candidates, starts, tracks = [], [], []
+        for index in self.prune(q_lats[0], q_lons[0], get_day_of_year(query["positions"][0]), margin, window):
+            storm = self.storms[index]
+            if storm is query or (storm.get("year"), storm["id"], storm["name"]) == (query.get("year"), query["id"], query["name"]):
+                continue
+            lats, lons = self.lats[index], self.lons[index]
+            lons = lons + np.round((q_lons[0] - lons.mean()) / 360) * 360
+            dist = np.hypot(lats - q_lats[0], (lons - q_lons[0]) * np.cos(np.radians(q_lats[0])))
+            start = int(np.argmin(dist))
+            if dist[start] > margin:
+                continue
+            candidates.append(storm)
+            starts.append(start)
+            tracks.append(resample_track(self.hours[index], lats, lons, self.hours[index][start], duration, points))
+
+        if not candidates:
+            return []
+
+        cos_lat = np.cos(np.radians(q_lats[0]))
+        to_km = lambda lats, lons: np.stack([lons * cos_lat, lats], axis=-1) * KM_PER_DEGREE
+        query_track = to_km(*resample_track(q_hours, q_lats, q_lons, 0.0, duration, points))
+        tracks = np.array([to_km(lats, lons) for lats, lons in tracks])
+        distances = batch_track_distance(query_track, tracks, metric)
+
+        order = np.argsort(distances)[:top]
+        return [(float(distances[i]), candidates[i], starts[i]) for i in order]
+
+def main():
+    parser = build_parser()
+    parser.description = "Find historical analogs of a storm in a track archive"
+    parser.add_argument("--top", type=int, default=10, help="Number of analogs to return")
+    parser.add_argument("--margin", type=float, default=5.0, help="Maximum distance in degrees between the analog and the query's first fix")
+    parser.add_argument("--window", type=int, default=30, help="Days of year either side of the query's start to search within")
+    parser.add_argument("--metric", type=str, default="dtw", choices=["dtw", "frechet"], help="Trajectory distance used to rank analogs")
+    parser.add_argument("--hours", type=float, help="Only match the query's first HOURS of track")
+    args = parser.parse_args()
+
+    if not args.input:
+        print("Please specify --input.")
+        return
+
+    archive = read_storms(args)
+    queries = filter_storms(archive, args)
+    if not queries:
+        print("No system found with the specified parameters. Check the filters.")
+        return
+    query = queries[0]
+    if len(queries) > 1:
+        print(f"{len(queries)} storms match; using {query['name']} {query.get('year', '')}.")
+
+    hours = get_track_hours(query)
+    if hours is None:
+        print(f"{query['name']} has no fix times to match analogs against.")
+        return
+    if args.hours is not None:
+        query = dict(query, positions=[pos for pos, hour in zip(query["positions"], hours) if hour <= args.hours])
+
+    index = AnalogIndex(archive)
+    if index.skipped:
+        print(f"Skipped {index.skipped} storm(s) without fix times.")
+    analogs = index.search(query, args.top, args.margin, args.window, args.metric)
+    if not analogs:
+        print("No analogs found; try a larger --margin or --window.")
+        return
+
+    for rank, (distance, storm, start) in enumerate(analogs, start=1):
+        pos = storm["positions"][start]
+        print(f"{rank:2d}. {storm['name']} {storm.get('year', '')} (from {pos.get('month', 0):02d}/{pos.get('day', 0):02d}): {distance:.0f} km")
+
+    map_storms = [query] + [storm for distance, storm, start in analogs]
+    map_args = copy.copy(args)
+    compute_view(map_storms, map_args)
+    generate_track_map(map_storms, map_args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import os
+import shutil
+import subprocess
+import tempfile
+from datetime import datetime
+from multiprocessing import Pool
+
+import numpy as np
+import matplotlib.pyplot as plt
+import matplotlib.image as mpimg
+from matplotlib.collections import LineCollection
+
+from track import (setup_map_figure, adjust_positions, get_point_color, get_marker_style,
+                   calculate_line_width, calculate_dot_area, draw_storm_name)
+
+MARKERS = ['o', 's', '^']
+
+def get_fix_time(storm, pos, index):
+    """Returns the time of a fix in hours, falling back to its index for undated formats."""
+    try:
+        when = datetime(pos.get("year", storm.get("year", 0)), pos["month"], pos["day"], pos["hour"])
+    except (KeyError, ValueError):
+        return float(index)
+    return when.timestamp() / 3600.0
+
+def build_timeline(storms, args, center_lon_view, line_width, dot_area):
+    """Flattens every storm into time-sorted segment, dot and label arrays."""
+    seg_times, segments = [], []
+    dots = {marker: {"times": [], "offsets": [], "colors": [], "sizes": []} for marker in MARKERS}
+    labels = []
+
+    for storm in storms:
+        adjusted_positions = adjust_positions(storm, args, center_lon_view)
+        if not adjusted_positions: continue
+
+        times = [get_fix_time(storm, pos, i) for i, pos in enumerate(adjusted_positions)]
+        labels.append((times[0], storm, adjusted_positions[0]))
+
+        for i in range(1, len(adjusted_positions)):
+            prev, pos = adjusted_positions[i - 1], adjusted_positions[i]
+            segments.append(((prev["lon"], prev["lat"]), (pos["lon"], pos["lat"])))
+            seg_times.append(times[i])
+
+        for t, pos in zip(times, adjusted_positions):
+            marker, size = get_marker_style(pos, dot_area)
+            r, g, b = get_point_color(pos, args)
+            dots[marker]["times"].append(t)
+            dots[marker]["offsets"].append((pos["lon"], pos["lat"]))
+            dots[marker]["colors"].append((r, g, b, args.alpha))
+            dots[marker]["sizes"].append(size)
+
+    order = np.argsort(seg_times, kind="stable")
+    timeline = {
+        "seg_times": np.asarray(seg_times, dtype=float)[order],
+        "segments": np.asarray(segments, dtype=float).reshape(-1, 2, 2)[order],
+        "dots": {},
+        "labels": sorted(labels, key=lambda label: label[0]),
+    }
+    for marker, group in dots.items():
+        order = np.argsort(group["times"], kind="stable")
+        timeline["dots"][marker] = {
+            "times": np.asarray(group["times"], dtype=float)[order],
+            "offsets": np.asarray(group["offsets"], dtype=float).reshape(-1, 2)[order],
+            "colors": np.asarray(group["colors"], dtype=float).reshape(-1, 4)[order],
+            "sizes": np.asarray(group["sizes"], dtype=float)[order],
+        }
+
+    all_times = np.concatenate([timeline["seg_times"]] + [g["times"] for g in timeline["dots"].values()])
+    timeline["frame_times"] = np.unique(all_times)
+    return timeline
+
+def count_frames(storms, args):
+    center_lon_view = (args.view_lon_min + args.view_lon_max) / 2
+    timeline = build_timeline(storms, args, center_lon_view, 1, 1)
+    return len(timeline["frame_times"])
+
+def iter_frames(storms, args, start=0, stop=None):
+    """Yields (index, RGBA array) for frames in [start, stop).
+
+    The background and legend are drawn once and saved; each frame restores
+    them and redraws only the track collections, which grow by slicing the
+    time-sorted arrays rather than adding new artists.
+    """
+    fig, ax, width, lon_span = setup_map_figure(args)
+    center_lon_view = (args.view_lon_min + args.view_lon_max) / 2
+    line_width = calculate_line_width(args.lines, width, lon_span)
+    dot_area = calculate_dot_area(args.dots, width, lon_span)
+    timeline = build_timeline(storms, args, center_lon_view, line_width, dot_area)
+
+    lines = LineCollection([], colors=[(1, 1, 1, args.alpha)], linewidths=line_width,
+                           capstyle='round', joinstyle='round', zorder=10, animated=True)
+    ax.add_collection(lines, autolim=False)
+
+    scatters = {}
+    for marker in MARKERS:
+        scatters[marker] = ax.scatter([], [], marker=marker, zorder=20, edgecolor='none',
+                                      linewidths=0, animated=True)
+
+    names = []
+    if hasattr(args, 'show_names') and args.show_names:
+        for t, storm, label_pos in timeline["labels"]:
+            names.append((t, draw_storm_name(ax, storm, label_pos, args.ymin, args.ymax, animated=True)))
+
+    canvas = fig.canvas
+    canvas.draw()
+    background = canvas.copy_from_bbox(fig.bbox)
+
+    bbox = ax.get_window_extent()
+    height = int(round(fig.bbox.height))
+    rows = slice(height - int(round(bbox.y1)), height - int(round(bbox.y0)))
+    cols = slice(int(round(bbox.x0)), int(round(bbox.x1)))
+
+    frame_times = timeline["frame_times"]
+    if stop is None:
+        stop = len(frame_times)
+
+    for index in range(start, stop):
+        t = frame_times[index]
+        canvas.restore_region(background)
+
+        n = np.searchsorted(timeline["seg_times"], t, side="right")
+        lines.set_segments(timeline["segments"][:n])
+        ax.draw_artist(lines)
+
+        for marker, scatter in scatters.items():
+            group = timeline["dots"][marker]
+            n = np.searchsorted(group["times"], t, side="right")
+            if n == 0: continue
+            scatter.set_offsets(group["offsets"][:n])
+            scatter.set_facecolors(group["colors"][:n])
+            scatter.set_sizes(group["sizes"][:n])
+            ax.draw_artist(scatter)
+
+        for label_time, label in names:
+            if label_time > t: break
+            ax.draw_artist(label)
+
+        yield index, np.asarray(canvas.buffer_rgba())[rows, cols].copy()
+
+    plt.close(fig)
+
+def get_frame_path(output, index):
+    base, ext = os.path.splitext(output)
+    return f"{base}_{index:04d}{ext or '.png'}"
+
+def render_frame_range(job):
+    storms, args, start, stop, output = job
+    for index, frame in iter_frames(storms, args, start, stop):
+        mpimg.imsave(get_frame_path(output, index), frame, pil_kwargs={"compress_level": 1})
+
+def read_frame(path):
+    from PIL import Image
+    with Image.open(path) as image:
+        return np.asarray(image.convert("RGBA"))
+
+def write_gif(frames, output, fps):
+    from PIL import Image
+    images = (Image.fromarray(frame).convert("RGB").quantize(method=Image.Quantize.FASTOCTREE) for frame in frames)
+    first = next(images)
+    first.save(output, save_all=True, append_images=images, duration=int(1000 / fps), loop=0)
+
+def write_mp4(frames, output, fps):
+    proc = None
+    for frame in frames:
+        frame = frame[:frame.shape[0] // 2 * 2, :frame.shape[1] // 2 * 2]
+        if proc is None:
+            proc = subprocess.Popen(["ffmpeg", "-y", "-loglevel", "error",
+                                     "-f", "rawvideo", "-pix_fmt", "rgba",
+                                     "-s", f"{frame.shape[1]}x{frame.shape[0]}", "-r", str(fps),
+                                     "-i", "-", "-pix_fmt", "yuv420p", output],
+                                    stdin=subprocess.PIPE)
+        proc.stdin.write(np.ascontiguousarray(frame).tobytes())
+    if proc is not None:
+        proc.stdin.close()
+        proc.wait()
+
+def generate_track_animation(storms, args):
+    output = args.output
+    ext = os.path.splitext(output)[1].lower()
+    if ext == ".mp4" and shutil.which("ffmpeg") is None:
+        print("ffmpeg not found; please install it or write a GIF or PNG frames instead.")
+        return
+
+    total = count_frames(storms, args)
+    if total == 0:
+        print("No storms found after filtering. Please check your filters.")
+        return
+
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    workers = max(1, args.workers)
+
+    if workers == 1:
+        if ext == ".gif":
+            write_gif((frame for index, frame in iter_frames(storms, args)), output, args.fps)
+        elif ext == ".mp4":
+            write_mp4((frame for index, frame in iter_frames(storms, args)), output, args.fps)
+        else:
+            render_frame_range((storms, args, 0, None, output))
+            output = get_frame_path(output, 0).replace("0000", "####")
+        print(f"Animation generated and saved to {output}")
+        return
+
+    print(f"Rendering {total} frames with {workers} workers...")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        frame_output = output if ext not in (".gif", ".mp4") else os.path.join(tmpdir, "frame.png")
+        chunk = -(-total // workers)
+        jobs = [(storms, args, start, min(start + chunk, total), frame_output)
+                for start in range(0, total, chunk)]
+        with Pool(workers) as pool:
+            pool.map(render_frame_range, jobs)
+
+        frames = (read_frame(get_frame_path(frame_output, i)) for i in range(total))
+        if ext == ".gif":
+            write_gif(frames, output, args.fps)
+        elif ext == ".mp4":
+            write_mp4(frames, output, args.fps)
+        else:
+            output = get_frame_path(output, 0).replace("0000", "####")
+    print(f"Animation generated and saved to {output}")
@@ -0,0 +1,90 @@
+import argparse
+import os
+
+from motion import add_motion
+from track import build_parser, read_storms, filter_storms, get_view, preload_background, generate_track_map
+
+# filters StormCollection.filter accepts, as named by track.py's options
+FILTERS = ["year", "name", "id", "basin", "wind", "minspeed", "maxspeed"]
+
+class StormCollection:
+    """A list of storm dicts, as the readers return them, with filtering and view helpers.
+
+    Filtering returns a new collection sharing the same storm dicts, so
+    one parsed archive can be narrowed down any number of times.
+    """
+
+    def __init__(self, storms):
+        self.storms = list(storms)
+
+    def __len__(self):
+        return len(self.storms)
+
+    def __iter__(self):
+        return iter(self.storms)
+
+    def __getitem__(self, index):
+        return self.storms[index]
+
+    def filter(self, **filters):
+        unknown = set(filters) - set(FILTERS)
+        if unknown:
+            raise TypeError(f"Unknown storm filter(s): {', '.join(sorted(unknown))}")
+        args = argparse.Namespace(**{name: filters.get(name) for name in FILTERS})
+        return StormCollection(filter_storms(self.storms, args))
+
+    def get_view(self, xmin=None, xmax=None, ymin=None, ymax=None):
+        return get_view(self.storms, xmin, xmax, ymin, ymax)
+
+def load_storms(paths, format=None, skipasynoptic=True, parsecache=None):
+    """Parses best-track files into one StormCollection, with motion columns on every fix.
+
+    paths is a path or a list of them, taking the same glob patterns and
+    format: prefixes as track.py's --input; format is the default for the
+    rest, which is otherwise detected. With parsecache the parsed storms
+    are kept in that directory until the files change. Missing or
+    unreadable files add no storms.
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    args = argparse.Namespace(input=[os.fspath(path) for path in paths], format=format,
+                              skipasynoptic=int(skipasynoptic), parsecache=parsecache)
+    return StormCollection(read_storms(args))
+
+class Renderer:
+    """Renders track maps in-process, keeping the decoded background between calls.
+
+    Options are track.py's rendering options by their argument names
+    (res, scale, dots, lines, alpha, show_names, layout, backend, ...);
+    those given here are the defaults of every render() and can be
+    overridden per call. Nothing passed in is modified.
+    """
+
+    def __init__(self, bg="../data/bg8192.png", **options):
+        self.options = vars(build_parser().parse_args([]))
+        self.options["bg"] = bg
+        self.options.update(self.check_options(options))
+        self.background = preload_background(bg)
+
+    def check_options(self, options):
+        unknown = set(options) - set(self.options)
+        if unknown:
+            raise TypeError(f"Unknown render option(s): {', '.join(sorted(unknown))}")
+        return options
+
+    def render(self, storms, output, view=None, **options):
+        """Draws the storms to output; view defaults to get_view() of the storms and the x/y limits given.
+
+        Returns the output path.
+        """
+        storms = list(storms)
+        args = argparse.Namespace(**{**self.options, **self.check_options(options), "output": output})
+        if args.colorby == "speed" and any("speed" not in pos for storm in storms for pos in storm["positions"]):
+            storms = [{**storm, "positions": [pos.copy() for pos in storm["positions"]]} for storm in storms]
+            add_motion(storms)
+        if view is None:
+            view = get_view(storms, args.xmin, args.xmax, args.ymin, args.ymax)
+        for key, value in view.items():
+            setattr(args, key, value)
+        generate_track_map(storms, args)
+        return output
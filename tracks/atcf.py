@@ -1,11 +1,54 @@
-import os
+from datetime import datetime, timedelta
+
+from inputs import open_input
+
+WIND_RADII_THRESHOLDS = (34, 50, 64)
+
+# a longer gap between fixes with the same basin and number means another storm
+MAX_FIX_GAP = timedelta(days=30)
+
+def read_wind_radii(tokens):
+    """Returns (threshold, [NE, SE, SW, NW] radii in nmi) from an ATCF row, or None."""
+    if len(tokens) < 17 or not tokens[11].isdigit():
+        return None
+    threshold = int(tokens[11])
+    if threshold not in WIND_RADII_THRESHOLDS:
+        return None
+    radii = [int(token) if token.isdigit() else 0 for token in tokens[13:17]]
+    if tokens[12] == 'AAA':
+        radii = [radii[0]] * 4
+    elif tokens[12] not in ('NEQ', ''):
+        return None
+    return threshold, radii
+
+def is_new_storm(storm, tokens, last_time):
+    """Tells whether an ATCF row starts another storm than the one being read.
+
+    Zip archives feed b-decks back to back, and adjacent files may share a
+    cyclone number, such as bal012004 and bep012004 or bal012004 and
+    bal012005. The basin tells the first apart; the second shows as fixes
+    going back in time or resuming long after the last one. The year alone
+    is not compared, so storms running past New Year stay whole.
+    """
+    if storm is None or (tokens[0], tokens[1]) != (storm['basin'], storm['id']):
+        return True
+    if tokens[2][:6] == last_time[:6] and tokens[2] >= last_time:
+        return False
+    try:
+        gap = datetime.strptime(tokens[2][:10], "%Y%m%d%H") - datetime.strptime(last_time[:10], "%Y%m%d%H")
+    except (TypeError, ValueError):
+        return False
+    return gap < timedelta(0) or gap > MAX_FIX_GAP
 
 def read_stormdata_atcf(file_path, skipasynoptic):
-    storms = []
-    with open(file_path, 'r') as file:
-        lines = file.readlines()
+    return list(iter_stormdata_atcf(file_path, skipasynoptic))
+
+def iter_stormdata_atcf(file_path, skipasynoptic):
+    """Yields the storms of an ATCF file one at a time, as they are parsed."""
+    with open_input(file_path) as file:
         storm = None
-        for line in lines:
+        last_time = None
+        for line in file:
             line = line.strip()
             if not line:
                 continue
@@ -15,14 +58,17 @@ def read_stormdata_atcf(file_path, skipasynoptic):
             if len(tokens) < 9:
                 continue
                 
-            if storm is None or tokens[1] != storm['id']:
+            if is_new_storm(storm, tokens, last_time):
                 if storm is not None:
-                    storms.append(storm)
+                    yield storm
                 storm = {
                     'id': tokens[1].strip(),
+                    'year': int(tokens[2][:4]) if tokens[2][:4].isdigit() else 0,
+                    'basin': tokens[0].strip(),
                     'name': tokens[27].strip() if len(tokens) > 27 and tokens[27].strip() else 'UNNAMED',
                     'positions': []
                 }
+            last_time = tokens[2]
             
             try:
                 lat_value = float(tokens[6][:-1]) / 10.0 if tokens[6] and len(tokens[6]) > 1 else 0.0
@@ -51,15 +97,24 @@ def read_stormdata_atcf(file_path, skipasynoptic):
                 
                 if skipasynoptic and pos['hour'] % 6 != 0:
                     continue
-                    
+
+                # the 34, 50 and 64 kt radii of a fix come on separate rows
+                wind_radii = read_wind_radii(tokens)
+                last = storm['positions'][-1] if storm['positions'] else None
+                if last is not None and all(last[key] == pos[key] for key in ('year', 'month', 'day', 'hour')):
+                    if wind_radii:
+                        last.setdefault('radii', {})[wind_radii[0]] = wind_radii[1]
+                    continue
+                if wind_radii:
+                    pos['radii'] = {wind_radii[0]: wind_radii[1]}
+
                 storm['positions'].append(pos)
             except Exception as e:
                 print(f"Zoinks! Error while processing line: {line}")
                 print(f"Actual error: {e}")
                 
         if storm is not None:
-            storms.append(storm)
-    return storms
+            yield storm
 
 def get_storm_type(token):
     if token in ['TD', 'TS', 'TY', 'ST', 'TC', 'HU', 'XX']:
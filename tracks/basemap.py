@@ -0,0 +1,146 @@
+import hashlib
+import json
+import math
+import os
+
+import numpy as np
+import matplotlib.pyplot as plt
+import matplotlib.image as mpimg
+import cartopy.crs as ccrs
+import cartopy.feature as cfeature
+
+BASEMAP_CACHE = os.environ.get("ELGOB_BASEMAP_CACHE", "../data/basemaps")
+
+# the world is rasterized in square blocks of at most BLOCK_PIXELS per side,
+# so only the blocks a chart needs get built and read back
+BLOCK_PIXELS = 720
+DENSITIES = [2, 4, 8, 16, 32, 64, 128, 256]
+
+FEATURES = {
+    "land": cfeature.LAND,
+    "ocean": cfeature.OCEAN,
+    "coastline": cfeature.COASTLINE,
+    "borders": cfeature.BORDERS,
+}
+
+# (feature, Natural Earth scale or 'auto', drawing options), in drawing order
+BASEMAP_STYLES = {
+    "chart": [
+        ("land", "50m", {"facecolor": "#f0e8d0"}),
+        ("ocean", "50m", {"facecolor": "#a0c8f0"}),
+        ("coastline", "50m", {"linewidth": 0.6, "edgecolor": "#888888"}),
+        ("borders", "50m", {"linewidth": 0.5, "edgecolor": "grey"}),
+    ],
+    "cone": [
+        ("coastline", "auto", {"linewidth": 0.5}),
+        ("borders", "auto", {"linewidth": 0.5}),
+        ("land", "auto", {"facecolor": "lightgray"}),
+        ("ocean", "auto", {"facecolor": "lightblue"}),
+    ],
+}
+
+def get_auto_scale(density):
+    """Picks a Natural Earth scale for a raster density in pixels per degree."""
+    if density < 8:
+        return "110m"
+    elif density < 32:
+        return "50m"
+    return "10m"
+
+def add_vector_features(ax, style):
+    """Adds the style's Natural Earth features to ax as vector artists."""
+    for name, scale, options in BASEMAP_STYLES[style]:
+        feature = FEATURES[name] if scale == "auto" else FEATURES[name].with_scale(scale)
+        ax.add_feature(feature, **options)
+
+def get_density(ax, extent, dpi):
+    """Returns the pixels per degree the axes will be saved at."""
+    ax.apply_aspect()
+    fig = ax.figure
+    width = ax.get_position().width * fig.get_figwidth() * dpi
+    return width / max(1e-6, extent[1] - extent[0])
+
+def get_density_bucket(density):
+    for bucket in DENSITIES:
+        if bucket >= density / math.sqrt(2):
+            return bucket
+    return DENSITIES[-1]
+
+def get_block_size(density):
+    """Returns the block side in degrees for a density; it always divides 90."""
+    size = 90.0
+    while size * density > BLOCK_PIXELS:
+        size /= 2
+    return size
+
+def get_block_path(cachedir, style, density, dpi, ix, iy):
+    key = hashlib.sha1(json.dumps([BASEMAP_STYLES[style], dpi]).encode()).hexdigest()[:8]
+    return os.path.join(cachedir, f"{style}-{key}", str(density), f"{ix}_{iy}.png")
+
+def rasterize_block(path, style, density, dpi, extent):
+    """Draws one block of the basemap and stores it as a PNG."""
+    size = int(round((extent[1] - extent[0]) * density))
+    fig = plt.figure(figsize=(size / dpi, size / dpi), dpi=dpi)
+    ax = fig.add_axes([0, 0, 1, 1], projection=ccrs.PlateCarree())
+    ax.set_extent(extent, crs=ccrs.PlateCarree())
+    ax.spines["geo"].set_visible(False)
+    for name, scale, options in BASEMAP_STYLES[style]:
+        if scale == "auto":
+            scale = get_auto_scale(density)
+        ax.add_feature(FEATURES[name].with_scale(scale), **options)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp.png"
+    fig.savefig(tmp_path, dpi=dpi)
+    plt.close(fig)
+    os.replace(tmp_path, path)
+
+def load_basemap(extent, style, density, dpi, cachedir):
+    """Assembles the cached blocks covering extent; returns (image, image_extent)."""
+    lon_min, lon_max, lat_min, lat_max = extent
+    lon_min, lon_max = max(-180, lon_min), min(180, lon_max)
+    lat_min, lat_max = max(-90, lat_min), min(90, lat_max)
+
+    block = get_block_size(density)
+    ix_range = range(int(math.floor((lon_min + 180) / block)), int(math.ceil((lon_max + 180) / block)))
+    iy_range = range(int(math.floor((90 - lat_max) / block)), int(math.ceil((90 - lat_min) / block)))
+
+    rows = []
+    for iy in iy_range:
+        row = []
+        for ix in ix_range:
+            path = get_block_path(cachedir, style, density, dpi, ix, iy)
+            if not os.path.exists(path):
+                block_extent = [ix * block - 180, (ix + 1) * block - 180, 90 - (iy + 1) * block, 90 - iy * block]
+                print(f"Rasterizing {style} basemap block {block_extent} at {density} px/degree...")
+                rasterize_block(path, style, density, dpi, block_extent)
+            row.append(mpimg.imread(path))
+        rows.append(np.concatenate(row, axis=1))
+    mosaic = np.concatenate(rows, axis=0)
+
+    # crop the mosaic to the extent, keeping whole pixels
+    mosaic_lon0, mosaic_lat1 = ix_range[0] * block - 180, 90 - iy_range[0] * block
+    x0 = int(math.floor((lon_min - mosaic_lon0) * density))
+    x1 = int(math.ceil((lon_max - mosaic_lon0) * density))
+    y0 = int(math.floor((mosaic_lat1 - lat_max) * density))
+    y1 = int(math.ceil((mosaic_lat1 - lat_min) * density))
+    image_extent = [mosaic_lon0 + x0 / density, mosaic_lon0 + x1 / density,
+                    mosaic_lat1 - y1 / density, mosaic_lat1 - y0 / density]
+    return mosaic[y0:y1, x0:x1], image_extent
+
+def add_basemap(ax, extent, style, dpi=150, cachedir=BASEMAP_CACHE):
+    """Draws the style's basemap under everything else on a PlateCarree axes.
+
+    Natural Earth features are rasterized once per density bucket into
+    block PNGs under cachedir and reused by later charts. With
+    cachedir set to None the features are drawn as vectors instead.
+    """
+    if cachedir is None:
+        add_vector_features(ax, style)
+        return
+
+    density = get_density_bucket(get_density(ax, extent, dpi))
+    image, image_extent = load_basemap(extent, style, density, dpi, cachedir)
+    ax.imshow(image, origin="upper", extent=image_extent, transform=ccrs.PlateCarree(),
+              interpolation="antialiased", zorder=0)
+    ax.set_extent(extent, crs=ccrs.PlateCarree())
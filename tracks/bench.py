@@ -0,0 +1,203 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic import FORMATS, generate_storms, write_synthetic
+
+BENCH_CASES = ["read_hurdat2", "read_hurdat", "read_atcf", "read_jma", "read_md", "read_tcr",
+               "read_storm_data", "generate_track_map", "generate_track_map_numpy", "plot_track", "cone"]
+
+def get_reader(fmt):
+    if fmt == "hurdat2":
+        from hurdat2 import read_stormdata_hurdat2
+        return read_stormdata_hurdat2
+    if fmt == "hurdat":
+        from hurdat import read_stormdata_hurdat
+        return read_stormdata_hurdat
+    if fmt == "atcf":
+        from atcf import read_stormdata_atcf
+        return lambda path: read_stormdata_atcf(path, True)
+    if fmt == "jma":
+        from jma import read_stormdata_jma
+        return lambda path: read_stormdata_jma(path, True)
+    if fmt == "md":
+        from md import read_stormdata_md
+        return read_stormdata_md
+    from tcr import read_stormdata_tcr
+    return read_stormdata_tcr
+
+def get_track_args(config, extra=()):
+    from track import build_parser
+    return build_parser().parse_args(["--input", config["files"]["hurdat2"], "--format", "hurdat2",
+                                      "--bg", config["bg"], "--output", os.path.join(config["workdir"], "track.png"),
+                                      *extra])
+
+def prepare_case(name, config):
+    """Returns a callable running the case once, and the number of fixes it handles."""
+    if name.startswith("read_") and name[5:] in FORMATS:
+        fmt = name[5:]
+        reader = get_reader(fmt)
+        fixes = config["fixes"] if fmt == "tcr" else config["storms"] * config["fixes"]
+        return lambda: reader(config["files"][fmt]), fixes
+
+    if name == "read_storm_data":
+        from track import read_storm_data
+        return lambda: read_storm_data(get_track_args(config)), config["storms"] * config["fixes"]
+
+    # rendering cases draw the first season, as a season map would
+    from track import read_storm_data
+    backend = "numpy" if name == "generate_track_map_numpy" else "matplotlib"
+    args = get_track_args(config, ["--year", str(config["startyear"]), "--backend", backend])
+    season = read_storm_data(args)
+    season_fixes = sum(len(storm["positions"]) for storm in season)
+
+    if name in ("generate_track_map", "generate_track_map_numpy"):
+        import copy
+        from track import generate_track_map, preload_background
+        preload_background(args.bg)
+        return lambda: generate_track_map(season, copy.copy(args)), season_fixes
+
+    storm = season[0]
+    if name == "plot_track":
+        from chart import plot_track
+        output = os.path.join(config["workdir"], "chart.png")
+        cache = os.path.join(config["workdir"], "basemaps")
+        return lambda: plot_track(storm, output, basemap_cache=cache), len(storm["positions"])
+
+    if name == "cone":
+        import matplotlib.pyplot as plt
+        from cone import get_cone_radii, get_cone_extent, setup_cone_figure, draw_cone, get_cone_title
+        output = os.path.join(config["workdir"], "cone.png")
+        cache = os.path.join(config["workdir"], "basemaps")
+        def run_cone():
+            positions = storm["positions"]
+            radii = get_cone_radii(storm, 0, None)
+            fig, ax = setup_cone_figure(get_cone_extent(positions, max(5, max(radii) + 1)), cache)
+            draw_cone(ax, positions, radii)
+            ax.set_title(get_cone_title(storm))
+            ax.legend()
+            fig.savefig(output, dpi=150, bbox_inches='tight')
+            plt.close(fig)
+        return run_cone, len(storm["positions"])
+
+    raise ValueError(f"Unknown benchmark case: {name}")
+
+def run_case(name, config):
+    """Runs one case in this (fresh) process; returns its best time, fix count and peak RSS."""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    with contextlib.redirect_stdout(io.StringIO()):
+        run, fixes = prepare_case(name, config)
+        times = []
+        for _ in range(config["warmup"] + config["repeat"]):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+    best = min(times[config["warmup"]:])
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "seconds": round(best, 4),
+        "fixes": fixes,
+        "fixes_per_s": round(fixes / best, 1) if best > 0 else None,
+        "peak_rss_mb": round(maxrss / (1048576 if sys.platform == "darwin" else 1024), 1),
+    }
+
+def run_isolated(name, config):
+    """Runs a case in a spawned process, so peak RSS and caches belong to that case alone."""
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        try:
+            return pool.apply(run_case, (name, config))
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+
+def get_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare_results(results, baseline, threshold):
+    """Prints each case against the baseline; returns the names of cases slower by more than threshold."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name, {})
+        if "seconds" not in result or "seconds" not in base:
+            continue
+        ratio = result["seconds"] / base["seconds"] if base["seconds"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  SLOWER"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{name:26s} {base['seconds']:9.4f}s -> {result['seconds']:9.4f}s  x{ratio:.2f}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the readers and renderers on synthetic best-track data")
+    parser.add_argument("--storms", type=int, default=500, help="Number of synthetic storms in each input file")
+    parser.add_argument("--fixes", type=int, default=40, help="Number of fixes per synthetic storm")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic storms")
+    parser.add_argument("--cases", type=str, nargs="+", default=BENCH_CASES, choices=BENCH_CASES, help="Cases to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case; the fastest is kept")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per case, e.g. to fill the basemap cache")
+    parser.add_argument("--bg", type=str, default="../data/bg8192.png", help="Background image for the track map cases")
+    parser.add_argument("--workdir", type=str, help="Directory for the synthetic inputs and rendered outputs (default: a temporary directory)")
+    parser.add_argument("--save", type=str, help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", type=str, help="Compare against results saved earlier with --save")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative slowdown against the baseline reported as a regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        workdir = os.path.abspath(args.workdir or tmpdir)
+        storms = generate_storms(args.storms, args.fixes, args.seed)
+        files = {}
+        for fmt in FORMATS:
+            files[fmt] = os.path.join(workdir, f"synthetic.{fmt}")
+            write_synthetic(files[fmt], fmt, storms)
+        config = {"storms": args.storms, "fixes": args.fixes, "seed": args.seed, "startyear": 2000,
+                  "repeat": args.repeat, "warmup": args.warmup, "bg": os.path.abspath(args.bg),
+                  "workdir": workdir, "files": files}
+
+        results = {}
+        for name in args.cases:
+            results[name] = result = run_isolated(name, config)
+            if "error" in result:
+                print(f"{name:26s} failed: {result['error']}")
+            else:
+                print(f"{name:26s} {result['seconds']:9.4f}s  {result['fixes_per_s'] or 0:12.0f} fixes/s  {result['peak_rss_mb']:7.1f} MB")
+
+    report = {
+        "config": {key: config[key] for key in ("storms", "fixes", "seed", "repeat", "warmup")},
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "revision": get_revision(),
+        "results": results,
+    }
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print("Warning: the baseline was recorded with different --storms/--fixes/--seed/--repeat settings.")
+        regressions = compare_results(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than the baseline: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -8,16 +8,23 @@ import matplotlib.colors as mcolors
 import matplotlib.cm as cm
 from matplotlib.colorbar import ColorbarBase
 from matplotlib.patches import FancyArrow
+from matplotlib.collections import LineCollection
 import numpy as np
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
 from cartopy.mpl.gridliner import LongitudeFormatter, LatitudeFormatter
 import argparse
+import io
 import sys
 import os
 from datetime import datetime
+from PIL import Image
 
 from hurdat2 import read_stormdata_hurdat2
+from inputs import input_exists
+from basemap import add_basemap, BASEMAP_CACHE
+from pngio import ENCODINGS, save_figure, write_png
+from profiling import stage, count, count_artists, add_profile_arguments, start_profile, finish_profile
 
 category_colors = {
     'LO': '#BEBEBE',
@@ -129,54 +136,63 @@ def calculate_ace(positions):
     final_ace = round(ace * 1e-4, 2)
     return final_ace
 
-def plot_track(storm, output_file, show_plot=False):
-    positions = storm['positions']
-    if not positions:
-        print(f"No positions found for storm {storm['name']} {storm['year']}.")
-        return
-
-    lats = np.array([p['lat'] for p in positions])
-    lons = np.array([p['lon'] for p in positions])
-
-    winds_list = []
-    for p in positions:
-        wind_val = p.get('wind', 0)
-        try:
-            winds_list.append(float(wind_val))
-        except (ValueError, TypeError):
-            winds_list.append(0.0)
-    winds = np.array(winds_list)
-
-    pressures = np.array([p.get('pressure', -999) for p in positions])
-    statuses = [p.get('status', 'UN') for p in positions]
-    times = [p.get('time') for p in positions]
-
-    valid_pressures = pressures[pressures > 0]
-    min_pressure = np.min(valid_pressures) if valid_pressures.size > 0 else None
-    min_pressure_idx = -1
-    if min_pressure is not None:
-        min_pressure_indices = np.where(pressures == min_pressure)[0]
-        if min_pressure_indices.size > 0:
-            min_pressure_idx = min_pressure_indices[0]
-
-    ace = calculate_ace(positions)
-
+def great_circle_segments(lons, lats, max_step=1.0):
+    """Interpolates every consecutive pair of fixes along its great circle.
+
+    Returns an array of shape (segments, points, 2) in PlateCarree
+    coordinates, with longitudes kept continuous across the dateline.
+    """
+    lon_r, lat_r = np.radians(lons), np.radians(lats)
+    xyz = np.stack([np.cos(lat_r) * np.cos(lon_r), np.cos(lat_r) * np.sin(lon_r), np.sin(lat_r)], axis=-1)
+    a, b = xyz[:-1], xyz[1:]
+    omega = np.arccos(np.clip(np.sum(a * b, axis=1), -1, 1))
+
+    steps = int(np.clip(np.ceil(np.degrees(omega.max(initial=0)) / max_step), 1, 64))
+    t = np.linspace(0, 1, steps + 1)[None, :, None]
+    sin_omega = np.sin(omega)[:, None, None]
+    # slerp, falling back to a straight line for (near) identical fixes
+    with np.errstate(invalid='ignore', divide='ignore'):
+        points = np.where(sin_omega > 1e-9,
+                          (np.sin((1 - t) * omega[:, None, None]) * a[:, None] +
+                           np.sin(t * omega[:, None, None]) * b[:, None]) / sin_omega,
+                          (1 - t) * a[:, None] + t * b[:, None])
+
+    seg_lats = np.degrees(np.arcsin(np.clip(points[..., 2], -1, 1)))
+    seg_lons = np.degrees(np.arctan2(points[..., 1], points[..., 0]))
+    seg_lons = np.degrees(np.unwrap(np.radians(seg_lons), axis=1))
+    seg_lons += np.round((lons[:-1] - seg_lons[:, 0]) / 360)[:, None] * 360
+    return np.stack([seg_lons, seg_lats], axis=-1)
+
+def draw_track(ax, lons, lats, colors, linewidth=2.0, markersize=5):
+    """Draws a track as one great-circle LineCollection and one scatter of its fixes; returns both."""
+    lons, lats = np.asarray(lons, dtype=float), np.asarray(lats, dtype=float)
+    artists = []
+    if len(lons) > 1:
+        segments = LineCollection(great_circle_segments(lons, lats), colors=colors[:-1],
+                                  linewidths=linewidth, capstyle='round', zorder=2,
+                                  transform=ccrs.PlateCarree())
+        artists.append(ax.add_collection(segments))
+    artists.append(ax.scatter(lons, lats, s=markersize ** 2, c=colors, edgecolors=colors, linewidths=1.0,
+                              zorder=2.5, transform=ccrs.PlateCarree()))
+    return artists
+
+def get_storm_id(storm):
+    """Returns the ATCF-style ID of a storm, e.g. AL122005."""
+    return f"{storm.get('basin', '')}{storm['id']:02d}{storm['year']}"
+
+def get_extent(storms, margin=3):
+    lons = np.concatenate([[p['lon'] for p in storm['positions']] for storm in storms])
+    lats = np.concatenate([[p['lat'] for p in storm['positions']] for storm in storms])
+    return [max(np.min(lons) - margin, -180), min(np.max(lons) + margin, 180),
+            max(np.min(lats) - margin, -90), min(np.max(lats) + margin, 90)]
+
+def setup_chart(extent, basemap_cache=BASEMAP_CACHE):
+    """Builds the figure, basemap, gridlines and category colorbar shared by every storm drawn on it."""
     fig = plt.figure(figsize=(15, 10))
     ax = fig.add_subplot(1, 1, 1, projection=ccrs.PlateCarree())
+    ax.set_extent(extent, crs=ccrs.PlateCarree())
 
-    margin = 3
-    lon_min, lon_max = np.min(lons) - margin, np.max(lons) + margin
-    lat_min, lat_max = np.min(lats) - margin, np.max(lats) + margin
-    lon_min = max(lon_min, -180)
-    lon_max = min(lon_max, 180)
-    lat_min = max(lat_min, -90)
-    lat_max = min(lat_max, 90)
-    ax.set_extent([lon_min, lon_max, lat_min, lat_max], crs=ccrs.PlateCarree())
-
-    ax.add_feature(cfeature.LAND.with_scale('50m'), facecolor='#f0e8d0')
-    ax.add_feature(cfeature.OCEAN.with_scale('50m'), facecolor='#a0c8f0')
-    ax.add_feature(cfeature.COASTLINE.with_scale('50m'), linewidth=0.6, edgecolor='#888888')
-    ax.add_feature(cfeature.BORDERS.with_scale('50m'), linewidth=0.5, edgecolor='grey')
+    add_basemap(ax, extent, "chart", dpi=150, cachedir=basemap_cache)
 
     gl = ax.gridlines(crs=ccrs.PlateCarree(), draw_labels=True,
                       linewidth=0.5, color='#AAAAAA', linestyle=':')
@@ -187,39 +203,6 @@ def plot_track(storm, output_file, show_plot=False):
     gl.xlabel_style = {'size': 10, 'color': 'black'}
     gl.ylabel_style = {'size': 10, 'color': 'black'}
 
-    last_day = -1
-    for i in range(len(positions) - 1):
-        cat = get_category(statuses[i], winds[i])
-        color = category_colors.get(cat, 'grey')
-
-        ax.plot([lons[i], lons[i+1]], [lats[i], lats[i+1]],
-                color=color, linewidth=2.0, transform=ccrs.Geodetic())
-
-        ax.plot(lons[i], lats[i], marker='o', markersize=5, color=color, transform=ccrs.Geodetic())
-
-    last_cat = get_category(statuses[-1], winds[-1])
-    last_color = category_colors.get(last_cat, 'grey')
-    ax.plot(lons[-1], lats[-1], marker='o', markersize=5, color=last_color, transform=ccrs.Geodetic())
-
-    name_idx = len(lons) - 1
-    offset_x = 0.5
-    offset_y = 0.5
-    ha = 'left'
-    va = 'bottom'
-    if name_idx > 0:
-        if lons[name_idx] < lons[name_idx-1]:
-            ha = 'right'
-            offset_x = -0.5
-        if lats[name_idx] < lats[name_idx-1]:
-            va = 'top'
-            offset_y = -0.5
-
-    plt.text(lons[name_idx] + offset_x, lats[name_idx] + offset_y, f"{storm['name']} {storm['year']}",
-             fontsize=10, fontweight='bold', ha=ha, va=va, transform=ccrs.Geodetic())
-
-    plt.title(f"{storm['name']} {storm['year']}", loc='left', fontsize=12, fontweight='bold')
-    plt.title(f"ACE: {ace:.2f}", loc='right', fontsize=10)
-
     cbar_ax = fig.add_axes([0.92, 0.25, 0.02, 0.5])
 
     cat_order = ['C5', 'C4', 'C3', 'C2', 'C1', 'TS', 'TD', 'SD', 'LO']
@@ -239,15 +222,115 @@ def plot_track(storm, output_file, show_plot=False):
     cb.set_ticklabels(tick_labels)
     cb.ax.tick_params(labelsize=9)
 
-    plt.subplots_adjust(left=0.05, right=0.9, top=0.95, bottom=0.05)
+    fig.subplots_adjust(left=0.05, right=0.9, top=0.95, bottom=0.05)
+    return fig, ax
 
+def draw_storm(ax, storm):
+    """Draws a storm's track and name label; returns the artists so they can be removed again."""
+    positions = storm['positions']
+    lats = np.array([p['lat'] for p in positions])
+    lons = np.array([p['lon'] for p in positions])
+
+    winds_list = []
+    for p in positions:
+        wind_val = p.get('wind', 0)
+        try:
+            winds_list.append(float(wind_val))
+        except (ValueError, TypeError):
+            winds_list.append(0.0)
+    winds = np.array(winds_list)
+    statuses = [p.get('status', 'UN') for p in positions]
+
+    colors = [category_colors.get(get_category(status, wind), 'grey') for status, wind in zip(statuses, winds)]
+    artists = draw_track(ax, lons, lats, colors)
+
+    name_idx = len(lons) - 1
+    offset_x = 0.5
+    offset_y = 0.5
+    ha = 'left'
+    va = 'bottom'
+    if name_idx > 0:
+        if lons[name_idx] < lons[name_idx-1]:
+            ha = 'right'
+            offset_x = -0.5
+        if lats[name_idx] < lats[name_idx-1]:
+            va = 'top'
+            offset_y = -0.5
+
+    artists.append(ax.text(lons[name_idx] + offset_x, lats[name_idx] + offset_y, f"{storm['name']} {storm['year']}",
+                           fontsize=10, fontweight='bold', ha=ha, va=va, transform=ccrs.Geodetic()))
+    return artists
+
+def set_titles(ax, left, ace):
+    ax.set_title(left, loc='left', fontsize=12, fontweight='bold')
+    ax.set_title(f"ACE: {ace:.2f}", loc='right', fontsize=10)
+
+def save_chart(fig, output_file, show_plot=False, layout="tight", encoding="png", compress=6):
+    """Saves the chart cropped to its contents, or with layout="fixed" writes the whole figure from a single draw."""
     if show_plot:
         plt.show()
+        return
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    if layout == "fixed":
+        fig.set_dpi(150)
+        save_figure(fig, output_file, encoding, compress)
+    elif encoding == "palette":
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', dpi=150, bbox_inches='tight', pil_kwargs={'compress_level': 0})
+        write_png(output_file, np.asarray(Image.open(buf).convert('RGB')), encoding, compress)
     else:
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        plt.savefig(output_file, dpi=150, bbox_inches='tight')
-        print(f"Map generated and saved to {output_file}.")
-        plt.close(fig)
+        fig.savefig(output_file, dpi=150, bbox_inches='tight', pil_kwargs={'compress_level': compress})
+    print(f"Map generated and saved to {output_file}.")
+
+def plot_track(storm, output_file, show_plot=False, basemap_cache=BASEMAP_CACHE, layout="tight", encoding="png", compress=6):
+    if not storm['positions']:
+        print(f"No positions found for storm {storm['name']} {storm['year']}.")
+        return
+
+    with stage("setup"):
+        fig, ax = setup_chart(get_extent([storm]), basemap_cache)
+    with stage("draw"):
+        draw_storm(ax, storm)
+        set_titles(ax, f"{storm['name']} {storm['year']}", calculate_ace(storm['positions']))
+    count_artists(ax)
+    with stage("save"):
+        save_chart(fig, output_file, show_plot, layout, encoding, compress)
+    plt.close(fig)
+
+def plot_storms(storms, output_file, title, each=False, show_plot=False, basemap_cache=BASEMAP_CACHE,
+                layout="tight", encoding="png", compress=6):
+    """Charts several storms on one map, or with each=True one map per storm.
+
+    Every chart shares the same extent, so the basemap, gridlines and
+    colorbar are built once and only the storm artists are swapped.
+    """
+    storms = [storm for storm in storms if storm['positions']]
+    if not storms:
+        print("No positions found for the selected storms.")
+        return
+
+    with stage("setup"):
+        fig, ax = setup_chart(get_extent(storms), basemap_cache)
+    if not each:
+        with stage("draw"):
+            for storm in storms:
+                draw_storm(ax, storm)
+            set_titles(ax, title, sum(calculate_ace(storm['positions']) for storm in storms))
+        count_artists(ax)
+        with stage("save"):
+            save_chart(fig, output_file, show_plot, layout, encoding, compress)
+    else:
+        base, ext = os.path.splitext(output_file)
+        for storm in storms:
+            with stage("draw"):
+                artists = draw_storm(ax, storm)
+                set_titles(ax, f"{storm['name']} {storm['year']}", calculate_ace(storm['positions']))
+            count("artists_drawn", len(artists))
+            with stage("save"):
+                save_chart(fig, f"{base}-{get_storm_id(storm)}{ext or '.png'}", show_plot, layout, encoding, compress)
+            for artist in artists:
+                artist.remove()
+    plt.close(fig)
 
 def main():
     parser = argparse.ArgumentParser(description="Plots the track of a cyclone from HURDAT2 data.")
@@ -255,25 +338,51 @@ def main():
     parser.add_argument("--output", type=str, default="../png/output-track.png", help="Output PNG file (default: ../png/output-track.png)")
     parser.add_argument("--id", type=str, help="Cyclone ID (e.g., AL012023)")
     parser.add_argument("--name", type=str, help="Storm name (e.g., Ana)")
-    parser.add_argument("--year", type=int, help="Storm year (e.g., 2023)")
+    parser.add_argument("--year", type=int, help="Storm year (e.g., 2023); without --name, charts the whole season")
+    parser.add_argument("--basin", type=str, help="Only chart storms from this basin (e.g., AL, EP, CP)")
+    parser.add_argument("--each", action="store_true", help="With a season, write one chart per storm (<output>-<id>.png) instead of a combined chart")
     parser.add_argument("--show", action="store_true", help="Show the plot instead of saving it")
+    parser.add_argument("--basemapcache", type=str, default=BASEMAP_CACHE, help=f"Directory of cached basemap rasters (default: {BASEMAP_CACHE})")
+    parser.add_argument("--vectorbasemap", action="store_true", help="Draw Natural Earth features as vectors instead of cached rasters")
+    parser.add_argument("--layout", type=str, default="tight", choices=["tight", "fixed"], help="Crop the saved chart to its contents (tight), or write the whole figure in one draw (fixed)")
+    parser.add_argument("--encoding", type=str, default="png", choices=ENCODINGS, help="Save an RGB PNG, or a smaller 256-color indexed PNG (palette)")
+    parser.add_argument("--compress", type=int, default=6, choices=range(10), metavar="0-9", help="zlib compression level of the saved PNG")
+    add_profile_arguments(parser)
 
     args = parser.parse_args()
+    if args.profile or args.profilehook:
+        start_profile("chart")
+    try:
+        run(args)
+    finally:
+        finish_profile(args)
 
-    if not os.path.isfile(args.input):
+def run(args):
+    basemap_cache = None if args.vectorbasemap else args.basemapcache
+
+    if not input_exists(args.input):
         print(f"No entry file found: {args.input}")
         sys.exit(1)
 
-    storms = read_stormdata_hurdat2(args.input)
+    with stage("parse"):
+        storms = read_stormdata_hurdat2(args.input)
     if not storms:
         print("No storms found in the provided HURDAT2 file.")
         sys.exit(1)
+    count("storms_parsed", len(storms))
+    count("fixes_parsed", sum(len(s["positions"]) for s in storms))
+
+    if args.basin:
+        storms = [s for s in storms if s.get("basin", "") == args.basin.upper()]
+        if not storms:
+            print(f"No cyclones found in basin: {args.basin}")
+            sys.exit(1)
 
     storm_to_plot = None
     if args.id:
         storm_id_upper = args.id.upper()
         for s in storms:
-            if s["id"] == storm_id_upper:
+            if get_storm_id(s) == storm_id_upper:
                 storm_to_plot = s
                 break
         if not storm_to_plot:
@@ -291,11 +400,22 @@ def main():
     elif args.name:
          print("Please provide the year along with the name.")
          sys.exit(1)
+    elif args.year:
+        season = [s for s in storms if s["year"] == args.year]
+        if not season:
+            print(f"No cyclones found in year: {args.year}")
+            sys.exit(1)
+        title = f"{args.basin.upper()} {args.year}" if args.basin else str(args.year)
+        count("storms_filtered", len(season))
+        plot_storms(season, args.output, title, args.each, args.show, basemap_cache,
+                    args.layout, args.encoding, args.compress)
+        return
     else:
         print("No cyclone ID or name provided. Using the first storm in the list.")
         storm_to_plot = storms[0]
 
-    plot_track(storm_to_plot, args.output, args.show)
+    count("storms_filtered", 1)
+    plot_track(storm_to_plot, args.output, args.show, basemap_cache, args.layout, args.encoding, args.compress)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,147 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from hurdat2 import read_stormdata_hurdat2
+from inputs import input_exists
+
+CONE_RADII_TABLE = os.environ.get("ELGOB_CONE_RADII", "../data/cone_radii.json")
+EARTH_RADIUS_NMI = 3440.065
+
+def get_fix_hours(storm):
+    """Returns the hours since the storm's first fix for each position."""
+    positions = storm["positions"]
+    if not positions:
+        return np.array([])
+    year = storm.get("year") or positions[0].get("year", 2001)
+    months = np.array([pos["month"] for pos in positions])
+    days = np.array([pos["day"] for pos in positions])
+    hours = np.array([pos["hour"] for pos in positions])
+    if months.min() < 1 or days.min() < 1:
+        raise ValueError("fix without a valid date")
+    # storms running past New Year keep counting into the next year
+    years = year + np.concatenate([[0], np.cumsum(np.diff(months) < 0)])
+    times = ((years - 1970).astype("datetime64[Y]").astype("datetime64[M]") + (months - 1)).astype("datetime64[D]")
+    times = (times + (days - 1)).astype("datetime64[h]") + hours
+    return (times - times[0]).astype(float)
+
+def great_circle_nmi(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_NMI * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def stack_fixes(storms, interval):
+    """Flattens the synoptic fixes of every storm into arrays of (storm index, hour, lat, lon)."""
+    index, hours, lats, lons = [], [], [], []
+    for i, storm in enumerate(storms):
+        fix_hours = get_fix_hours(storm)
+        keep = np.array([pos["hour"] % interval == 0 for pos in storm["positions"]], dtype=bool)
+        index.append(np.full(keep.sum(), i))
+        hours.append(fix_hours[keep])
+        lats.append(np.array([pos["lat"] for pos in storm["positions"]])[keep])
+        lons.append(np.array([pos["lon"] for pos in storm["positions"]])[keep])
+    return [np.concatenate(a) if a else np.array([]) for a in (index, hours, lats, lons)]
+
+def persistence_errors(storms, lead, interval=6):
+    """Returns the track errors (nmi) of a persistence forecast at lead hours.
+
+    Each fix is extrapolated along the motion since the previous fix, and
+    compared with the fix lead hours later. Every storm is handled at once
+    by offsetting the flattened fix arrays.
+    """
+    index, hours, lats, lons = stack_fixes(storms, interval)
+    steps = lead // interval
+    n = len(index)
+    if n <= steps + 1:
+        return np.array([])
+
+    base = np.arange(1, n - steps)
+    prev, target = base - 1, base + steps
+    valid = ((index[prev] == index[base]) & (index[target] == index[base]) &
+             (hours[base] - hours[prev] == interval) & (hours[target] - hours[base] == lead))
+    base, prev, target = base[valid], prev[valid], target[valid]
+
+    dlon = (lons[base] - lons[prev] + 180) % 360 - 180
+    forecast_lat = lats[base] + steps * (lats[base] - lats[prev])
+    forecast_lon = lons[base] + steps * dlon
+    return great_circle_nmi(forecast_lat, forecast_lon, lats[target], lons[target])
+
+def compute_cone_radii(storms, leads, percentile=67, interval=6, min_samples=30):
+    """Builds the radii table: per basin, the percentile of persistence errors at each lead."""
+    basins = {}
+    for storm in storms:
+        basins.setdefault(storm.get("basin", "") or "ALL", []).append(storm)
+    if len(basins) > 1:
+        basins["ALL"] = storms
+
+    table = {"method": "persistence", "percentile": percentile, "interval": interval, "basins": {}}
+    for basin, basin_storms in sorted(basins.items()):
+        radii, samples = [], []
+        for lead in leads:
+            errors = persistence_errors(basin_storms, lead, interval) if lead > 0 else np.zeros(0)
+            samples.append(int(errors.size))
+            if lead == 0:
+                radii.append(0.0)
+            elif errors.size >= min_samples:
+                radii.append(round(float(np.percentile(errors, percentile)), 1))
+            else:
+                radii.append(None)
+        if all(radius is None for radius in radii[1:]):
+            print(f"Not enough fixes to derive radii for basin {basin}; skipping it.")
+            continue
+        table["basins"][basin] = {"leads": list(leads), "radii_nmi": radii, "samples": samples}
+    return table
+
+def load_cone_radii(path=CONE_RADII_TABLE):
+    """Loads a radii table written by this script; returns None if there is none."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def lookup_cone_radii(table, basin, lead_hours, min_radius=0.2):
+    """Interpolates the radii (in degrees) for lead_hours from a loaded table."""
+    entry = table["basins"].get(basin) or table["basins"].get("ALL")
+    if entry is None:
+        return None
+    known = [(lead, radius) for lead, radius in zip(entry["leads"], entry["radii_nmi"]) if radius is not None]
+    leads, radii = zip(*known)
+    return np.maximum(np.interp(lead_hours, leads, radii) / 60.0, min_radius)
+
+def main():
+    parser = argparse.ArgumentParser(description="Derives forecast cone radii from the track errors of persistence forecasts over a HURDAT2 archive.")
+    parser.add_argument("--input", type=str, required=True, help="HURDAT2 input file")
+    parser.add_argument("--output", type=str, default=CONE_RADII_TABLE, help=f"Radii table to write (default: {CONE_RADII_TABLE})")
+    parser.add_argument("--leads", type=str, default="0,12,24,36,48,72,96,120", help="Comma-separated lead times in hours")
+    parser.add_argument("--percentile", type=float, default=67, help="Error percentile used as the cone radius (default: 67)")
+    parser.add_argument("--minyear", type=int, help="Only use storms from this year on")
+    args = parser.parse_args()
+
+    if not input_exists(args.input):
+        print(f"Entry file not found: {args.input}")
+        sys.exit(1)
+
+    storms = read_stormdata_hurdat2(args.input)
+    if args.minyear:
+        storms = [s for s in storms if s["year"] >= args.minyear]
+    if not storms:
+        print("No storms found in the provided HURDAT2 file.")
+        sys.exit(1)
+
+    leads = [int(lead) for lead in args.leads.split(",")]
+    table = compute_cone_radii(storms, leads, args.percentile)
+    table["source"] = os.path.basename(args.input)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(table, f, indent=1)
+    for basin, entry in table["basins"].items():
+        print(f"{basin}: " + ", ".join(f"{lead}h {radius} nmi" for lead, radius in zip(entry["leads"], entry["radii_nmi"])))
+    print(f"Cone radii saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -7,14 +7,205 @@ import cartopy.feature as cfeature
 import argparse
 import sys
 import os
+import tempfile
+from multiprocessing import Pool
+from shapely.geometry import Point, Polygon
+from shapely.ops import unary_union
 
 from hurdat2 import read_stormdata_hurdat2
+from inputs import input_exists
+from basemap import add_basemap, BASEMAP_CACHE
+from climatology import CONE_RADII_TABLE, get_fix_hours, load_cone_radii, lookup_cone_radii
+from profiling import stage, count, count_artists, add_profile_arguments, start_profile, finish_profile
 
 def generate_cone_radius(num_points):
     base = 0.4
     step = 0.2 if num_points <= 10 else (1.5 / max(1, num_points-1))
     return [base + i*step for i in range(num_points)]
 
+def get_cone_radii(storm, start, stop, table=None):
+    """Returns the cone radii of positions[start:stop], from the climatology table when one is loaded."""
+    num_points = len(storm["positions"][start:stop])
+    if num_points == 0:
+        return []
+    if table is not None:
+        hours = get_fix_hours(storm)[start:stop]
+        radii = lookup_cone_radii(table, storm.get("basin", ""), hours - hours[0])
+        if radii is not None:
+            return radii
+    return generate_cone_radius(num_points)
+
+# (minimum wind, color, marker, legend label), strongest first; winds below 0 are non-tropical
+CONE_CATEGORIES = [
+    (140, 'm', 'o', 'Category 5'),
+    (115, 'r', 'o', 'Category 4'),
+    (100, '#ff5908', 'o', 'Category 3'),
+    (85, '#ffaa00', 'o', 'Category 2'),
+    (65, '#ffff00', 'o', 'Category 1'),
+    (35, 'g', 'o', 'Tropical storm'),
+    (0, 'b', 'o', 'Tropical depression'),
+    (None, 'w', '*', 'Not Tropical'),
+]
+
+def get_cone_categories(winds):
+    """Returns the CONE_CATEGORIES index of every wind."""
+    winds = np.asarray(winds, dtype=float)
+    thresholds = np.array([c[0] for c in CONE_CATEGORIES[:-1]], dtype=float)
+    categories = np.argmax(winds[:, None] >= thresholds[None, :], axis=1)
+    categories[winds < 0] = len(CONE_CATEGORIES) - 1
+    return categories
+
+def cone_envelope(longitudes, latitudes, radii, resolution=32):
+    """Returns the union of the circles along the track and the tangent hulls joining them.
+
+    The hull of each pair of consecutive circles is built from its two
+    outer tangent lines and the far arcs of both circles, all pairs at once.
+    """
+    centers = np.column_stack([longitudes, latitudes]).astype(float)
+    radii = np.asarray(radii, dtype=float)
+    if len(centers) == 1:
+        return Point(centers[0]).buffer(radii[0], resolution // 4)
+
+    c1, c2, r1, r2 = centers[:-1], centers[1:], radii[:-1], radii[1:]
+    delta = c2 - c1
+    dist = np.hypot(delta[:, 0], delta[:, 1])
+    heading = np.arctan2(delta[:, 1], delta[:, 0])
+    # angle between the heading and the tangent points' normals; 0 or pi when one circle holds the other
+    alpha = np.arccos(np.clip((r1 - r2) / np.maximum(dist, 1e-9), -1, 1))
+
+    t = np.linspace(0, 1, resolution)[None, :]
+    start_angles = heading[:, None] + alpha[:, None] + t * (2 * np.pi - 2 * alpha[:, None])
+    end_angles = heading[:, None] - alpha[:, None] + t * (2 * alpha[:, None])
+    ring = np.concatenate([
+        c1[:, None, :] + r1[:, None, None] * np.stack([np.cos(start_angles), np.sin(start_angles)], axis=-1),
+        c2[:, None, :] + r2[:, None, None] * np.stack([np.cos(end_angles), np.sin(end_angles)], axis=-1),
+    ], axis=1)
+
+    hulls = []
+    for i in range(len(ring)):
+        if dist[i] <= abs(r1[i] - r2[i]):
+            bigger = i if r1[i] >= r2[i] else i + 1
+            hulls.append(Point(centers[bigger]).buffer(radii[bigger], resolution // 4))
+        else:
+            hulls.append(Polygon(ring[i]))
+    return unary_union(hulls)
+
+def draw_cone(ax, positions, cone_radius):
+    """Draws the cone, the track and one scatter per category; returns the artists."""
+    latitudes = np.array([pos["lat"] for pos in positions])
+    longitudes = np.array([pos["lon"] for pos in positions])
+    categories = get_cone_categories([pos["wind"] for pos in positions])
+
+    artists = [ax.add_geometries([cone_envelope(longitudes, latitudes, cone_radius)], ccrs.PlateCarree(),
+                                 facecolor='w', edgecolor='w', alpha=0.3, linewidth=1)]
+    artists += ax.plot(longitudes, latitudes, 'w-', label='TC Path', transform=ccrs.PlateCarree())
+
+    # legend entries follow the order categories first appear along the track
+    present, first = np.unique(categories, return_index=True)
+    for index in present[np.argsort(first)]:
+        wind, color, marker, label = CONE_CATEGORIES[index]
+        mask = categories == index
+        artists.append(ax.scatter(longitudes[mask], latitudes[mask], color=color, marker=marker, label=label,
+                                  transform=ccrs.PlateCarree(), zorder=3))
+    return artists
+
+def get_cone_extent(positions, margin=5):
+    latitudes = [pos["lat"] for pos in positions]
+    longitudes = [pos["lon"] for pos in positions]
+    return [min(longitudes)-margin, max(longitudes)+margin, min(latitudes)-margin, max(latitudes)+margin]
+
+def setup_cone_figure(extent, basemap_cache=BASEMAP_CACHE):
+    """Builds the figure, basemap and gridlines shared by every cone drawn on it."""
+    fig, ax = plt.subplots(subplot_kw={'projection': ccrs.PlateCarree()}, figsize=(12, 10))
+    ax.set_extent(extent, crs=ccrs.PlateCarree())
+    add_basemap(ax, extent, "cone", dpi=150, cachedir=basemap_cache)
+    ax.gridlines(draw_labels=True, linewidth=0.5, linestyle='--', color='gray')
+    ax.set_xlim(extent[0], extent[1])
+    ax.set_ylim(extent[2], extent[3])
+    ax.set_xlabel('Longitude')
+    ax.set_ylabel('Latitude')
+    return fig, ax
+
+def get_cone_title(storm, positions=None):
+    title = f"Hurricane Forecast Cone: {storm['name']} {storm['year']}"
+    if positions:
+        pos = positions[0]
+        title += f" from {pos['month']:02d}/{pos['day']:02d} {pos['hour']:02d}Z"
+    return title
+
+def get_frame_path(output, index):
+    base, ext = os.path.splitext(output)
+    return f"{base}_{index:04d}{ext or '.png'}"
+
+def render_cone_range(job):
+    """Renders the cones starting at each fix in starts on one figure; returns the frame paths."""
+    storm, starts, length, end, extent, basemap_cache, table, output = job
+    fig, ax = setup_cone_figure(extent, basemap_cache)
+    paths = []
+    for start in starts:
+        stop = end if length is None else min(start + length, end)
+        positions = storm["positions"][start:stop]
+        artists = draw_cone(ax, positions, get_cone_radii(storm, start, stop, table))
+        ax.set_title(get_cone_title(storm, positions))
+        ax.legend()
+        paths.append(get_frame_path(output, start))
+        fig.savefig(paths[-1], dpi=150, bbox_inches='tight')
+        for artist in artists:
+            artist.remove()
+    plt.close(fig)
+    return paths
+
+def write_contact_sheet(paths, output, columns=None, thumb_width=480):
+    """Tiles the frames, scaled to thumb_width pixels wide, into a single image."""
+    from PIL import Image
+    columns = columns or int(np.ceil(np.sqrt(len(paths))))
+    thumbs = []
+    for path in paths:
+        with Image.open(path) as image:
+            image = image.convert("RGB")
+            thumbs.append(image.resize((thumb_width, round(image.height * thumb_width / image.width)), Image.LANCZOS))
+    cell_height = max(thumb.height for thumb in thumbs)
+    rows = -(-len(thumbs) // columns)
+    sheet = Image.new("RGB", (columns * thumb_width, rows * cell_height), "white")
+    for i, thumb in enumerate(thumbs):
+        sheet.paste(thumb, ((i % columns) * thumb_width, (i // columns) * cell_height))
+    sheet.save(output)
+
+def generate_cone_batch(storm, args, table=None):
+    """Renders one cone per starting fix, as numbered frames or a contact sheet."""
+    end = min(args.end, len(storm["positions"])) if args.end else len(storm["positions"])
+    starts = list(range(args.start, end))
+    if not starts:
+        print("No positions found for the selected storm.")
+        return
+
+    # wide enough for the largest cone, the one from the first fix
+    first_radii = get_cone_radii(storm, args.start, end if args.length is None else args.start + args.length, table)
+    extent = get_cone_extent(storm["positions"][args.start:end], max(5, max(first_radii) + 1))
+    basemap_cache = None if args.vectorbasemap else args.basemapcache
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        frame_output = os.path.join(tmpdir, "cone.png") if args.sheet else args.output
+        workers = max(1, min(args.workers, len(starts)))
+        chunk = -(-len(starts) // workers)
+        jobs = [(storm, starts[i:i + chunk], args.length, end, extent, basemap_cache, table, frame_output)
+                for i in range(0, len(starts), chunk)]
+        if workers > 1:
+            print(f"Rendering {len(starts)} cones with {workers} workers...")
+            with Pool(workers) as pool:
+                paths = [path for job_paths in pool.map(render_cone_range, jobs) for path in job_paths]
+        else:
+            paths = render_cone_range(jobs[0])
+        count("cones_rendered", len(paths))
+
+        if args.sheet:
+            with stage("sheet"):
+                write_contact_sheet(paths, args.output, args.columns)
+            print(f"Contact sheet of {len(paths)} cones saved to {args.output}")
+        else:
+            print(f"{len(paths)} cones saved to {get_frame_path(args.output, 0).replace('0000', '####')}")
+
 def main():
     parser = argparse.ArgumentParser(description="Generates cone forecast for a cyclone from HURDAT2 data.")
     parser.add_argument("--input", type=str, required=True, help="HURDAT2 input file")
@@ -24,16 +215,35 @@ def main():
     parser.add_argument("--show", action="store_true", help="Shows the plot instead of saving it")
     parser.add_argument("--start", type=int, default=0, help="First index of the cone point")
     parser.add_argument("--end", type=int, help="Final index of the cone point")
+    parser.add_argument("--batch", action="store_true", help="Render one cone for every starting fix from --start to --end")
+    parser.add_argument("--length", type=int, help="With --batch, number of fixes in each cone (default: up to --end)")
+    parser.add_argument("--sheet", action="store_true", help="With --batch, tile the cones into a contact sheet at --output instead of numbered frames")
+    parser.add_argument("--columns", type=int, help="Number of columns of the contact sheet (default: square)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes rendering --batch cones")
+    parser.add_argument("--radii", type=str, default=CONE_RADII_TABLE, help=f"Cone radii table from climatology.py (default: {CONE_RADII_TABLE}); fixed radii are used without one")
+    parser.add_argument("--basemapcache", type=str, default=BASEMAP_CACHE, help=f"Directory of cached basemap rasters (default: {BASEMAP_CACHE})")
+    parser.add_argument("--vectorbasemap", action="store_true", help="Draw Natural Earth features as vectors instead of cached rasters")
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    if args.profile or args.profilehook:
+        start_profile("cone")
+    try:
+        run(args)
+    finally:
+        finish_profile(args)
 
-    if not os.path.isfile(args.input):
+def run(args):
+    if not input_exists(args.input):
         print(f"Entry file not found: {args.input}")
         sys.exit(1)
 
-    storms = read_stormdata_hurdat2(args.input)
+    with stage("parse"):
+        storms = read_stormdata_hurdat2(args.input)
     if not storms:
         print("No storms found in the provided HURDAT2 file.")
         sys.exit(1)
+    count("storms_parsed", len(storms))
+    count("fixes_parsed", sum(len(s["positions"]) for s in storms))
 
     storm = None
     if args.id:
@@ -52,122 +262,43 @@ def main():
     if not storm:
         print("No cyclone found with the provided ID or name.")
         sys.exit(1)
+    count("storms_filtered", 1)
 
-    positions = storm["positions"][args.start:args.end] if args.end else storm["positions"][args.start:]
+    with stage("radii"):
+        table = load_cone_radii(args.radii)
+
+    if args.batch:
+        with stage("batch"):
+            generate_cone_batch(storm, args, table)
+        return
+
+    # --end 0, like no --end, runs to the last fix
+    stop = args.end or None
+    positions = storm["positions"][args.start:stop]
     if not positions:
         print("No positions found for the selected storm.")
         sys.exit(1)
 
-    latitudes = [pos["lat"] for pos in positions]
-    longitudes = [pos["lon"] for pos in positions]
-    forecast_winds = [pos["wind"] for pos in positions]
-    num_points = len(latitudes)
-
-    cone_radius = generate_cone_radius(num_points)
-
-    fig, ax = plt.subplots(subplot_kw={'projection': ccrs.PlateCarree()}, figsize=(12, 10))
-    ax.add_feature(cfeature.COASTLINE, linewidth=0.5)
-    ax.add_feature(cfeature.BORDERS, linewidth=0.5)
-    ax.add_feature(cfeature.LAND, facecolor='lightgray')
-    ax.add_feature(cfeature.OCEAN, facecolor='lightblue')
-    ax.gridlines(draw_labels=True, linewidth=0.5, linestyle='--', color='gray')
+    cone_radius = get_cone_radii(storm, args.start, stop, table)
+    with stage("setup"):
+        fig, ax = setup_cone_figure(get_cone_extent(positions, max(5, max(cone_radius) + 1)),
+                                    None if args.vectorbasemap else args.basemapcache)
+    with stage("draw"):
+        draw_cone(ax, positions, cone_radius)
+        ax.set_title(get_cone_title(storm))
+        ax.legend()
+    count_artists(ax)
 
-    plt.plot(longitudes, latitudes, 'w-', label='TC Path')
-
-    count = 9
-    dupl = []
-    for i in range(num_points):
-        wind = forecast_winds[i]
-        if wind < 0: #Non-tropical points
-            circle = plt.Circle((longitudes[i], latitudes[i]), cone_radius[i], color='w', alpha=0.2, transform=ccrs.PlateCarree())
-            count = -2
-            if count not in dupl:
-                plt.scatter(longitudes[i], latitudes[i], color='w', marker='*', label='Not Tropical')
-                dupl.append(count)
-            else:
-                plt.scatter(longitudes[i], latitudes[i], color='w', marker='*')
-            ax.add_patch(circle)
-        elif wind >= 140: #C5
-            circle = plt.Circle((longitudes[i], latitudes[i]), cone_radius[i], color='m', alpha=0.2, transform=ccrs.PlateCarree())
-            count = 5
-            if count not in dupl:
-                plt.scatter(longitudes[i], latitudes[i], color='m', marker='o', label='Category 5')
-                dupl.append(count)
-            else:
-                plt.scatter(longitudes[i], latitudes[i], color='m', marker='o')
-            ax.add_patch(circle)
-        elif wind >= 115: #C4
-            circle = plt.Circle((longitudes[i], latitudes[i]), cone_radius[i], color='r', alpha=0.2, transform=ccrs.PlateCarree())
-            count = 4
-            if count not in dupl:
-                plt.scatter(longitudes[i], latitudes[i], color='r', marker='o', label='Category 4')
-                dupl.append(count)
-            else:
-                plt.scatter(longitudes[i], latitudes[i], color='r', marker='o')
-            ax.add_patch(circle)
-        elif wind >= 100: #C3
-            circle = plt.Circle((longitudes[i], latitudes[i]), cone_radius[i], color='#ff5908', alpha=0.2, transform=ccrs.PlateCarree())
-            count = 3
-            if count not in dupl:
-                plt.scatter(longitudes[i], latitudes[i], color='#ff5908', marker='o', label='Category 3')
-                dupl.append(count)
-            else:
-                plt.scatter(longitudes[i], latitudes[i], color='#ff5908', marker='o')
-            ax.add_patch(circle)
-        elif wind >= 85: #C2
-            circle = plt.Circle((longitudes[i], latitudes[i]), cone_radius[i], color='#ffaa00', alpha=0.2, transform=ccrs.PlateCarree())
-            count = 2
-            if count not in dupl:
-                plt.scatter(longitudes[i], latitudes[i], color='#ffaa00', marker='o', label='Category 2')
-                dupl.append(count)
-            else:
-                plt.scatter(longitudes[i], latitudes[i], color='#ffaa00', marker='o')
-            ax.add_patch(circle)
-        elif wind >= 65: #C1
-            circle = plt.Circle((longitudes[i], latitudes[i]), cone_radius[i], color='#ffff00', alpha=0.2, transform=ccrs.PlateCarree())
-            count = 1
-            if count not in dupl:
-                plt.scatter(longitudes[i], latitudes[i], color='#ffff00', marker='o', label='Category 1')
-                dupl.append(count)
-            else:
-                plt.scatter(longitudes[i], latitudes[i], color='#ffff00', marker='o')
-            ax.add_patch(circle)
-        elif wind >= 35: #TS
-            circle = plt.Circle((longitudes[i], latitudes[i]), cone_radius[i], color='g', alpha=0.2, transform=ccrs.PlateCarree())
-            count = 0
-            if count not in dupl:
-                plt.scatter(longitudes[i], latitudes[i], color='g', marker='o', label='Tropical storm')
-                dupl.append(count)
-            else:
-                plt.scatter(longitudes[i], latitudes[i], color='g', marker='o')
-            ax.add_patch(circle)
-        else: #TD
-            circle = plt.Circle((longitudes[i], latitudes[i]), cone_radius[i], color='b', alpha=0.2, transform=ccrs.PlateCarree())
-            count = -1
-            if count not in dupl: 
-                plt.scatter(longitudes[i], latitudes[i], color='b', marker='o', label='Tropical depression')
-                dupl.append(count)
-            else:
-                plt.scatter(longitudes[i], latitudes[i], color='b', marker='o')
-            ax.add_patch(circle)
-
-    ax.set_xlim(min(longitudes)-5, max(longitudes)+5)
-    ax.set_ylim(min(latitudes)-5, max(latitudes)+5)
-
-    plt.xlabel('Longitude')
-    plt.ylabel('Latitude')
-    plt.title(f"Hurricane Forecast Cone: {storm['name']} {storm['year']}")
-    plt.legend()
-
-    os.makedirs(os.path.dirname(args.output), exist_ok=True)
-    plt.savefig(args.output, dpi=150, bbox_inches='tight')
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with stage("save"):
+        fig.savefig(args.output, dpi=150, bbox_inches='tight')
     print(f"Map generated and saved to {args.output}")
 
-    plt.grid(True)
+    ax.grid(True)
     if args.show:
         plt.show()
     else:
         plt.close(fig)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,234 @@
+import csv
+import gzip
+import json
+import os
+from xml.sax.saxutils import escape
+
+from track import build_parser, get_inputs, iter_input, filter_storms
+from inputs import input_exists
+
+EXPORT_FORMATS = ["geojson", "csv", "kml"]
+EXTENSIONS = {".geojson": "geojson", ".json": "geojson", ".csv": "csv", ".kml": "kml"}
+
+CSV_COLUMNS = ["basin", "id", "name", "storm_year", "time", "year", "month", "day", "hour",
+               "lat", "lon", "wind", "pres", "type", "speed", "heading"]
+
+def get_export_format(path):
+    """Returns the export format named by an output path's extension, ignoring a trailing .gz."""
+    root, ext = os.path.splitext(path.lower())
+    if ext == ".gz":
+        ext = os.path.splitext(root)[1]
+    return EXTENSIONS.get(ext)
+
+def get_fix_time(storm, pos):
+    """Returns the fix time as an ISO 8601 string, or None for formats without dates."""
+    year = pos.get("year") or storm.get("year")
+    if not year or "month" not in pos:
+        return None
+    return f"{year:04d}-{pos['month']:02d}-{pos['day']:02d}T{pos['hour']:02d}:00:00Z"
+
+def get_fix_properties(storm, pos):
+    # formats without years store 0, which is exported as missing like the time
+    return {
+        "basin": storm.get("basin"),
+        "id": storm["id"],
+        "name": storm["name"],
+        "storm_year": storm.get("year") or None,
+        "time": get_fix_time(storm, pos),
+        "year": pos.get("year") or storm.get("year") or None,
+        "month": pos.get("month"),
+        "day": pos.get("day"),
+        "hour": pos.get("hour"),
+        "lat": pos["lat"],
+        "lon": pos["lon"],
+        "wind": pos["wind"],
+        "pres": pos["pres"],
+        "type": pos.get("type"),
+        "speed": round(pos["speed"], 1) if pos.get("speed") is not None else None,
+        "heading": round(pos["heading"], 1) if pos.get("heading") is not None else None,
+    }
+
+def split_at_antimeridian(coords):
+    """Splits [lon, lat] pairs into parts that never cross 180 degrees, as RFC 7946 asks of GeoJSON lines."""
+    parts = [[coords[0]]]
+    for (lon1, lat1), (lon2, lat2) in zip(coords, coords[1:]):
+        if abs(lon2 - lon1) > 180:
+            edge = 180.0 if lon1 > 0 else -180.0
+            shifted = lon2 + (360 if lon1 > 0 else -360)
+            lat = lat1 + (lat2 - lat1) * (edge - lon1) / (shifted - lon1)
+            parts[-1].append([edge, lat])
+            parts.append([[-edge, lat]])
+        parts[-1].append([lon2, lat2])
+    return parts
+
+def get_storm_feature(storm):
+    """Returns the storm's track as a GeoJSON LineString (MultiLineString across the antimeridian) feature."""
+    coords = [[pos["lon"], pos["lat"]] for pos in storm["positions"]]
+    parts = split_at_antimeridian(coords) if len(coords) > 1 else [coords * 2]
+    geometry = ({"type": "LineString", "coordinates": parts[0]} if len(parts) == 1
+                else {"type": "MultiLineString", "coordinates": parts})
+    winds = [pos["wind"] for pos in storm["positions"]]
+    pressures = [pos["pres"] for pos in storm["positions"] if pos["pres"]]
+    times = [get_fix_time(storm, pos) for pos in storm["positions"]]
+    properties = {
+        "basin": storm.get("basin"),
+        "id": storm["id"],
+        "name": storm["name"],
+        "year": storm.get("year") or None,
+        "start": times[0],
+        "end": times[-1],
+        "fixes": len(coords),
+        "max_wind": max(winds),
+        "min_pres": min(pressures) if pressures else None,
+    }
+    return {"type": "Feature", "geometry": geometry, "properties": properties}
+
+def get_fix_feature(storm, pos):
+    properties = get_fix_properties(storm, pos)
+    if "radii" in pos:
+        properties["radii"] = {str(threshold): radii for threshold, radii in pos["radii"].items()}
+    return {"type": "Feature", "geometry": {"type": "Point", "coordinates": [pos["lon"], pos["lat"]]},
+            "properties": properties}
+
+class GeoJSONWriter:
+    """Writes a FeatureCollection one feature at a time."""
+
+    def __init__(self, file, geometry="lines"):
+        self.file = file
+        self.geometry = geometry
+        self.first = True
+        file.write('{"type": "FeatureCollection", "features": [\n')
+
+    def write_feature(self, feature):
+        if not self.first:
+            self.file.write(",\n")
+        self.file.write(json.dumps(feature, separators=(",", ":")))
+        self.first = False
+
+    def write_storm(self, storm):
+        if self.geometry in ("lines", "both"):
+            self.write_feature(get_storm_feature(storm))
+        if self.geometry in ("points", "both"):
+            for pos in storm["positions"]:
+                self.write_feature(get_fix_feature(storm, pos))
+
+    def close(self):
+        self.file.write("\n]}\n")
+
+class CSVWriter:
+    """Writes one row per fix."""
+
+    def __init__(self, file, geometry="points"):
+        self.writer = csv.writer(file)
+        self.writer.writerow(CSV_COLUMNS)
+
+    def write_storm(self, storm):
+        for pos in storm["positions"]:
+            properties = get_fix_properties(storm, pos)
+            self.writer.writerow(["" if properties[column] is None else properties[column] for column in CSV_COLUMNS])
+
+    def close(self):
+        pass
+
+class KMLWriter:
+    """Writes a KML document with a track Placemark per storm and, optionally, one per fix."""
+
+    def __init__(self, file, geometry="lines"):
+        self.file = file
+        self.geometry = geometry
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                   '<kml xmlns="http://www.opengis.net/kml/2.2">\n<Document>\n')
+
+    def write_storm(self, storm):
+        name = escape(f"{storm['name']} {storm.get('year') or ''}".strip())
+        self.file.write(f"<Folder><name>{name}</name>\n")
+        if self.geometry in ("lines", "both"):
+            coords = " ".join(f"{pos['lon']},{pos['lat']},0" for pos in storm["positions"])
+            self.file.write(f"<Placemark><name>{name}</name><LineString><tessellate>1</tessellate>"
+                            f"<coordinates>{coords}</coordinates></LineString></Placemark>\n")
+        if self.geometry in ("points", "both"):
+            for pos in storm["positions"]:
+                time = get_fix_time(storm, pos)
+                stamp = f"<TimeStamp><when>{time}</when></TimeStamp>" if time else ""
+                description = escape(f"{pos['wind']} kt, {pos['pres']} hPa, {pos.get('type', '')}")
+                self.file.write(f"<Placemark><name>{escape(time or '')}</name>{stamp}<description>{description}</description>"
+                                f"<Point><coordinates>{pos['lon']},{pos['lat']},0</coordinates></Point></Placemark>\n")
+        self.file.write("</Folder>\n")
+
+    def close(self):
+        self.file.write("</Document>\n</kml>\n")
+
+WRITERS = {"geojson": GeoJSONWriter, "csv": CSVWriter, "kml": KMLWriter}
+
+def open_output(path, compress):
+    """Opens path for writing text, gzip-compressing on the fly when asked."""
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+def export_storms(storms, path, export_format, geometry="lines", compress=None):
+    """Streams storms into path in export_format; returns the number of storms written.
+
+    storms may be any iterable, such as a generator straight from the
+    readers: each storm is written and let go before the next is taken.
+    The file is written under a temporary name and moved into place when
+    complete. compress defaults to whether path ends in .gz.
+    """
+    if compress is None:
+        compress = path.lower().endswith(".gz")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    written = 0
+    try:
+        with open_output(tmp_path, compress) as f:
+            writer = WRITERS[export_format](f, geometry)
+            for storm in storms:
+                if storm["positions"]:
+                    writer.write_storm(storm)
+                    written += 1
+            writer.close()
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return written
+
+def iter_filtered_storms(args):
+    """Yields the storms of every --input that pass the track.py filters, one at a time."""
+    for entry in get_inputs(args):
+        for path, fmt in entry:
+            if not input_exists(path):
+                print(f"Error: Input file '{path}' not found.")
+                continue
+            if fmt is None:
+                print(f"Error: Could not detect the format of '{path}'; please specify --format.")
+                continue
+            for storm in iter_input(path, fmt, args.skipasynoptic):
+                if filter_storms([storm], args):
+                    yield storm
+
+def main():
+    parser = build_parser()
+    parser.description = "Export parsed tracks to GeoJSON, CSV or KML"
+    parser.set_defaults(output=None)
+    parser.add_argument("--to", type=str, choices=EXPORT_FORMATS, help="Export format (default: from the --output extension, e.g. .geojson, .csv, .kml, optionally with .gz)")
+    parser.add_argument("--geometry", type=str, default="lines", choices=["lines", "points", "both"], help="Write a line per storm, a point per fix, or both (GeoJSON and KML; CSV always has a row per fix)")
+    parser.add_argument("--gzip", action="store_true", help="Gzip the output on the fly (implied by an --output ending in .gz)")
+    args = parser.parse_args()
+
+    if not args.input or not args.output:
+        print("Please specify --input and --output.")
+        return
+    export_format = args.to or get_export_format(args.output)
+    if export_format is None:
+        print(f"Cannot tell the export format from '{args.output}'; please specify --to.")
+        return
+    if args.dedupe:
+        print("--dedupe needs every storm in memory and is not applied to streamed exports.")
+
+    compress = args.gzip or args.output.lower().endswith(".gz")
+    written = export_storms(iter_filtered_storms(args), args.output, export_format, args.geometry, compress)
+    print(f"Exported {written} storms to {args.output}")
+
+if __name__ == "__main__":
+    main()
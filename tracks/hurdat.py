@@ -1,24 +1,26 @@
-import os
+from inputs import open_input, input_exists, get_input_name
 
 def read_stormdata_hurdat(file_path):
-    storms = []
-    
-    if not os.path.exists(file_path):
-        print(f"Zoinks! File {file_path} not found!")
-        return storms
-        
+    if not input_exists(file_path):
+        print(f"Zoinks! File {get_input_name(file_path)} not found!")
+        return []
+    storms = list(iter_stormdata_hurdat(file_path))
+    print(f"Processed {len(storms)} storms from file {get_input_name(file_path)}")
+    return storms
+
+def iter_stormdata_hurdat(file_path):
+    """Yields the storms of a HURDAT file one at a time, as they are parsed."""
     try:
-        with open(file_path, 'r') as file:
-            lines = file.readlines()
+        with open_input(file_path) as file:
             storm = None
-            for line in lines:
+            for line in file:
                 line = line.strip()
                 if not line:
                     continue
                     
                 if '/' in line and len(line) > 35:  # header line
                     if storm is not None:
-                        storms.append(storm)
+                        yield storm
                     
                     # extract 
                     parts = line.split(',')
@@ -93,12 +95,9 @@ def read_stormdata_hurdat(file_path):
                     storm['positions'].append(pos)
                     
             if storm is not None:
-                storms.append(storm)
+                yield storm
     except Exception as e:
         print(f"Error processing file: {e}")
-    
-    print(f"Processed {len(storms)} storms from file {file_path}")
-    return storms
 
 def map_storm_type(type_code):
     tropical_codes = ['HU', 'TS', 'TD']
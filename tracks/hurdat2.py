@@ -1,4 +1,4 @@
-import os
+from inputs import open_input, input_exists, get_input_name
 
 TYPE_MAPPINGS = {
     'HU': 'TROPICAL', 'TS': 'TROPICAL', 'TD': 'TROPICAL',
@@ -8,23 +8,20 @@ TYPE_MAPPINGS = {
 }
 
 def read_stormdata_hurdat2(file_path, skipasynoptic=True):
-    storms = []
-    
-    if not os.path.exists(file_path):
-        print(f"File {file_path} not found!")
-        return storms
-        
+    if not input_exists(file_path):
+        print(f"File {get_input_name(file_path)} not found!")
+        return []
+    storms = list(iter_stormdata_hurdat2(file_path, skipasynoptic))
+    print(f"Processed {len(storms)} storms from {get_input_name(file_path)}")
+    return storms
+
+def iter_stormdata_hurdat2(file_path, skipasynoptic=True):
+    """Yields the storms of a HURDAT2 file one at a time, as they are parsed."""
     try:
-        with open(file_path, 'r') as file:
-            lines = file.readlines()
-            
+        with open_input(file_path) as file:
             storm = None
-            i = 0
-            total_lines = len(lines)
-            
-            while i < total_lines:
-                line = lines[i].strip()
-                i += 1
+            for line in file:
+                line = line.strip()
                 
                 if not line:
                     continue
@@ -35,7 +32,7 @@ def read_stormdata_hurdat2(file_path, skipasynoptic=True):
                         continue
                     
                     if storm is not None and storm["positions"]:
-                        storms.append(storm)
+                        yield storm
                     
                     storm_id = parts[0].strip()
                     storm_name = parts[1].strip()
@@ -47,6 +44,7 @@ def read_stormdata_hurdat2(file_path, skipasynoptic=True):
                         "id": numeric_id,
                         "name": storm_name,
                         "year": year,
+                        "basin": storm_id[0:2],
                         "positions": []
                     }
                 
@@ -101,13 +99,10 @@ def read_stormdata_hurdat2(file_path, skipasynoptic=True):
                     storm["positions"].append(pos)
             
             if storm is not None and storm["positions"]:
-                storms.append(storm)
+                yield storm
     
     except Exception as e:
         print(f"Error processing file: {e}")
-    
-    print(f"Processed {len(storms)} storms from {file_path}")
-    return storms
 
 def map_storm_type(type_code):
     return TYPE_MAPPINGS.get(type_code.upper(), 'UNKNOWN')
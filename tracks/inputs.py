@@ -0,0 +1,113 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import zipfile
+from contextlib import contextmanager
+
+# single-file compressions, by extension; each opener streams the decompressed bytes
+COMPRESSED_OPENERS = {
+    ".gz": gzip.GzipFile,
+    ".bz2": bz2.BZ2File,
+    ".xz": lzma.LZMAFile,
+}
+
+def split_archive_path(path):
+    """Splits "archive.zip/member" into (archive, member), with "" for a whole archive; None for other paths."""
+    path = os.fspath(path)
+    if path.lower().endswith(".zip"):
+        return path, ""
+    lowered = path.lower().replace(os.sep, "/")
+    start = 0
+    while True:
+        index = lowered.find(".zip/", start)
+        if index < 0:
+            return None
+        archive = path[:index + 4]
+        if os.path.isfile(archive):
+            return archive, path[index + 5:].replace(os.sep, "/")
+        start = index + 1
+
+def get_zip_members(archive, member):
+    """Returns the file members of an open zip named member, or under the directory member, in name order."""
+    names = [info.filename for info in archive.infolist() if not info.is_dir()]
+    if member in names:
+        return [member]
+    prefix = member.rstrip("/") + "/" if member else ""
+    return sorted(name for name in names if name.startswith(prefix))
+
+def input_exists(source):
+    """Returns True when source is an open file or line iterable, or names an existing file or zip member."""
+    if not isinstance(source, (str, os.PathLike)):
+        return True
+    archive = split_archive_path(source)
+    if archive is None:
+        return os.path.isfile(source)
+    if not os.path.isfile(archive[0]):
+        return False
+    try:
+        with zipfile.ZipFile(archive[0]) as zf:
+            return bool(get_zip_members(zf, archive[1]))
+    except zipfile.BadZipFile:
+        return False
+
+def get_input_stat(path):
+    """Returns os.stat of the file holding path, the archive itself for zip members."""
+    archive = split_archive_path(path)
+    return os.stat(archive[0] if archive else path)
+
+def decompress_stream(name, raw):
+    """Wraps a binary stream in the decompressor its name's extension asks for, if any."""
+    opener = COMPRESSED_OPENERS.get(os.path.splitext(name)[1].lower())
+    return opener(fileobj=raw) if opener is gzip.GzipFile else opener(raw) if opener else raw
+
+def iter_zip_lines(path, member, encoding=None):
+    with zipfile.ZipFile(path) as zf:
+        members = get_zip_members(zf, member)
+        if not members:
+            raise FileNotFoundError(f"No member '{member}' in {path}")
+        for name in members:
+            with zf.open(name) as raw:
+                with io.TextIOWrapper(decompress_stream(name, raw), encoding=encoding) as text:
+                    yield from text
+
+@contextmanager
+def open_input(source, encoding=None):
+    """Opens a best-track input as an iterable of text lines, decompressing as it is read.
+
+    source is a plain, .gz, .bz2 or .xz path; a .zip archive, whose file
+    members are read one after another in name order; a member or
+    directory inside one as "archive.zip/member"; an open text or binary
+    file; or any iterable of lines. Nothing is extracted to disk.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        archive = split_archive_path(source)
+        if archive is not None:
+            lines = iter_zip_lines(archive[0], archive[1], encoding)
+            try:
+                yield lines
+            finally:
+                lines.close()
+            return
+        raw = open(source, "rb")
+        try:
+            with io.TextIOWrapper(decompress_stream(os.fspath(source), raw), encoding=encoding) as text:
+                yield text
+        finally:
+            raw.close()
+    elif isinstance(source, (io.RawIOBase, io.BufferedIOBase)):
+        text = io.TextIOWrapper(source, encoding=encoding)
+        try:
+            yield text
+        finally:
+            # leave the caller's file open
+            text.detach()
+    else:
+        yield source
+
+def get_input_name(source):
+    """Names an input for messages."""
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    return getattr(source, "name", "<stream>")
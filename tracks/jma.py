@@ -1,11 +1,13 @@
-import os
+from inputs import open_input
 
 def read_stormdata_jma(file_path, skipasynoptic):
-    storms = []
-    with open(file_path, 'r') as file:
-        lines = file.readlines()
+    return list(iter_stormdata_jma(file_path, skipasynoptic))
+
+def iter_stormdata_jma(file_path, skipasynoptic):
+    """Yields the storms of a JMA file one at a time, as they are parsed."""
+    with open_input(file_path) as file:
         storm = None
-        for line in lines:
+        for line in file:
             line = line.strip()
             if not line:
                 continue
@@ -14,7 +16,7 @@ def read_stormdata_jma(file_path, skipasynoptic):
                 continue
             if tokens[0] == "66666":
                 if storm is not None:
-                    storms.append(storm)
+                    yield storm
                 storm = {
                     'id': int(tokens[1]) % 100,
                     'year': get_full_year(int(tokens[1]) // 100),
@@ -26,8 +28,7 @@ def read_stormdata_jma(file_path, skipasynoptic):
                 if pos:
                     storm['positions'].append(pos)
         if storm is not None:
-            storms.append(storm)
-    return storms
+            yield storm
 
 def get_full_year(two_digit_date):
     if two_digit_date > 50:
@@ -42,7 +43,7 @@ def parse_position(tokens, skipasynoptic):
         'day': (int(tokens[0]) % 10000) // 100,
         'hour': int(tokens[0]) % 100,
         'lat': int(tokens[3]) / 10.0,
-        'lon': -int(tokens[4]) / 10.0,
+        'lon': wrap_longitude(int(tokens[4]) / 10.0),
         'wind': int(tokens[6]),
         'pres': int(tokens[5]),
         'type': get_storm_type(int(tokens[2]))
@@ -51,6 +52,10 @@ def parse_position(tokens, skipasynoptic):
         return None
     return pos
 
+def wrap_longitude(lon):
+    # JMA longitudes are degrees east, up to 360
+    return round(lon - 360, 1) if lon > 180 else lon
+
 def get_storm_type(stormtype):
     if stormtype == 6:
         return 'EXTRATROPICAL'
@@ -0,0 +1,211 @@
+import csv
+import os
+
+import numpy as np
+
+from track import build_parser, read_sources, filter_storms
+from climatology import get_fix_hours, great_circle_nmi
+
+# defaults for deciding that two storms are the same system
+MATCH_RADIUS = 100.0
+MATCH_TOLERANCE = 3.0
+MATCH_MIN_FIXES = 2
+MATCH_MIN_RATIO = 0.5
+
+PAIR_COLUMNS = ["left_input", "left_storm", "right_input", "right_storm", "time",
+                "left_lat", "left_lon", "left_wind", "left_pres",
+                "right_lat", "right_lon", "right_wind", "right_pres",
+                "distance_nmi", "wind_diff", "pres_diff"]
+
+def get_absolute_hours(storm):
+    """Returns the fix times in hours since 1970, or None when the storm's fixes carry no dates."""
+    positions = storm["positions"]
+    try:
+        first = positions[0]
+        year = int(storm.get("year") or first.get("year"))
+        start = np.datetime64(f"{year:04d}-{first['month']:02d}-{first['day']:02d}T{first['hour']:02d}", "h")
+        return start.astype(float) + get_fix_hours(storm)
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+def format_hours(hours):
+    return str(np.datetime64(int(hours), "h")).replace("T", " ") + "Z"
+
+def get_storm_label(storm):
+    return f"{storm.get('basin', '')}{storm['id']} {storm['name']} {storm.get('year', '')}".strip()
+
+class FixIndex:
+    """The dated fixes of a storm collection, bucketed by time for matching storms from other sources.
+
+    A lookup only visits the buckets within the time tolerance of each
+    fix, then keeps the fixes within the distance radius, so matching a
+    storm costs its own fixes times the fixes active at the same time
+    rather than the whole collection.
+    """
+
+    def __init__(self, storms, bucket_hours=6.0):
+        self.storms = storms
+        self.bucket_hours = bucket_hours
+        index, hours, lats, lons, spans = [], [], [], [], []
+        for i, storm in enumerate(storms):
+            fix_hours = get_absolute_hours(storm)
+            if fix_hours is None:
+                spans.append((np.inf, -np.inf))
+                continue
+            index.append(np.full(len(fix_hours), i))
+            hours.append(fix_hours)
+            lats.append(np.array([pos["lat"] for pos in storm["positions"]], dtype=float))
+            lons.append(np.array([pos["lon"] for pos in storm["positions"]], dtype=float))
+            spans.append((fix_hours.min(), fix_hours.max()))
+        self.index, self.hours, self.lats, self.lons = [np.concatenate(a) if a else np.array([])
+                                                        for a in (index, hours, lats, lons)]
+        self.index = self.index.astype(int)
+        self.spans = np.array(spans).reshape(-1, 2)
+
+        buckets = np.floor(self.hours / bucket_hours).astype(np.int64)
+        order = np.argsort(buckets, kind="stable")
+        keys, starts = np.unique(buckets[order], return_index=True)
+        self.buckets = dict(zip(keys.tolist(), np.split(order, starts[1:])))
+
+    def lookup(self, hours, lats, lons, tolerance, radius):
+        """Returns (query fix, indexed fix, distance in nmi) arrays for every pair within tolerance hours and radius nmi."""
+        query, found = [], []
+        for k, hour in enumerate(hours):
+            first = int(np.floor((hour - tolerance) / self.bucket_hours))
+            last = int(np.floor((hour + tolerance) / self.bucket_hours))
+            for bucket in range(first, last + 1):
+                fixes = self.buckets.get(bucket)
+                if fixes is not None:
+                    query.append(np.full(len(fixes), k))
+                    found.append(fixes)
+        if not query:
+            return np.array([], dtype=int), np.array([], dtype=int), np.array([])
+        query, found = np.concatenate(query), np.concatenate(found)
+        near_time = np.abs(self.hours[found] - hours[query]) <= tolerance
+        query, found = query[near_time], found[near_time]
+        distances = great_circle_nmi(lats[query], lons[query], self.lats[found], self.lons[found])
+        near = distances <= radius
+        return query[near], found[near], distances[near]
+
+    def match(self, storm, radius=MATCH_RADIUS, tolerance=MATCH_TOLERANCE, min_fixes=MATCH_MIN_FIXES,
+              min_ratio=MATCH_MIN_RATIO):
+        """Returns (indexed storm, matched fixes, ratio, mean distance in nmi) for every storm that is the same system, best first.
+
+        A fix matches when an indexed storm has a fix within tolerance hours
+        and radius nmi of it; ratio is the share of the storm's fixes inside
+        the other storm's lifetime that match.
+        """
+        hours = get_absolute_hours(storm)
+        if hours is None or not len(self.hours):
+            return []
+        lats = np.array([pos["lat"] for pos in storm["positions"]], dtype=float)
+        lons = np.array([pos["lon"] for pos in storm["positions"]], dtype=float)
+        query, found, distances = self.lookup(hours, lats, lons, tolerance, radius)
+
+        matches = []
+        for candidate in np.unique(self.index[found]):
+            mine = self.index[found] == candidate
+            matched = len(np.unique(query[mine]))
+            start, end = self.spans[candidate]
+            overlap = np.count_nonzero((hours >= start - tolerance) & (hours <= end + tolerance))
+            ratio = matched / max(1, overlap)
+            if matched >= min_fixes and ratio >= min_ratio:
+                matches.append((int(candidate), matched, ratio, float(distances[mine].mean())))
+        matches.sort(key=lambda match: (-match[1], match[3]))
+        return matches
+
+def dedupe_storms(sources, **options):
+    """Merges storm lists from several sources, keeping each system once.
+
+    Sources are in priority order: a storm from a later source is dropped
+    when it matches one already kept (see FixIndex.match). Returns the
+    kept storms and (dropped storm, kept storm) pairs.
+    """
+    kept = list(sources[0]) if sources else []
+    duplicates = []
+    for source in sources[1:]:
+        index = FixIndex(kept)
+        added = []
+        for storm in source:
+            matches = index.match(storm, **options)
+            if matches:
+                duplicates.append((storm, kept[matches[0][0]]))
+            else:
+                added.append(storm)
+        kept.extend(added)
+    return kept, duplicates
+
+def align_fixes(left, right, tolerance=MATCH_TOLERANCE):
+    """Pairs every fix of left with the fix of right nearest in time, within tolerance hours.
+
+    Returns (time in hours since 1970, left fix, right fix, distance in nmi) tuples.
+    """
+    left_hours, right_hours = get_absolute_hours(left), get_absolute_hours(right)
+    if left_hours is None or right_hours is None:
+        return []
+    pairs = []
+    for hour, pos in zip(left_hours, left["positions"]):
+        nearest = int(np.argmin(np.abs(right_hours - hour)))
+        if abs(right_hours[nearest] - hour) > tolerance:
+            continue
+        other = right["positions"][nearest]
+        distance = float(great_circle_nmi(pos["lat"], pos["lon"], other["lat"], other["lon"]))
+        pairs.append((hour, pos, other, distance))
+    return pairs
+
+def match_sources(sources, **options):
+    """Matches every storm of the later sources against the first; returns (left storm, right source index, right storm, match) tuples."""
+    index = FixIndex(sources[0])
+    matches = []
+    for number, source in enumerate(sources[1:], start=1):
+        for storm in source:
+            found = index.match(storm, **options)
+            if found:
+                matches.append((sources[0][found[0][0]], number, storm, found[0]))
+    return matches
+
+def write_pairs(path, matches, inputs, tolerance=MATCH_TOLERANCE):
+    """Writes the aligned fixes of every matched pair of storms as CSV rows."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    rows = 0
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(PAIR_COLUMNS)
+        for left, number, right, match in matches:
+            for hour, pos, other, distance in align_fixes(left, right, tolerance):
+                writer.writerow([inputs[0], get_storm_label(left), inputs[number], get_storm_label(right),
+                                 format_hours(hour), pos["lat"], pos["lon"], pos["wind"], pos["pres"],
+                                 other["lat"], other["lon"], other["wind"], other["pres"], round(distance, 1),
+                                 other["wind"] - pos["wind"], other["pres"] - pos["pres"]])
+                rows += 1
+    return rows
+
+def main():
+    parser = build_parser()
+    parser.description = "Match storms across best-track sources and compare their fixes"
+    parser.add_argument("--radius", type=float, default=MATCH_RADIUS, help="Maximum distance in nmi between matching fixes")
+    parser.add_argument("--tolerance", type=float, default=MATCH_TOLERANCE, help="Maximum time difference in hours between matching fixes")
+    parser.add_argument("--minfixes", type=int, default=MATCH_MIN_FIXES, help="Matching fixes needed for two storms to be the same system")
+    parser.add_argument("--minratio", type=float, default=MATCH_MIN_RATIO, help="Share of the overlapping fixes that must match")
+    parser.add_argument("--pairs", type=str, help="Write the time-aligned fixes of every matched pair to this CSV file")
+    args = parser.parse_args()
+
+    if not args.input or len(args.input) < 2:
+        print("Please specify at least two --input sources; the first is the reference.")
+        return
+
+    sources = [filter_storms(storms, args) for storms in read_sources(args)]
+    options = {"radius": args.radius, "tolerance": args.tolerance, "min_fixes": args.minfixes, "min_ratio": args.minratio}
+    matches = match_sources(sources, **options)
+    for left, number, right, (candidate, matched, ratio, distance) in matches:
+        print(f"{get_storm_label(right)} ({args.input[number]}) = {get_storm_label(left)}: "
+              f"{matched} fixes, {ratio:.0%} of the overlap, {distance:.0f} nmi apart on average")
+    unmatched = sum(len(source) for source in sources[1:]) - len(matches)
+    print(f"{len(matches)} storm(s) matched the reference, {unmatched} did not.")
+
+    if args.pairs:
+        rows = write_pairs(args.pairs, matches, args.input, args.tolerance)
+        print(f"Wrote {rows} aligned fixes to {args.pairs}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import hashlib
+import math
+
+import numpy as np
+
+# simplified vertex indices by (track fingerprint, tolerance bucket); kept for the life of the process,
+# so server workers, tiles and repeated renders at the same zoom reuse them
+LOD_CACHE = {}
+LOD_CACHE_LIMIT = 100000
+
+def get_tolerance_bucket(tolerance):
+    """Snaps a tolerance down to a power of two, so nearby zoom levels share cached results."""
+    return 2.0 ** math.floor(math.log2(tolerance)) if tolerance > 0 else 0.0
+
+def douglas_peucker(lons, lats, tolerance):
+    """Returns the sorted indices of the vertices Douglas-Peucker keeps at tolerance (in degrees)."""
+    n = len(lons)
+    if n < 3 or tolerance <= 0:
+        return np.arange(n)
+    points = np.column_stack([lons, lats])
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        chord = points[end] - points[start]
+        rel = points[start + 1:end] - points[start]
+        length = math.hypot(chord[0], chord[1])
+        if length == 0:
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dist = np.abs(chord[0] * rel[:, 1] - chord[1] * rel[:, 0]) / length
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return np.nonzero(keep)[0]
+
+def simplify_track(lons, lats, tolerance):
+    """Cached douglas_peucker at the tolerance's bucket."""
+    lons = np.asarray(lons, dtype=float)
+    lats = np.asarray(lats, dtype=float)
+    bucket = get_tolerance_bucket(tolerance)
+    key = (hashlib.sha1(lons.tobytes() + lats.tobytes()).hexdigest(), bucket)
+    indices = LOD_CACHE.get(key)
+    if indices is None:
+        if len(LOD_CACHE) >= LOD_CACHE_LIMIT:
+            LOD_CACHE.clear()
+        indices = LOD_CACHE[key] = douglas_peucker(lons, lats, bucket)
+    return indices
+
+def thin_dots(lons, lats, styles, spacing):
+    """Returns the indices of dots to draw, dropping dots that would sit on an identical one.
+
+    Dots are binned into cells spacing degrees wide; only the first dot of
+    each style (color and marker) in a cell is kept, so every change of
+    category along the track still shows.
+    """
+    n = len(lons)
+    if n < 2 or spacing <= 0:
+        return np.arange(n)
+    cells = np.column_stack([np.floor(np.asarray(lons) / spacing), np.floor(np.asarray(lats) / spacing)]).astype(np.int64)
+    _, style_ids = np.unique(np.array([str(style) for style in styles]), return_inverse=True)
+    keys = np.column_stack([cells, style_ids.reshape(-1)])
+    _, first = np.unique(keys, axis=0, return_index=True)
+    return np.sort(first)
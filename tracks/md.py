@@ -1,17 +1,19 @@
-import os
+from inputs import open_input
 
 def read_stormdata_md(file_path):
-    storms = []
-    with open(file_path, 'r') as file:
-        lines = file.readlines()
+    return list(iter_stormdata_md(file_path))
+
+def iter_stormdata_md(file_path):
+    """Yields the storms of an MD file one at a time, as they are parsed."""
+    with open_input(file_path) as file:
         storm = None
-        for line in lines:
+        for line in file:
             line = line.strip()
             if not line:
                 continue
             if is_header1_line(line):
                 if storm is not None:
-                    storms.append(storm)
+                    yield storm
                 storm = {
                     'id': 1,
                     'name': line.strip(),
@@ -24,8 +26,7 @@ def read_stormdata_md(file_path):
                 pos = parse_position(line)
                 storm['positions'].append(pos)
         if storm is not None:
-            storms.append(storm)
-    return storms
+            yield storm
 
 def is_header1_line(line):
     return line[0].isalpha()
@@ -0,0 +1,74 @@
+import numpy as np
+
+from climatology import get_fix_hours, great_circle_nmi
+
+def get_storm_hours(storm):
+    """Returns fix times in hours, assuming 6-hourly fixes for formats without dates."""
+    try:
+        return get_fix_hours(storm)
+    except (KeyError, TypeError, ValueError):
+        return np.arange(len(storm["positions"])) * 6.0
+
+def get_bearing(lat1, lon1, lat2, lon2):
+    """Initial great-circle bearing in degrees clockwise from north."""
+    lat1, lat2 = np.radians(lat1), np.radians(lat2)
+    # wrapping the difference keeps tracks crossing the dateline going the short way
+    dlon = np.radians((lon2 - lon1 + 180) % 360 - 180)
+    x = np.sin(dlon) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return np.degrees(np.arctan2(x, y)) % 360
+
+def add_motion(storms):
+    """Adds seglen, heading, speed and distance to every fix of every storm.
+
+    seglen is the great-circle distance from the previous fix in nmi,
+    heading the bearing of that segment, speed the forward speed in kt and
+    distance the nmi travelled since the first fix. The first fix of a
+    storm takes its heading and speed from the following segment. All
+    storms are handled at once on the flattened fix arrays.
+    """
+    storms = [storm for storm in storms if storm["positions"]]
+    if not storms:
+        return storms
+    counts = np.array([len(storm["positions"]) for storm in storms])
+    lats = np.array([pos["lat"] for storm in storms for pos in storm["positions"]], dtype=float)
+    lons = np.array([pos["lon"] for storm in storms for pos in storm["positions"]], dtype=float)
+    hours = np.concatenate([get_storm_hours(storm) for storm in storms])
+    first = np.zeros(len(lats), dtype=bool)
+    first[np.cumsum(counts) - counts] = True
+
+    seglen = np.zeros(len(lats))
+    heading = np.zeros(len(lats))
+    speed = np.full(len(lats), np.nan)
+    seglen[1:] = great_circle_nmi(lats[:-1], lons[:-1], lats[1:], lons[1:])
+    heading[1:] = get_bearing(lats[:-1], lons[:-1], lats[1:], lons[1:])
+    dt = np.zeros(len(lats))
+    dt[1:] = np.diff(hours)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        speed[1:] = np.where(dt[1:] > 0, seglen[1:] / dt[1:], np.nan)
+    seglen[first] = 0
+
+    # first fixes borrow the motion of their first segment
+    borrow = first & ~np.r_[first[1:], True]
+    borrow_next = np.nonzero(borrow)[0] + 1
+    heading[borrow] = heading[borrow_next]
+    speed[borrow] = speed[borrow_next]
+    heading[first & ~borrow] = np.nan
+    speed[first & ~borrow] = np.nan
+
+    starts = np.cumsum(counts) - counts
+    distance = np.cumsum(seglen) - np.repeat(np.cumsum(seglen)[starts], counts)
+
+    # plain Python floats (None for unknown), so storms stay JSON-serializable for hashing and caching
+    columns = zip(np.round(seglen, 1).tolist(), np.round(heading, 1).tolist(),
+                  np.round(speed, 1).tolist(), np.round(distance, 1).tolist())
+    for pos, (pos_seglen, pos_heading, pos_speed, pos_distance) in zip(
+            (pos for storm in storms for pos in storm["positions"]), columns):
+        pos["seglen"] = pos_seglen
+        pos["heading"] = None if pos_heading != pos_heading else pos_heading
+        pos["speed"] = None if pos_speed != pos_speed else pos_speed
+        pos["distance"] = pos_distance
+    return storms
+
+def get_max_speed(storm):
+    return max((pos["speed"] for pos in storm["positions"] if pos.get("speed") is not None), default=0)
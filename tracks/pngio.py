@@ -0,0 +1,99 @@
+import os
+import struct
+import zlib
+
+import numpy as np
+from PIL import Image
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+COLOR_TYPES = {1: 0, 3: 2, 4: 6}
+ENCODINGS = ["png", "palette"]
+
+def write_chunk(f, kind, data):
+    f.write(struct.pack(">I", len(data)))
+    f.write(kind)
+    f.write(data)
+    f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)) & 0xffffffff))
+
+def filter_rows(rows):
+    """Applies the PNG Sub filter to a block of uint8 rows; returns the filtered scanlines."""
+    height, width, channels = rows.shape
+    flat = rows.reshape(height, width * channels)
+    filtered = np.empty((height, width * channels + 1), dtype=np.uint8)
+    filtered[:, 0] = 1
+    filtered[:, 1:channels + 1] = flat[:, :channels]
+    filtered[:, channels + 1:] = flat[:, channels:] - flat[:, :-channels]
+    return filtered
+
+class PNGWriter:
+    """Writes a PNG row block by row block, holding only the block being compressed.
+
+    Rows are uint8 arrays of shape (rows, width, channels) with 1 (grey),
+    3 (RGB) or 4 (RGBA) channels; with a palette, 1-channel rows are
+    palette indices. The file appears at path once close() succeeds.
+    """
+
+    def __init__(self, path, width, height, channels=3, palette=None, level=6):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.rows_written = 0
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(self.tmp_path, "wb")
+        self.compressor = zlib.compressobj(level)
+
+        color_type = 3 if palette is not None else COLOR_TYPES[channels]
+        self.file.write(PNG_SIGNATURE)
+        write_chunk(self.file, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0))
+        if palette is not None:
+            write_chunk(self.file, b"PLTE", np.asarray(palette, dtype=np.uint8).reshape(-1)[:768].tobytes())
+
+    def write_rows(self, rows):
+        rows = np.asarray(rows, dtype=np.uint8)
+        if rows.ndim == 2:
+            rows = rows[:, :, None]
+        if rows.shape[1] != self.width or rows.shape[2] != self.channels:
+            raise ValueError(f"Expected rows of {self.width}x{self.channels}, got {rows.shape[1]}x{rows.shape[2]}")
+        rows = rows[:self.height - self.rows_written]
+        data = self.compressor.compress(filter_rows(rows).tobytes())
+        if data:
+            write_chunk(self.file, b"IDAT", data)
+        self.rows_written += len(rows)
+
+    def close(self):
+        try:
+            if self.rows_written != self.height:
+                raise ValueError(f"Only {self.rows_written} of {self.height} rows were written")
+            write_chunk(self.file, b"IDAT", self.compressor.flush())
+            write_chunk(self.file, b"IEND", b"")
+            self.file.close()
+            os.replace(self.tmp_path, self.path)
+        except Exception:
+            self.file.close()
+            os.remove(self.tmp_path)
+            raise
+
+def quantize(pixels):
+    """Reduces an (height, width, 3 or 4) uint8 array to a 256-color palette image."""
+    img = Image.fromarray(np.ascontiguousarray(pixels[:, :, :3]))
+    return img.quantize(256, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+
+def get_palette(img):
+    """Returns the (colors, 3) palette of a palette image, as PNGWriter takes it."""
+    return np.asarray(img.getpalette()[:768], dtype=np.uint8).reshape(-1, 3)
+
+def write_png(path, pixels, encoding="png", level=6):
+    """Writes an (height, width, 3 or 4) uint8 array as an RGB PNG, or as a 256-color indexed PNG with encoding="palette"."""
+    if encoding == "palette":
+        img = quantize(pixels)
+    else:
+        img = Image.fromarray(np.ascontiguousarray(pixels[:, :, :3]))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    img.save(path, format="PNG", compress_level=level)
+
+def save_figure(fig, path, encoding="png", level=6):
+    """Draws the figure once and writes its Agg buffer as is, without measuring a tight bounding box."""
+    fig.canvas.draw()
+    write_png(path, np.asarray(fig.canvas.buffer_rgba()), encoding, level)
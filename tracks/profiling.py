@@ -0,0 +1,141 @@
+import importlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Unix only; elsewhere the report keeps the traced peaks and leaves maxrss_mb empty
+    resource = None
+
+# functions called with every finished report; --profilehook module:function adds one from the command line
+PROFILE_HOOKS = []
+
+class Profile:
+    """Wall time, CPU time and peak memory of named stages, plus counters, for one run.
+
+    Peak memory is the largest traced Python/NumPy allocation during the
+    stage (nested stages included); maxrss_mb is the process high-water
+    mark when the stage ended, or None where the resource module is missing.
+    """
+
+    def __init__(self, script):
+        self.script = script
+        self.stages = []
+        self.counts = {}
+        self.depth = 0
+        self.peaks = []
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        if self.peaks:
+            self.peaks[-1] = max(self.peaks[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self.peaks.append(0)
+        record = {"stage": name, "depth": self.depth}
+        self.stages.append(record)
+        self.depth += 1
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record["wall_s"] = round(time.perf_counter() - wall, 4)
+            record["cpu_s"] = round(time.process_time() - cpu, 4)
+            peak = max(self.peaks.pop(), tracemalloc.get_traced_memory()[1])
+            record["peak_mb"] = round(peak / 1048576, 2)
+            record["maxrss_mb"] = get_maxrss_mb()
+            self.depth -= 1
+            if self.peaks:
+                self.peaks[-1] = max(self.peaks[-1], peak)
+            tracemalloc.reset_peak()
+
+    def count(self, name, value=1):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def report(self):
+        return {
+            "script": self.script,
+            "argv": sys.argv[1:],
+            "wall_s": round(time.perf_counter() - self.start_wall, 4),
+            "cpu_s": round(time.process_time() - self.start_cpu, 4),
+            "maxrss_mb": get_maxrss_mb(),
+            "stages": self.stages,
+            "counts": self.counts,
+        }
+
+def get_maxrss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(maxrss / (1048576 if sys.platform == "darwin" else 1024), 1)
+
+# the run's profile while --profile is active; stage() and count() do nothing otherwise
+PROFILE = None
+
+def start_profile(script):
+    global PROFILE
+    PROFILE = Profile(script)
+    return PROFILE
+
+@contextmanager
+def stage(name):
+    if PROFILE is None:
+        yield None
+    else:
+        with PROFILE.stage(name) as record:
+            yield record
+
+def count(name, value=1):
+    if PROFILE is not None:
+        PROFILE.count(name, value)
+
+def count_artists(ax):
+    """Counts the artists drawn on an axes, for the artists_drawn counter."""
+    if PROFILE is not None:
+        PROFILE.count("artists_drawn", len(ax.lines) + len(ax.collections) + len(ax.texts)
+                      + len(ax.images) + len(ax.patches))
+
+def load_hook(spec):
+    """Imports the function named by "module:function"."""
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+def add_profile_arguments(parser):
+    parser.add_argument("--profile", type=str, nargs="?", const="-", help="Record per-stage wall time, CPU time and peak memory, and write them as JSON to this file (default: stderr)")
+    parser.add_argument("--profilehook", type=str, action="append", default=[], help="Also pass the profile report to this module:function (repeatable)")
+
+def finish_profile(args):
+    """Writes the active profile where --profile asks and hands it to every hook."""
+    global PROFILE
+    if PROFILE is None:
+        return None
+    report = PROFILE.report()
+    PROFILE = None
+    tracemalloc.stop()
+
+    if args.profile == "-":
+        print(json.dumps(report, indent=2), file=sys.stderr)
+    elif args.profile:
+        os.makedirs(os.path.dirname(args.profile) or ".", exist_ok=True)
+        with open(args.profile, "w") as f:
+            json.dump(report, f, indent=2)
+    hooks = list(PROFILE_HOOKS)
+    for spec in getattr(args, "profilehook", []):
+        try:
+            hooks.append(load_hook(spec))
+        except Exception as e:
+            print(f"Error loading profile hook '{spec}': {str(e)}")
+    for hook in hooks:
+        try:
+            hook(report)
+        except Exception as e:
+            print(f"Profile hook failed: {str(e)}")
+    return report
@@ -0,0 +1,223 @@
+import math
+import os
+
+import numpy as np
+
+from pngio import PNGWriter, quantize, get_palette
+from profiling import stage, count
+from lod import simplify_track, thin_dots
+from track import (get_map_layout, get_fixed_layout, load_background, adjust_positions, calculate_line_width,
+                   calculate_dot_area, get_point_color, get_marker_style)
+
+# matplotlib's figure dpi, so --lines and --dots come out the same size as the regular backend
+DPI = 100
+
+def resample_background(bg_img, lon_min, lon_max, lat_min, lat_max, width, height):
+    """Returns the equirectangular background resampled to a (height, width, 3) float array covering the view.
+
+    The background is first box-averaged by the whole downscale factor,
+    then sampled bilinearly at every output pixel centre; longitudes wrap
+    around the globe.
+    """
+    if bg_img is None:
+        return np.zeros((height, width, 3), dtype=np.float32)
+    img = np.asarray(bg_img)[:, :, :3]
+    full_height, full_width = img.shape[:2]
+
+    rows_per_px = (lat_max - lat_min) / height * full_height / 180.0
+    cols_per_px = (lon_max - lon_min) / width * full_width / 360.0
+    factor = max(1, int(min(rows_per_px, cols_per_px)))
+    # only the rows the view covers are converted and averaged, plus one for the bilinear neighbour
+    row_min = max(0, int((90 - lat_max) * full_height / 180.0) // factor * factor - factor)
+    row_max = min(full_height, (int(math.ceil((90 - lat_min) * full_height / 180.0 / factor)) + 1) * factor)
+    crop = img[row_min:row_max, :full_width // factor * factor]
+    crop = crop[:len(crop) // factor * factor].astype(np.float32)
+    if img.dtype == np.uint8:
+        crop /= 255.0
+    if factor > 1:
+        crop = crop.reshape(len(crop) // factor, factor, -1, 3).mean(axis=1)
+        crop = crop.reshape(len(crop), -1, factor, 3).mean(axis=2)
+    img = crop
+    row_offset = row_min / factor
+    src_height = full_height / factor
+    src_width = full_width / factor
+
+    lons = lon_min + (np.arange(width) + 0.5) / width * (lon_max - lon_min)
+    lats = lat_max - (np.arange(height) + 0.5) / height * (lat_max - lat_min)
+    x = ((lons + 180) % 360) / 360 * src_width - 0.5
+    y = np.clip((90 - lats) / 180 * src_height - 0.5 - row_offset, 0, len(img) - 1)
+
+    x0 = np.floor(x).astype(int)
+    fx = (x - x0)[None, :, None]
+    x1 = (x0 + 1) % img.shape[1]
+    x0 = x0 % img.shape[1]
+    y0 = np.floor(y).astype(int)
+    fy = (y - y0)[:, None, None]
+    y1 = np.minimum(y0 + 1, len(img) - 1)
+
+    top = img[y0][:, x0] * (1 - fx) + img[y0][:, x1] * fx
+    bottom = img[y1][:, x0] * (1 - fx) + img[y1][:, x1] * fx
+    return top * (1 - fy) + bottom * fy
+
+def composite(canvas, coverage, color, rows, cols):
+    """Blends color over canvas[rows, cols] with the given per-pixel opacity."""
+    alpha = coverage[:, :, None]
+    region = canvas[rows, cols]
+    region += (np.asarray(color, dtype=np.float32) - region) * alpha
+
+def get_window(x_min, x_max, y_min, y_max, width, height):
+    """Returns the row and column slices of the pixels whose centres may lie in a box, or None outside the canvas."""
+    cols = slice(max(0, int(math.floor(x_min))), min(width, int(math.ceil(x_max)) + 1))
+    rows = slice(max(0, int(math.floor(y_min))), min(height, int(math.ceil(y_max)) + 1))
+    if cols.start >= cols.stop or rows.start >= rows.stop:
+        return None
+    return rows, cols
+
+def get_line_coverage(xs, ys, line_px, width, height):
+    """Returns the antialiased coverage of a polyline line_px wide, with its window.
+
+    Coverage is the largest over all segments, so joints are not drawn
+    twice; each segment only visits the pixels around it.
+    """
+    half = line_px / 2 + 0.5
+    window = get_window(xs.min() - half, xs.max() + half, ys.min() - half, ys.max() + half, width, height)
+    if window is None:
+        return None, None
+    rows, cols = window
+    coverage = np.zeros((rows.stop - rows.start, cols.stop - cols.start), dtype=np.float32)
+    for x0, y0, x1, y1 in zip(xs[:-1], ys[:-1], xs[1:], ys[1:]):
+        seg = get_window(min(x0, x1) - half, max(x0, x1) + half, min(y0, y1) - half, max(y0, y1) + half, width, height)
+        if seg is None:
+            continue
+        seg_rows, seg_cols = seg
+        px = np.arange(seg_cols.start, seg_cols.stop)[None, :] + 0.5
+        py = np.arange(seg_rows.start, seg_rows.stop)[:, None] + 0.5
+        dx, dy = x1 - x0, y1 - y0
+        length2 = dx * dx + dy * dy
+        t = np.clip(((px - x0) * dx + (py - y0) * dy) / length2, 0, 1) if length2 > 0 else 0.0
+        dist = np.hypot(px - (x0 + t * dx), py - (y0 + t * dy))
+        local = (slice(seg_rows.start - rows.start, seg_rows.stop - rows.start),
+                 slice(seg_cols.start - cols.start, seg_cols.stop - cols.start))
+        np.maximum(coverage[local], np.clip(half - dist, 0, 1), out=coverage[local])
+    return coverage, window
+
+def get_marker_distance(marker, dx, dy, size):
+    """Signed distance in pixels from the edge of a marker size pixels across (negative inside)."""
+    half = size / 2
+    if marker == 's':
+        return np.maximum(np.abs(dx), np.abs(dy)) - half
+    if marker == '^':
+        # matplotlib's triangle spans (0, half), (-half, -half) and (half, -half), y up
+        up = -dy
+        edge = (2 * np.abs(dx) + up - half) / math.sqrt(5)
+        return np.maximum(edge, -up - half)
+    return np.hypot(dx, dy) - half
+
+def draw_dot(canvas, x, y, marker, area, color, alpha):
+    height, width = canvas.shape[:2]
+    size = math.sqrt(area) * DPI / 72
+    reach = size / 2 + 1
+    window = get_window(x - reach, x + reach, y - reach, y + reach, width, height)
+    if window is None:
+        return
+    rows, cols = window
+    dx = np.arange(cols.start, cols.stop)[None, :] + 0.5 - x
+    dy = np.arange(rows.start, rows.stop)[:, None] + 0.5 - y
+    coverage = np.clip(0.5 - get_marker_distance(marker, dx, dy, size), 0, 1) * alpha
+    composite(canvas, coverage, color, rows, cols)
+
+def draw_swath_raster(canvas, levels, alpha=0.4):
+    """Blends a swath level grid covering the whole view over the canvas, nearest cell per pixel."""
+    from swath import SWATH_COLORS
+    height, width = canvas.shape[:2]
+    # level rows run south to north, canvas rows north to south
+    rows = ((1 - (np.arange(height) + 0.5) / height) * len(levels)).astype(int).clip(0, len(levels) - 1)
+    cols = ((np.arange(width) + 0.5) / width * levels.shape[1]).astype(int).clip(0, levels.shape[1] - 1)
+    pixels = levels[np.ix_(rows, cols)]
+    for level, color in enumerate(SWATH_COLORS, start=1):
+        mask = pixels == level
+        canvas[mask] += (np.asarray(color, dtype=np.float32) - canvas[mask]) * alpha
+
+def render_track_raster(storms, args):
+    """Rasterizes the track map into a (height, width, 3) float array, without matplotlib.
+
+    The map fills the image as with --layout fixed: lines of all storms are
+    drawn first, then their dots, matching the regular backend's z-order.
+    """
+    width, height, lon_span = get_map_layout(args)
+    map_w, map_h, style_width = get_fixed_layout(args, width, height, lon_span)
+    lat_span = args.ymax - args.ymin
+    line_px = calculate_line_width(args.lines, style_width, lon_span) * DPI / 72
+    dot_area = calculate_dot_area(args.dots, style_width, lon_span)
+    deg_per_px = lon_span / map_w
+
+    with stage("background"):
+        canvas = resample_background(load_background(args.bg), args.view_lon_min, args.view_lon_max,
+                                     args.ymin, args.ymax, map_w, map_h)
+
+    center_lon_view = (args.view_lon_min + args.view_lon_max) / 2
+    adjusted = [positions for positions in (adjust_positions(storm, args, center_lon_view) for storm in storms) if positions]
+    to_x = lambda lons: (np.asarray(lons, dtype=float) - args.view_lon_min) / lon_span * map_w
+    to_y = lambda lats: (args.ymax - np.asarray(lats, dtype=float)) / lat_span * map_h
+
+    with stage("draw"):
+        if getattr(args, 'swath', False):
+            from swath import compute_swath
+            levels = compute_swath(adjusted, [args.view_lon_min, args.view_lon_max, args.ymin, args.ymax], args.swathres)
+            draw_swath_raster(canvas, levels)
+
+        for positions in adjusted:
+            if len(positions) < 2:
+                continue
+            lons = [pos["lon"] for pos in positions]
+            lats = [pos["lat"] for pos in positions]
+            if getattr(args, 'lod', False):
+                keep = simplify_track(lons, lats, deg_per_px / 2)
+                lons = [lons[i] for i in keep]
+                lats = [lats[i] for i in keep]
+            coverage, window = get_line_coverage(to_x(lons), to_y(lats), line_px, map_w, map_h)
+            if coverage is not None:
+                composite(canvas, coverage * args.alpha, (1, 1, 1), *window)
+                count("lines_drawn")
+
+        for positions in adjusted:
+            styles = [get_marker_style(pos, dot_area) for pos in positions]
+            colors = [get_point_color(pos, args) for pos in positions]
+            keep = range(len(positions))
+            if getattr(args, 'lod', False):
+                radius = math.sqrt(dot_area / math.pi) * DPI / 72 * deg_per_px
+                keep = thin_dots([pos["lon"] for pos in positions], [pos["lat"] for pos in positions],
+                                 [(color, marker) for color, (marker, size) in zip(colors, styles)], radius)
+            xs = to_x([pos["lon"] for pos in positions])
+            ys = to_y([pos["lat"] for pos in positions])
+            for i in keep:
+                marker, size = styles[i]
+                draw_dot(canvas, xs[i], ys[i], marker, size, colors[i], args.alpha)
+            count("dots_drawn", len(keep))
+
+    return canvas
+
+def generate_track_map_raster(storms, args):
+    """Renders the track map with the NumPy backend and writes it with pngio's zlib encoder, indexed with --encoding palette."""
+    if getattr(args, 'show_names', False) or getattr(args, 'show_legend', False):
+        print("The numpy backend draws no text; storm names and the legend are skipped.")
+    canvas = render_track_raster(storms, args)
+    pixels = (np.clip(canvas, 0, 1) * 255 + 0.5).astype(np.uint8)
+    with stage("save"):
+        level = getattr(args, 'compress', 6)
+        if getattr(args, 'encoding', 'png') == 'palette':
+            img = quantize(pixels)
+            rows = np.asarray(img)
+            writer = PNGWriter(args.output, img.width, img.height, 1, palette=get_palette(img), level=level)
+        else:
+            rows = pixels
+            writer = PNGWriter(args.output, pixels.shape[1], pixels.shape[0], 3, level=level)
+        try:
+            writer.write_rows(rows)
+            writer.close()
+            print(f"Map generated and saved to {args.output}")
+        except Exception as e:
+            writer.file.close()
+            if os.path.exists(writer.tmp_path):
+                os.remove(writer.tmp_path)
+            print(f"Error saving image: {str(e)}")
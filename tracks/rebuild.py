@@ -0,0 +1,183 @@
+import copy
+import hashlib
+import json
+import os
+import re
+from multiprocessing import Pool
+
+from track import (build_parser, read_storms, filter_storms, compute_view, generate_track_map,
+                   hash_storm, get_storm_keys)
+from template import format_upload_template
+
+# options that change any of the artifacts; a change to one of them rebuilds everything
+BUILD_OPTIONS = ["scale", "res", "bg", "alpha", "dots", "lines", "noextra", "show_names",
+                 "show_legend", "useoldcolorkey", "skipasynoptic", "xmin", "xmax", "ymin", "ymax", "swath", "swathres", "colorby", "lod", "strips",
+                 "layout", "encoding", "compress", "backend"]
+
+def hash_file(path):
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+def get_file_name(key):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", key)
+
+def get_settings_hash(args):
+    options = {option: getattr(args, option, None) for option in BUILD_OPTIONS}
+    options["charts"] = args.charts
+    return hashlib.sha1(json.dumps(options, sort_keys=True).encode()).hexdigest()
+
+def read_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"settings": None, "storms": {}, "seasons": {}}
+
+def write_manifest(path, manifest):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def is_current(entry, content_hash, verify):
+    """Checks a manifest entry against the new content hash and its artifacts on disk."""
+    if entry is None or entry.get("hash") != content_hash:
+        return False
+    for artifact in entry.get("artifacts", {}).values():
+        if not os.path.exists(artifact["path"]):
+            return False
+        if verify and hash_file(artifact["path"]) != artifact["hash"]:
+            return False
+    return True
+
+def get_storm_artifacts(key, storm, args):
+    base = os.path.join(args.outdir, str(storm.get("year", 0)), get_file_name(key))
+    artifacts = {"track": f"{base}.png", "template": f"{base}.txt"}
+    if args.charts:
+        artifacts["chart"] = f"{base}-chart.png"
+    return artifacts
+
+def build_storm(job):
+    """Renders every artifact of one storm; returns {name: {path, hash}}."""
+    key, storm, args = job
+    paths = get_storm_artifacts(key, storm, args)
+
+    map_args = copy.copy(args)
+    map_args.output = paths["track"]
+    compute_view([storm], map_args)
+    generate_track_map([storm], map_args)
+
+    text = format_upload_template([storm], args) or ""
+    os.makedirs(os.path.dirname(paths["template"]), exist_ok=True)
+    with open(paths["template"], "w") as f:
+        f.write(text + "\n")
+
+    if "chart" in paths:
+        from chart import plot_track
+        plot_track(storm, paths["chart"], layout=args.layout, encoding=args.encoding, compress=args.compress)
+
+    return {name: {"path": path, "hash": hash_file(path)} for name, path in paths.items() if os.path.exists(path)}
+
+def build_season(job):
+    year, storms, args = job
+    path = os.path.join(args.outdir, str(year), "season.png")
+    map_args = copy.copy(args)
+    map_args.output = path
+    compute_view(storms, map_args)
+    generate_track_map(storms, map_args)
+    return {"track": {"path": path, "hash": hash_file(path)}} if os.path.exists(path) else {}
+
+def remove_artifacts(entry):
+    for artifact in entry.get("artifacts", {}).values():
+        if os.path.exists(artifact["path"]):
+            os.remove(artifact["path"])
+
+def rebuild(storms, args):
+    """Re-renders only storms and seasons whose content changed since the last manifest."""
+    manifest_path = args.manifest or os.path.join(args.outdir, "manifest.json")
+    old = read_manifest(manifest_path)
+    settings = get_settings_hash(args)
+    if old.get("settings") != settings:
+        print("Build settings changed; rebuilding everything.")
+        old = {"settings": None, "storms": {}, "seasons": {}}
+
+    keys = get_storm_keys(storms)
+    hashes = {key: hash_storm(storm) for key, storm in zip(keys, storms)}
+    manifest = {"settings": settings, "storms": {}, "seasons": {}}
+
+    storm_jobs = []
+    for key, storm in zip(keys, storms):
+        entry = old["storms"].get(key)
+        if is_current(entry, hashes[key], args.verify):
+            manifest["storms"][key] = entry
+        else:
+            storm_jobs.append((key, storm, args))
+
+    seasons = {}
+    for key, storm in zip(keys, storms):
+        seasons.setdefault(str(storm.get("year", 0)), []).append(key)
+
+    by_key = dict(zip(keys, storms))
+    season_jobs = []
+    for year, members in seasons.items():
+        season_hash = hashlib.sha1("".join(sorted(hashes[key] for key in members)).encode()).hexdigest()
+        entry = old["seasons"].get(year)
+        if is_current(entry, season_hash, args.verify):
+            manifest["seasons"][year] = entry
+        else:
+            season_jobs.append((year, [by_key[key] for key in members], args))
+            manifest["seasons"][year] = {"hash": season_hash, "storms": sorted(members)}
+
+    print(f"{len(storm_jobs)} of {len(storms)} storms and {len(season_jobs)} of {len(seasons)} seasons need rebuilding.")
+
+    if args.workers > 1 and len(storm_jobs) + len(season_jobs) > 1:
+        with Pool(args.workers) as pool:
+            storm_results = pool.map(build_storm, storm_jobs)
+            season_results = pool.map(build_season, season_jobs)
+    else:
+        storm_results = [build_storm(job) for job in storm_jobs]
+        season_results = [build_season(job) for job in season_jobs]
+
+    for (key, storm, job_args), artifacts in zip(storm_jobs, storm_results):
+        manifest["storms"][key] = {"hash": hashes[key], "year": storm.get("year", 0), "artifacts": artifacts}
+    for (year, members, job_args), artifacts in zip(season_jobs, season_results):
+        manifest["seasons"][year]["artifacts"] = artifacts
+
+    for key, entry in old["storms"].items():
+        if key not in manifest["storms"]:
+            print(f"Removing artifacts of {key}, which is no longer in the data.")
+            remove_artifacts(entry)
+    for year, entry in old["seasons"].items():
+        if year not in manifest["seasons"]:
+            remove_artifacts(entry)
+
+    write_manifest(manifest_path, manifest)
+    print(f"Manifest written to {manifest_path}")
+    return storm_jobs, season_jobs
+
+def main():
+    parser = build_parser()
+    parser.description = "Incrementally rebuild per-storm and season maps from a build manifest"
+    parser.add_argument("--outdir", type=str, default="../png/build", help="Directory for the built maps and templates")
+    parser.add_argument("--manifest", type=str, help="Manifest file (default: <outdir>/manifest.json)")
+    parser.add_argument("--charts", action="store_true", help="Also build chart.py maps for each storm (requires cartopy)")
+    parser.add_argument("--verify", action="store_true", help="Re-hash existing artifacts instead of only checking they exist")
+    args = parser.parse_args()
+
+    if not args.input:
+        print("Please specify --input.")
+        return
+
+    storms = filter_storms(read_storms(args), args)
+    if not storms:
+        print("No storms found after filtering. Please check your filters.")
+        return
+
+    rebuild(storms, args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import shutil
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # no advisory locks on Windows; stats updates there are only atomic, not serialized
+    fcntl = None
+
+from track import generate_track_map
+
+# every argument that changes the pixels generate_track_map produces
+RENDER_OPTIONS = ["scale", "res", "bg", "alpha", "dots", "lines", "noextra",
+                  "xmin", "xmax", "ymin", "ymax", "view_lon_min", "view_lon_max",
+                  "show_names", "show_legend", "swath", "swathres", "colorby", "lod", "strips",
+                  "layout", "encoding", "compress", "backend"]
+
+@contextmanager
+def locked(path):
+    """Holds an exclusive lock on path (created if needed) across processes."""
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+class RenderCache:
+    """Content-addressed store of rendered maps with size-bounded LRU eviction.
+
+    Entries are keyed by a hash of the filtered storms and every rendering
+    argument, so identical renders are served from disk no matter which
+    filters selected the storms. Hits refresh an entry's mtime, which is
+    what eviction orders by. The size of the cache is scanned once and then
+    kept as a running total of this process's stores; the directory is only
+    walked again when that total passes max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes, link=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.link = link
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total = None
+        os.makedirs(directory, exist_ok=True)
+
+    def get_key(self, storms, args):
+        options = {option: getattr(args, option, None) for option in RENDER_OPTIONS}
+        try:
+            stat = os.stat(args.bg)
+            options["bg_stat"] = [stat.st_size, stat.st_mtime_ns]
+        except (OSError, TypeError):
+            options["bg_stat"] = None
+        payload = json.dumps({"storms": storms, "options": options}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.png")
+
+    def fetch(self, key, output):
+        """Places the cached render for key at output; returns False on a miss."""
+        path = self.get_path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return False
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        if os.path.lexists(output):
+            os.remove(output)
+        if self.link:
+            try:
+                os.link(path, output)
+            except OSError:
+                shutil.copyfile(path, output)
+        else:
+            shutil.copyfile(path, output)
+        os.utime(path)
+        self.hits += 1
+        return True
+
+    def read(self, key):
+        """Returns the cached render for key as bytes, or None on a miss."""
+        path = self.get_path(key)
+        try:
+            with open(path, "rb") as f:
+                body = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return body
+
+    def store(self, key, output):
+        path = self.get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            replaced = os.stat(path).st_size
+        except FileNotFoundError:
+            replaced = 0
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        if self.link:
+            try:
+                os.link(output, tmp_path)
+            except OSError:
+                shutil.copyfile(output, tmp_path)
+        else:
+            shutil.copyfile(output, tmp_path)
+        os.replace(tmp_path, path)
+        if self.total is None:
+            self.evict()
+            return
+        self.total += os.stat(path).st_size - replaced
+        if self.total > self.max_bytes:
+            self.evict()
+
+    def get_entries(self):
+        """Returns (mtime, size, path) for every cached render."""
+        entries = []
+        for root, dirs, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".png"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits in max_bytes."""
+        entries = self.get_entries()
+        total = sum(size for mtime, size, path in entries)
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+        self.total = total
+
+    def save_stats(self):
+        """Adds this run's counters to the totals kept in stats.json, one process at a time."""
+        path = os.path.join(self.directory, "stats.json")
+        with locked(path + ".lock"):
+            try:
+                with open(path) as f:
+                    stats = json.load(f)
+            except (FileNotFoundError, ValueError):
+                stats = {}
+            for name in ("hits", "misses", "evictions"):
+                stats[name] = stats.get(name, 0) + getattr(self, name)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(stats, f)
+            os.replace(tmp_path, path)
+        self.hits = self.misses = self.evictions = 0
+        return stats
+
+def cached_generate_track_map(storms, args, cache):
+    """Runs generate_track_map unless an identical render is already cached."""
+    key = cache.get_key(storms, args)
+    if cache.fetch(key, args.output):
+        print(f"Map found in render cache and saved to {args.output}")
+        return
+
+    # never write through a hard link into an older cached entry
+    if os.path.lexists(args.output):
+        os.remove(args.output)
+    generate_track_map(storms, args)
+    if os.path.exists(args.output):
+        cache.store(key, args.output)
@@ -138,3 +138,14 @@ def get_color(pos, scale):
         if pos["wind"] < entry.wind:
             return entry.value
     return colormap.entries[-1].value
+
+# forward speed bins in kt, for the motion-colored render mode
+SPEED_ENTRIES = [
+    ColormapEntry("Under 5 kt", (0x5e / 0xFF, 0x3c / 0xFF, 0x99 / 0xFF), 0),
+    ColormapEntry("5-10 kt", (0x3b / 0xFF, 0x82 / 0xFF, 0xc4 / 0xFF), 5),
+    ColormapEntry("10-15 kt", (0x4d / 0xFF, 0xc9 / 0xFF, 0xa0 / 0xFF), 10),
+    ColormapEntry("15-20 kt", (0xd9 / 0xFF, 0xe6 / 0xFF, 0x4f / 0xFF), 15),
+    ColormapEntry("20-30 kt", (0xfd / 0xFF, 0xa0 / 0xFF, 0x3a / 0xFF), 20),
+    ColormapEntry("30 kt and over", (0xe8 / 0xFF, 0x3a / 0xFF, 0x2f / 0xFF), 30),
+    ColormapEntry("SENTINEL", (0xff / 0xFF, 0xff / 0xFF, 0xff / 0xFF), 0x7fffffff)
+]
@@ -0,0 +1,270 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qsl
+
+from track import FORMATS, build_parser, get_inputs, read_storms, filter_storms, compute_view, preload_background
+from inputs import get_input_stat
+from render_cache import RenderCache, cached_generate_track_map
+
+# options that only make sense for one-off command line runs
+IGNORED_OPTIONS = {"output", "inferoutputlocation", "template", "workers", "cache", "cachesize", "cachelink", "parsecache"}
+
+# parsed storms, decoded backgrounds and the shared render cache, filled in by init_worker
+DATASETS = {}
+RENDER_CACHE = {}
+
+def get_dataset_key(args):
+    """Identifies a dataset by the (path, format) pairs its --input entries resolve to."""
+    inputs = tuple((os.path.abspath(path), fmt) for entry in get_inputs(args) for path, fmt in entry)
+    return (inputs, bool(args.skipasynoptic))
+
+def get_input_spelling(args):
+    """The --input entries of a request as written, for remembering which dataset they resolved to."""
+    return (tuple(args.input), args.format, bool(args.skipasynoptic))
+
+def get_dataset_version(key):
+    """Returns the size and modification time of every file in a dataset, so renders of older data are not served."""
+    version = []
+    for path, fmt in key[0]:
+        try:
+            stat = get_input_stat(path)
+            version.append([stat.st_size, stat.st_mtime_ns])
+        except OSError:
+            version.append(None)
+    return version
+
+def init_worker(datasets, backgrounds, cachedir, cachesize):
+    DATASETS.update(datasets)
+    for path in backgrounds:
+        preload_background(path)
+    # linked, so a request's entry and the render it was served from share one file
+    RENDER_CACHE["cache"] = RenderCache(os.path.join(cachedir, "renders"), cachesize, link=True)
+    RENDER_CACHE["tmpdir"] = os.path.join(cachedir, "tmp")
+    os.makedirs(RENDER_CACHE["tmpdir"], exist_ok=True)
+
+def render_request(argv, dataset, key):
+    """Renders one map of a preloaded dataset in a worker process and files it in the render cache under key.
+
+    Returns (PNG bytes, None), or (None, error message).
+    """
+    args = build_parser().parse_args(argv)
+    storms = DATASETS.get(dataset)
+    if storms is None:
+        return None, f"Input '{' '.join(args.input)}' is not loaded by this server."
+
+    storms = filter_storms(storms, args)
+    if not storms:
+        return None, "No system found with the specified parameters. Check the filters."
+
+    compute_view(storms, args)
+    cache = RENDER_CACHE["cache"]
+    args.output = os.path.join(RENDER_CACHE["tmpdir"], f"{os.getpid()}.png")
+    try:
+        cached_generate_track_map(storms, args, cache)
+        if not os.path.exists(args.output):
+            return None, "The map could not be rendered."
+        with open(args.output, "rb") as f:
+            body = f.read()
+        cache.store(key, args.output)
+    finally:
+        if os.path.exists(args.output):
+            os.remove(args.output)
+        cache.save_stats()
+    return body, None
+
+def query_to_argv(query, parser):
+    """Turns a query string into parse_args-style arguments for track.py's parser."""
+    fields = parse_qsl(query, keep_blank_values=True)
+    for key, value in fields:
+        if key not in parser.options or key in IGNORED_OPTIONS:
+            raise ValueError(f"Unknown or unsupported parameter: {key}")
+    return parser.fields_to_argv(fields)
+
+class RenderServer:
+    """Asyncio HTTP front end that queues renders to a pool of warm worker processes."""
+
+    def __init__(self, defaults, backgrounds, cachedir, cachesize, workers):
+        self.parser = build_parser()
+        self.parser.exit_on_error = False
+        self.defaults = defaults
+        self.backgrounds = [os.path.abspath(path) for path in backgrounds]
+        self.cachedir = cachedir
+        self.cachesize = cachesize
+        self.workers = workers
+        self.datasets = {}
+        self.versions = {}
+        self.resolved = {}
+        self.pending = {}
+        self.cache = None
+        self.stats = {"requests": 0, "cached": 0, "rendered": 0, "errors": 0}
+        self.pool = None
+
+    def preload(self, inputs):
+        for entry in inputs:
+            argv = ["--input", entry, "--skipasynoptic", str(self.defaults.skipasynoptic)]
+            if self.defaults.format:
+                argv += ["--format", self.defaults.format]
+            args = self.parser.parse_args(argv)
+            print(f"Preloading storm data from {entry}...")
+            key = get_dataset_key(args)
+            self.datasets[key] = read_storms(args)
+            self.versions[key] = get_dataset_version(key)
+            self.resolved[get_input_spelling(args)] = key
+        # request lookups share the workers' render cache, its size cap and its eviction
+        self.cache = RenderCache(os.path.join(self.cachedir, "renders"), self.cachesize)
+        self.pool = ProcessPoolExecutor(self.workers, initializer=init_worker,
+                                        initargs=(self.datasets, self.backgrounds,
+                                                  self.cachedir, self.cachesize))
+
+    def build_argv(self, query):
+        argv = query_to_argv(query, self.parser)
+        args = self.parser.parse_args(argv)
+        if args.animate:
+            raise ValueError("Animations are not served; use track.py --animate instead.")
+        if args.input is None:
+            argv = ["--input", self.defaults.input[0]] + argv
+        if args.format is None and self.defaults.format:
+            argv = ["--format", self.defaults.format] + argv
+        if os.path.abspath(args.bg) not in self.backgrounds:
+            argv += ["--bg", self.backgrounds[0]]
+        else:
+            argv += ["--bg", os.path.abspath(args.bg)]
+        return argv
+
+    def resolve_dataset(self, args):
+        """Returns the key of the preloaded dataset a request's inputs name, or None.
+
+        Each way of writing the inputs is globbed and format-detected once;
+        later requests spelling them the same way reuse the result.
+        """
+        spelling = get_input_spelling(args)
+        key = self.resolved.get(spelling)
+        if key is None:
+            key = get_dataset_key(args)
+            if key not in self.datasets:
+                return None
+            self.resolved[spelling] = key
+        return key
+
+    def get_request_key(self, args, dataset):
+        """Hashes a request's arguments, with its dataset and the versions of its files, into a render cache key."""
+        options = dict(vars(args))
+        for option in IGNORED_OPTIONS | {"input", "format"}:
+            options.pop(option, None)
+        options["dataset"] = [dataset, self.versions.get(dataset)]
+        return hashlib.sha1(json.dumps(options, sort_keys=True).encode()).hexdigest()
+
+    async def render(self, argv):
+        args = self.parser.parse_args(argv)
+        dataset = self.resolve_dataset(args)
+        if dataset is None:
+            return None, f"Input '{' '.join(args.input)}' is not loaded by this server."
+        key = self.get_request_key(args, dataset)
+        body = self.cache.read(key)
+        if body is not None:
+            self.stats["cached"] += 1
+            return body, None
+
+        # identical requests already in the queue share one render
+        if key in self.pending:
+            return await asyncio.shield(self.pending[key])
+
+        loop = asyncio.get_running_loop()
+        self.pending[key] = loop.run_in_executor(self.pool, render_request, argv, dataset, key)
+        try:
+            body, error = await self.pending[key]
+        finally:
+            self.pending.pop(key, None)
+        if error is None:
+            self.stats["rendered"] += 1
+        return body, error
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            if len(request_line) < 2 or request_line[0] != "GET":
+                await self.respond(writer, 405, "text/plain", b"Only GET is supported.\n")
+                return
+
+            self.stats["requests"] += 1
+            url = urlsplit(request_line[1])
+            if url.path == "/stats":
+                stats = dict(self.stats, queued=len(self.pending))
+                try:
+                    with open(os.path.join(self.cachedir, "renders", "stats.json")) as f:
+                        stats["render_cache"] = json.load(f)
+                except (FileNotFoundError, ValueError):
+                    pass
+                body = json.dumps(stats).encode()
+                await self.respond(writer, 200, "application/json", body)
+                return
+            if url.path != "/render":
+                await self.respond(writer, 404, "text/plain", b"Not found.\n")
+                return
+
+            try:
+                argv = self.build_argv(url.query)
+            except (ValueError, argparse.ArgumentError, SystemExit) as e:
+                self.stats["errors"] += 1
+                message = "Invalid parameters." if isinstance(e, SystemExit) else str(e)
+                await self.respond(writer, 400, "text/plain", f"{message}\n".encode())
+                return
+
+            body, error = await self.render(argv)
+            if error is not None:
+                self.stats["errors"] += 1
+                await self.respond(writer, 404, "text/plain", f"{error}\n".encode())
+                return
+            await self.respond(writer, 200, "image/png", body)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Error handling request: {e}")
+            await self.respond(writer, 500, "text/plain", b"Internal server error.\n")
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, content_type, body):
+        reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                   500: "Internal Server Error"}
+        writer.write(f"HTTP/1.0 {status} {reasons[status]}\r\n"
+                     f"Content-Type: {content_type}\r\n"
+                     f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1"))
+        writer.write(body)
+        await writer.drain()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Serving track maps on http://{host}:{port}/render")
+        async with server:
+            await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve track maps from preloaded storm data")
+    parser.add_argument("--input", type=str, nargs="+", required=True, help="Input files or glob patterns to preload, each optionally prefixed with its format; the first is the default")
+    parser.add_argument("--format", type=str, choices=FORMATS, help="Format of input files without a format prefix (default: detected from their contents)")
+    parser.add_argument("--skipasynoptic", type=int, default=1, help="Set to 0 to not have the maker skip asynoptic points")
+    parser.add_argument("--bg", type=str, nargs="+", default=["../data/bg8192.png"], help="Backgrounds to preload; the first is the default")
+    parser.add_argument("--cachedir", type=str, default="../png/server", help="Directory for rendered maps")
+    parser.add_argument("--cachesize", type=int, default=512, help="Maximum size of the shared render cache in megabytes")
+    parser.add_argument("--workers", type=int, default=2, help="Number of render worker processes")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    args = parser.parse_args()
+
+    server = RenderServer(args, args.bg, args.cachedir, args.cachesize * 1024 * 1024, args.workers)
+    server.preload(args.input)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.pool.shutdown()
+
+if __name__ == "__main__":
+    main()
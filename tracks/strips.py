@@ -0,0 +1,158 @@
+import hashlib
+import math
+import os
+
+import numpy as np
+import matplotlib.pyplot as plt
+from PIL import Image
+
+from pngio import PNGWriter
+from profiling import stage, count
+from track import (get_map_layout, get_fixed_layout, adjust_positions, calculate_line_width, calculate_dot_area,
+                   draw_storm_name, draw_storm_track, draw_legend)
+
+BACKGROUND_CACHE = os.environ.get("ELGOB_BACKGROUND_CACHE", "../data/backgrounds")
+DEFAULT_STRIP_HEIGHT = 512
+
+def get_background_array(path, cachedir=BACKGROUND_CACHE):
+    """Returns the background as a read-only memory-mapped uint8 array, or None when it is missing.
+
+    The image is decoded once into a raw .npy file keyed by its path, size
+    and modification time; later renders map it instead of decoding it,
+    so a strip only pages in the rows it covers.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        print(f"Background image not found: {path}")
+        print("Using solid black background instead")
+        return None
+    key = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    array_path = os.path.join(cachedir, hashlib.sha1(key.encode()).hexdigest() + ".npy")
+    if not os.path.exists(array_path):
+        os.makedirs(cachedir, exist_ok=True)
+        with Image.open(path) as img:
+            pixels = np.asarray(img.convert("RGBA" if "A" in img.getbands() else "RGB"))
+        tmp_path = f"{array_path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, pixels)
+        os.replace(tmp_path, array_path)
+    return np.load(array_path, mmap_mode="r")
+
+def draw_background_strip(ax, bg, view_lon_min, view_lon_max, lat_bottom, lat_top):
+    """Tiles only the background rows between lat_bottom and lat_top across the view."""
+    full_height = bg.shape[0]
+    rows_per_degree = full_height / 180.0
+    img_y_min = max(0, int(math.floor((90 - lat_top) * rows_per_degree)))
+    img_y_max = min(full_height, int(math.ceil((90 - lat_bottom) * rows_per_degree)))
+    if img_y_min >= img_y_max:
+        return
+    # the exact latitudes of the rows taken, so every strip lines up with its neighbours
+    extent_top = 90 - img_y_min / rows_per_degree
+    extent_bottom = 90 - img_y_max / rows_per_degree
+    rows = np.asarray(bg[img_y_min:img_y_max])
+
+    start_tile_index = math.floor((view_lon_min - 180) / 360)
+    end_tile_index = math.ceil((view_lon_max + 180) / 360)
+    for i in range(start_tile_index, end_tile_index + 1):
+        ax.imshow(rows, extent=[-180 + i * 360, 180 + i * 360, extent_bottom, extent_top],
+                  interpolation='lanczos', aspect='auto')
+
+def get_storm_lat_range(positions):
+    lats = [pos["lat"] for pos in positions]
+    return min(lats), max(lats)
+
+def generate_track_map_strips(storms, args):
+    """Renders the track map strip by strip, streaming each strip's rows into the PNG.
+
+    Every strip is a separate render of the same view clipped to its rows,
+    so peak memory follows the strip size rather than --res. The output is
+    the undistorted map itself, without the padding of a tight save.
+    """
+    if getattr(args, 'encoding', 'png') == 'palette':
+        # one palette has to fit every strip, which is not known until the last one is drawn
+        print("Error: --encoding palette is not supported with --strips; use --encoding png.")
+        return
+
+    width, height, lon_span = get_map_layout(args)
+    out_w, out_h, style_width = get_fixed_layout(args, width, height, lon_span)
+    deg_per_px = lon_span / out_w
+    strip_height = args.strips if args.strips > 0 else DEFAULT_STRIP_HEIGHT
+
+    view_lat_min = args.ymin
+    view_lat_max = args.ymax
+    center_lon_view = (args.view_lon_min + args.view_lon_max) / 2
+    line_width = calculate_line_width(args.lines, style_width, lon_span)
+    dot_area = calculate_dot_area(args.dots, style_width, lon_span)
+
+    adjusted_storms = [(storm, positions) for storm in storms
+                       for positions in [adjust_positions(storm, args, center_lon_view)] if positions]
+    lat_ranges = [get_storm_lat_range(positions) for storm, positions in adjusted_storms]
+    # reach of names below a track's first fix and of dots past their centre
+    name_reach = (view_lat_max - view_lat_min) * 0.1
+    dot_reach = math.sqrt(dot_area / math.pi) / 72 * 100 * deg_per_px
+
+    print(f"Loading background image: {args.bg}")
+    with stage("background"):
+        bg = get_background_array(args.bg)
+
+    swath_extent = [args.view_lon_min, args.view_lon_max, view_lat_min, view_lat_max]
+    levels = None
+    if getattr(args, 'swath', False):
+        from swath import compute_swath
+        levels = compute_swath([positions for storm, positions in adjusted_storms], swath_extent, args.swathres)
+
+    show_names = getattr(args, 'show_names', False)
+    legend_scale = "SPEED" if getattr(args, 'colorby', 'wind') == 'speed' else args.scale
+
+    dpi = 100
+    fig = plt.figure(dpi=dpi, facecolor='black')
+    writer = PNGWriter(args.output, out_w, out_h, 3, level=getattr(args, 'compress', 6))
+    try:
+        for top_row in range(0, out_h, strip_height):
+            rows = min(strip_height, out_h - top_row)
+            lat_top = view_lat_max - top_row * deg_per_px
+            lat_bottom = lat_top - rows * deg_per_px
+
+            fig.clear()
+            # Agg truncates the size in pixels, so aim half a pixel past it
+            fig.set_size_inches((out_w + 0.5) / dpi, (rows + 0.5) / dpi)
+            ax = fig.add_axes([0, 0, 1, 1])
+            ax.set_axis_off()
+            ax.set_facecolor('black')
+            if bg is not None:
+                draw_background_strip(ax, bg, args.view_lon_min, args.view_lon_max, lat_bottom, lat_top)
+            ax.set_xlim(args.view_lon_min, args.view_lon_max)
+            ax.set_ylim(lat_bottom, lat_top)
+
+            if levels is not None:
+                from swath import draw_swath
+                draw_swath(ax, levels, swath_extent)
+
+            for (storm, positions), (lat_min, lat_max) in zip(adjusted_storms, lat_ranges):
+                if lat_max + dot_reach < lat_bottom or lat_min - dot_reach - (name_reach if show_names else 0) > lat_top:
+                    continue
+                if show_names:
+                    draw_storm_name(ax, storm, positions[0], view_lat_min, view_lat_max)
+                draw_storm_track(ax, positions, args, line_width, dot_area, deg_per_px)
+
+            if getattr(args, 'show_legend', False):
+                # anchored to the map's lower-left corner, so each strip draws its slice of the same legend
+                draw_legend(ax, legend_scale, bbox_to_anchor=(args.view_lon_min, view_lat_min),
+                            bbox_transform=ax.transData)
+
+            count("strips")
+            fig.canvas.draw()
+            pixels = np.asarray(fig.canvas.buffer_rgba())
+            if pixels.shape[0] < rows or pixels.shape[1] < out_w:
+                pixels = np.pad(pixels, ((0, max(0, rows - pixels.shape[0])), (0, max(0, out_w - pixels.shape[1])), (0, 0)),
+                                mode='edge')
+            writer.write_rows(pixels[:rows, :out_w, :3])
+        writer.close()
+        print(f"Map generated and saved to {args.output}")
+    except Exception as e:
+        writer.file.close()
+        if os.path.exists(writer.tmp_path):
+            os.remove(writer.tmp_path)
+        print(f"Error saving image: {str(e)}")
+    finally:
+        plt.close(fig)
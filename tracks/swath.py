@@ -0,0 +1,86 @@
+import math
+
+import numpy as np
+
+from atcf import WIND_RADII_THRESHOLDS
+
+# RGB of the 34, 50 and 64 kt areas, weakest first
+SWATH_COLORS = [(1.0, 0.85, 0.3), (1.0, 0.55, 0.15), (0.85, 0.15, 0.1)]
+
+def get_radii_array(pos):
+    """Returns a (threshold, quadrant) array of a fix's wind radii in nmi."""
+    radii = pos.get("radii") or {}
+    return np.array([radii.get(threshold, radii.get(str(threshold), [0, 0, 0, 0]))
+                     for threshold in WIND_RADII_THRESHOLDS], dtype=float)
+
+def interpolate_track(positions, step=0.1):
+    """Resamples a track at most step degrees apart, interpolating the wind radii linearly."""
+    lats = np.array([pos["lat"] for pos in positions], dtype=float)
+    lons = np.array([pos["lon"] for pos in positions], dtype=float)
+    radii = np.array([get_radii_array(pos) for pos in positions])
+    if len(positions) == 1:
+        return lats, lons, radii
+
+    seg_len = np.hypot(np.diff(lats), np.diff(lons))
+    steps = np.maximum(1, np.ceil(seg_len / step)).astype(int)
+    # fractional fix index of every sample along the track
+    t = np.concatenate([i + np.arange(n) / n for i, n in enumerate(steps)] + [[len(positions) - 1]])
+    i = np.minimum(t.astype(int), len(positions) - 2)
+    f = t - i
+    return (lats[i] + f * (lats[i + 1] - lats[i]),
+            lons[i] + f * (lons[i + 1] - lons[i]),
+            radii[i] + f[:, None, None] * (radii[i + 1] - radii[i]))
+
+def make_swath_grid(lon_min, lon_max, lat_min, lat_max, res=0.1):
+    """Returns an empty level grid and the longitudes and latitudes of its cell centres."""
+    grid_lons = lon_min + (np.arange(int(math.ceil((lon_max - lon_min) / res))) + 0.5) * res
+    grid_lats = lat_min + (np.arange(int(math.ceil((lat_max - lat_min) / res))) + 0.5) * res
+    return np.zeros((len(grid_lats), len(grid_lons)), dtype=np.uint8), grid_lons, grid_lats
+
+def add_storm_swath(levels, grid_lons, grid_lats, positions, step=0.1):
+    """Raises every cell of levels swept by the storm's 34/50/64 kt areas to 1/2/3.
+
+    Each resampled fix only touches the window of cells within its largest
+    radius; inside it, distances and quadrants are computed for the whole
+    window at once.
+    """
+    if not positions or not any(pos.get("radii") for pos in positions):
+        return levels
+    res = grid_lats[1] - grid_lats[0] if len(grid_lats) > 1 else 1.0
+    lats, lons, radii = interpolate_track(positions, step)
+
+    for lat, lon, fix_radii in zip(lats, lons, radii):
+        reach = fix_radii.max() / 60.0
+        if reach <= 0:
+            continue
+        cos_lat = max(math.cos(math.radians(lat)), 0.01)
+        rows = slice(*np.searchsorted(grid_lats, [lat - reach, lat + reach]))
+        cols = slice(*np.searchsorted(grid_lons, [lon - reach / cos_lat, lon + reach / cos_lat]))
+        if rows.start == rows.stop or cols.start == cols.stop:
+            continue
+
+        dy = (grid_lats[rows, None] - lat) * 60.0
+        dx = (grid_lons[None, cols] - lon) * 60.0 * np.cos(np.radians(grid_lats[rows, None]))
+        dist = np.hypot(dx, dy)
+        quadrant = np.where(dx >= 0, np.where(dy >= 0, 0, 1), np.where(dy < 0, 2, 3))
+        # fix_radii[:, quadrant] has shape (threshold, rows, cols)
+        inside = dist[None] <= fix_radii[:, quadrant]
+        level = (inside * np.arange(1, len(WIND_RADII_THRESHOLDS) + 1)[:, None, None]).max(axis=0)
+        np.maximum(levels[rows, cols], level.astype(np.uint8), out=levels[rows, cols])
+    return levels
+
+def compute_swath(storms, extent, res=0.1, step=0.1):
+    """Accumulates the swaths of every storm onto one grid covering extent."""
+    levels, grid_lons, grid_lats = make_swath_grid(*extent, res)
+    for positions in storms:
+        add_storm_swath(levels, grid_lons, grid_lats, positions, step)
+    return levels
+
+def draw_swath(ax, levels, extent, alpha=0.4, zorder=5):
+    """Draws a level grid as a translucent overlay; returns the image, or None if it is empty."""
+    if not levels.any():
+        return None
+    rgba = np.zeros(levels.shape + (4,), dtype=np.float32)
+    for level, color in enumerate(SWATH_COLORS, start=1):
+        rgba[levels == level] = color + (alpha,)
+    return ax.imshow(rgba, origin="lower", extent=extent, interpolation="nearest", zorder=zorder)
@@ -0,0 +1,156 @@
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+
+from atcf import WIND_RADII_THRESHOLDS
+
+FORMATS = ["hurdat2", "hurdat", "atcf", "jma", "md", "tcr"]
+
+def get_status(wind, extratropical):
+    if extratropical:
+        return "EX"
+    if wind >= 64:
+        return "HU"
+    return "TS" if wind >= 34 else "TD"
+
+def generate_storm(rng, number, year, fixes):
+    """Returns one synthetic storm in the readers' layout, with 6-hourly fixes.
+
+    The track starts in the deep tropics heading west-northwest, recurves
+    north-east after a random point, and weakens and becomes extratropical
+    over its last fixes; wind radii grow with the intensity.
+    """
+    time = datetime(year, 6, 1) + timedelta(days=rng.randint(0, 150))
+    lat = rng.uniform(8, 20)
+    lon = rng.uniform(-70, -20)
+    wind = rng.choice([20, 25, 30])
+    heading_u, heading_v = rng.uniform(-0.8, -0.3), rng.uniform(0.1, 0.3)
+    recurve = rng.randint(fixes // 3, max(fixes // 3, 2 * fixes // 3))
+    peak = rng.randint(fixes // 4, max(fixes // 4, fixes // 2))
+    positions = []
+    for i in range(fixes):
+        extratropical = i >= fixes - max(2, fixes // 8)
+        status = get_status(wind, extratropical)
+        pos = {
+            "year": time.year, "month": time.month, "day": time.day, "hour": time.hour,
+            "lat": round(lat, 1), "lon": round(lon, 1), "wind": wind, "pres": 1012 - wind * 2 // 3,
+            "status": status,
+        }
+        radii = {}
+        for threshold in WIND_RADII_THRESHOLDS:
+            if wind >= threshold:
+                base = (wind - threshold + 10) * 2.5
+                radii[threshold] = [int(base * factor) for factor in (1.2, 1.0, 0.7, 0.9)]
+        if radii:
+            pos["radii"] = radii
+        positions.append(pos)
+
+        time += timedelta(hours=6)
+        if i >= recurve:
+            heading_u = min(1.2, heading_u + 0.15)
+            heading_v = min(0.8, heading_v + 0.05)
+        lat = min(60.0, lat + heading_v + rng.uniform(-0.15, 0.15))
+        lon = max(-179.9, min(-1.0, lon + heading_u + rng.uniform(-0.2, 0.2)))
+        wind += rng.randint(0, 10) if i < peak else -rng.randint(0, 8)
+        wind = max(20, min(160, wind))
+    return {"id": number % 99 + 1, "name": f"SYNTH{number}", "year": year, "basin": "AL", "positions": positions}
+
+def generate_storms(storms, fixes, seed=0, start_year=2000, per_year=15):
+    """Returns storms synthetic storms of fixes fixes each, per_year to a season."""
+    rng = random.Random(seed)
+    return [generate_storm(rng, number, start_year + number // per_year, fixes) for number in range(storms)]
+
+def format_lat(lat, digits=1):
+    return f"{abs(lat):.{digits}f}{'N' if lat >= 0 else 'S'}"
+
+def format_lon(lon, digits=1):
+    return f"{abs(lon):.{digits}f}{'W' if lon < 0 else 'E'}"
+
+def write_hurdat2(storms, f):
+    for storm in storms:
+        f.write(f"AL{storm['id']:02d}{storm['year']}, {storm['name']:>18}, {len(storm['positions']):6d},\n")
+        for pos in storm["positions"]:
+            f.write(f"{pos['year']:04d}{pos['month']:02d}{pos['day']:02d}, {pos['hour']:02d}00,  , {pos['status']}, "
+                    f"{format_lat(pos['lat']):>5}, {format_lon(pos['lon']):>6}, {pos['wind']:4d}, {pos['pres']:4d},\n")
+
+def write_hurdat(storms, f):
+    for storm in storms:
+        first = storm["positions"][0]
+        f.write(f"AL{storm['id']:02d}{storm['year']}, {storm['name']}, {len(storm['positions'])}, "
+                f"{first['month']:02d}/{first['day']:02d}/{first['year']}, synthetic storm\n")
+        for pos in storm["positions"]:
+            # read_stormdata_hurdat takes any line with a '/' longer than 35 characters for a header
+            # and reads only the month and day of fixes, so rows are kept short
+            f.write(f"{pos['month']}/{pos['day']},{pos['hour']:02d},,{pos['status']},"
+                    f"{format_lat(pos['lat'])},{format_lon(pos['lon'])},{pos['wind']},,,\n")
+
+def write_atcf(storms, f):
+    for storm in storms:
+        for pos in storm["positions"]:
+            date = f"{pos['year']:04d}{pos['month']:02d}{pos['day']:02d}{pos['hour']:02d}"
+            lat = f"{abs(round(pos['lat'] * 10)):d}{'N' if pos['lat'] >= 0 else 'S'}"
+            lon = f"{abs(round(pos['lon'] * 10)):d}{'W' if pos['lon'] < 0 else 'E'}"
+            for threshold, radii in (sorted(pos.get("radii", {}).items()) or [(0, [0, 0, 0, 0])]):
+                f.write(f"{storm['basin']}, {storm['id']:02d}, {date},   , BEST,   0, {lat:>5}, {lon:>5}, {pos['wind']:3d}, {pos['pres']:4d}, "
+                        f"{pos['status']}, {threshold:3d}, NEQ, {radii[0]:4d}, {radii[1]:4d}, {radii[2]:4d}, {radii[3]:4d}, "
+                        f"1012,  200,  20,   0,   0,   L,   0,    ,   0,   0, {storm['name']:>10},\n")
+
+def write_jma(storms, f):
+    for storm in storms:
+        code = f"{storm['year'] % 100:02d}{storm['id']:02d}"
+        f.write(f"66666 {code} {len(storm['positions']):4d} 0000 {code} 0 6 {storm['name']:<20} 20240101\n")
+        for pos in storm["positions"]:
+            grade = 6 if pos["status"] == "EX" else 3
+            # longitudes are written in degrees east, 0 to 360
+            f.write(f"{pos['year'] % 100:02d}{pos['month']:02d}{pos['day']:02d}{pos['hour']:02d} 002 {grade} "
+                    f"{round(pos['lat'] * 10):03d} {round(pos['lon'] % 360 * 10):04d} {pos['pres']:4d}     {pos['wind']:03d}\n")
+
+def write_md(storms, f):
+    for storm in storms:
+        f.write(f"{storm['name']}\n")
+        f.write("----DATE/TIME---------LON------LAT-WIND----PRES\n")
+        for pos in storm["positions"]:
+            date = f"{pos['year']:04d}{pos['month']:02d}{pos['day']:02d}{pos['hour']:02d}"
+            f.write(f"{date:<22}{pos['lon']:6.1f}   {pos['lat']:5.1f} {pos['wind']:4d}    {pos['pres']:5d}\n")
+
+TCR_STAGES = {"HU": "hurricane", "TS": "tropical storm", "TD": "tropical depression", "EX": "extratropical"}
+
+def write_tcr(storms, f):
+    # a TCR table holds a single storm, so only the first is written
+    storm = storms[0]
+    f.write("Best track\n\nDate/Time\nLatitude\nLongitude\nPressure\nWind Speed\nStage\n")
+    for pos in storm["positions"]:
+        f.write(f"{pos['year']:04d}/{pos['month']:02d}/{pos['day']:02d} {pos['hour']:02d}00\n"
+                f"{pos['lat']:.1f}\n{pos['lon']:.1f}\n{pos['pres']}\n{pos['wind']}\n{TCR_STAGES[pos['status']]}\n")
+
+WRITERS = {
+    "hurdat2": write_hurdat2,
+    "hurdat": write_hurdat,
+    "atcf": write_atcf,
+    "jma": write_jma,
+    "md": write_md,
+    "tcr": write_tcr,
+}
+
+def write_synthetic(path, fmt, storms):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        WRITERS[fmt](storms, f)
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic best-track files for benchmarks and tests")
+    parser.add_argument("--format", type=str, default="hurdat2", choices=FORMATS, help="Format of the file to write")
+    parser.add_argument("--storms", type=int, default=100, help="Number of storms")
+    parser.add_argument("--fixes", type=int, default=40, help="Number of 6-hourly fixes per storm")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed writes the same file")
+    parser.add_argument("--startyear", type=int, default=2000, help="Season of the first storms")
+    parser.add_argument("--output", type=str, required=True, help="Output file")
+    args = parser.parse_args()
+
+    storms = generate_storms(args.storms, args.fixes, args.seed, args.startyear)
+    write_synthetic(args.output, args.format, storms)
+    print(f"Wrote {len(storms)} storms with {args.fixes} fixes each to {args.output}")
+
+if __name__ == "__main__":
+    main()
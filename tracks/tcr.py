@@ -1,9 +1,12 @@
-import os
+from inputs import open_input
 
 def read_stormdata_tcr(file_path):
-    storms = []
-    with open(file_path, 'r') as file:
-        lines = file.readlines()
+    return list(iter_stormdata_tcr(file_path))
+
+def iter_stormdata_tcr(file_path):
+    """Yields the storms of a TCR file one at a time, as they are parsed."""
+    with open_input(file_path) as file:
+        lines = iter(file)
         storm = None
         targets = ["Date/Time", "Latitude", "Longitude", "Pressure", "Wind Speed", "Stage"]
         targets_found = 0
@@ -22,21 +25,22 @@ def read_stormdata_tcr(file_path):
                     'positions': []
                 }
             if '/' in line:
+                # the five lines after a date hold the rest of its row
+                lat, lon, pres, wind, stage = (next(lines).strip() for _ in range(5))
                 pos = {
                     'year': int(line[:4]),
                     'month': int(line[5:7]),
                     'day': int(line[8:10]),
                     'hour': int(line[11:13]),
-                    'lat': float(lines[lines.index(line) + 1].strip()),
-                    'lon': float(lines[lines.index(line) + 2].strip()),
-                    'pres': int(lines[lines.index(line) + 3].strip()),
-                    'wind': int(lines[lines.index(line) + 4].strip()),
-                    'type': get_storm_type(lines[lines.index(line) + 5].strip())
+                    'lat': float(lat),
+                    'lon': float(lon),
+                    'pres': int(pres),
+                    'wind': int(wind),
+                    'type': get_storm_type(stage)
                 }
                 storm['positions'].append(pos)
         if storm is not None:
-            storms.append(storm)
-    return storms
+            yield storm
 
 def get_storm_type(stage):
     if stage in ["hurricane", "tropical storm", "tropical depression"]:
@@ -1,68 +1,82 @@
 import os
 
 def generate_upload_template(storms, args):
+    text = format_upload_template(storms, args)
+    if text:
+        print(text)
+
+def format_upload_template(storms, args):
+    """Returns the {{WPTC track map}} template for a single storm as text."""
     if len(storms) != 1:
-        return
+        return None
 
     storm = storms[0]
     stormname = storm['name'].capitalize()
     season = get_season_name(storm)
 
     if len(storm['positions']) > 0:
+        lines = []
+        first = storm['positions'][0]
         pos = storm['positions'][-1]
-        print("{{WPTC track map")
-        print(" | author = {{subst:REVISIONUSER}}")
+        start_date = (storm['year'], storm.get('month', first.get('month', 0)), storm.get('day', first.get('day', 0)))
+        end_date = (pos.get('year', storm['year']), pos.get('month', 0), pos.get('day', 0))
+        storm_type = storm.get('type')
+        lines.append("{{WPTC track map")
+        lines.append(" | author = {{subst:REVISIONUSER}}")
 
-        if storm['type'] == 'TD':
-            print(f" | name = Tropical Depression {stormname}")
-            print(f" | article = Tropical Depression {stormname} ({storm['year']})")
-        elif storm['type'] == 'TS':
-            print(f" | name = Tropical Storm {stormname}")
-            print(f" | article = Tropical Storm {stormname} ({storm['year']})")
-        elif storm['type'] == 'TY':
-            print(f" | name = Typhoon {stormname}")
-            print(f" | article = Typhoon {stormname} ({storm['year']})")
-        elif storm['type'] == 'ST':
-            print(f" | name = Super Typhoon {stormname}")
-            print(f" | article = Super Typhoon {stormname} ({storm['year']})")
-        elif storm['type'] == 'TC':
-            print(f" | name = Tropical Cyclone {stormname}")
-            print(f" | article = Tropical Cyclone {stormname} ({storm['year']})")
-        elif storm['type'] == 'HU':
-            print(f" | name = Hurricane {stormname}")
-            print(f" | article = Hurricane {stormname} ({storm['year']})")
-        elif storm['type'] == 'SD':
-            print(f" | name = Subtropical Depression {stormname}")
-            print(f" | article = Subtropical Depression {stormname} ({storm['year']})")
-        elif storm['type'] == 'SS':
-            print(f" | name = Subtropical Storm {stormname}")
-            print(f" | article = Subtropical Storm {stormname} ({storm['year']})")
+        if storm_type == 'TD':
+            lines.append(f" | name = Tropical Depression {stormname}")
+            lines.append(f" | article = Tropical Depression {stormname} ({storm['year']})")
+        elif storm_type == 'TS':
+            lines.append(f" | name = Tropical Storm {stormname}")
+            lines.append(f" | article = Tropical Storm {stormname} ({storm['year']})")
+        elif storm_type == 'TY':
+            lines.append(f" | name = Typhoon {stormname}")
+            lines.append(f" | article = Typhoon {stormname} ({storm['year']})")
+        elif storm_type == 'ST':
+            lines.append(f" | name = Super Typhoon {stormname}")
+            lines.append(f" | article = Super Typhoon {stormname} ({storm['year']})")
+        elif storm_type == 'TC':
+            lines.append(f" | name = Tropical Cyclone {stormname}")
+            lines.append(f" | article = Tropical Cyclone {stormname} ({storm['year']})")
+        elif storm_type == 'HU':
+            lines.append(f" | name = Hurricane {stormname}")
+            lines.append(f" | article = Hurricane {stormname} ({storm['year']})")
+        elif storm_type == 'SD':
+            lines.append(f" | name = Subtropical Depression {stormname}")
+            lines.append(f" | article = Subtropical Depression {stormname} ({storm['year']})")
+        elif storm_type == 'SS':
+            lines.append(f" | name = Subtropical Storm {stormname}")
+            lines.append(f" | article = Subtropical Storm {stormname} ({storm['year']})")
         else:
-            print(f" | name = Cyclone {stormname}")
-            print(f" | article = Cyclone {stormname} ({storm['year']})")
+            lines.append(f" | name = Cyclone {stormname}")
+            lines.append(f" | article = Cyclone {stormname} ({storm['year']})")
 
-        print(f" | season = {season}")
-        print(f" | start = {storm['year']}-{storm['month']:02d}-{storm['day']:02d}")
-        print(f" | end = {pos['year']}-{pos['month']:02d}-{pos['day']:02d}")
-        print(" | othersource={{{fill me}}}")
-        print(" | catname={{{fill me}}}")
-        print(" | code={{{fill me}}}")
+        lines.append(f" | season = {season}")
+        lines.append(f" | start = {start_date[0]}-{start_date[1]:02d}-{start_date[2]:02d}")
+        lines.append(f" | end = {end_date[0]}-{end_date[1]:02d}-{end_date[2]:02d}")
+        lines.append(" | othersource={{{fill me}}}")
+        lines.append(" | catname={{{fill me}}}")
+        lines.append(" | code={{{fill me}}}")
         if not args.useoldcolorkey:
-            print(" | colors=new")
+            lines.append(" | colors=new")
         if args.scale == 'JMA':
-            print(" | scale=JMA")
-        print("}}")
+            lines.append(" | scale=JMA")
+        lines.append("}}")
 
-        print(f"Edit summary: Refreshing information for {stormname} as of {pos['year']}-{pos['month']:02d}-{pos['day']:02d}, {pos['hour']:02d}00 UTC")
+        lines.append(f"Edit summary: Refreshing information for {stormname} as of {end_date[0]}-{end_date[1]:02d}-{end_date[2]:02d}, {pos.get('hour', 0):02d}00 UTC")
+        return "\n".join(lines)
+    return None
 
 def get_season_name(storm):
-    if storm['basin'] == 'AL':
+    basin = storm.get('basin')
+    if basin == 'AL':
         return f"{storm['year']} Atlantic hurricane season"
-    elif storm['basin'] == 'EP':
+    elif basin == 'EP':
         return f"{storm['year']} Pacific hurricane season"
-    elif storm['basin'] == 'WP':
+    elif basin == 'WP':
         return f"{storm['year']} Pacific typhoon season"
-    elif storm['basin'] == 'SL':
+    elif basin == 'SL':
         return "List of South Atlantic tropical cyclones"
     else:
         return "{{{fill me}}}"
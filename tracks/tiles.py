@@ -0,0 +1,300 @@
+import hashlib
+import json
+import math
+import os
+import shutil
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from track import (build_parser, read_storms, filter_storms, load_background, crop_background_rows,
+                   adjust_positions, draw_storm_track, calculate_line_width, calculate_dot_area,
+                   hash_storm, get_storm_keys)
+
+TILE_SIZE = 256
+MAX_LAT = 85.0511287798
+
+def lat_to_merc(lat):
+    """Converts latitude to Web Mercator y, expressed in degrees like longitude."""
+    lat = np.clip(lat, -MAX_LAT, MAX_LAT)
+    return np.degrees(np.arcsinh(np.tan(np.radians(lat))))
+
+def merc_to_lat(merc):
+    return np.degrees(np.arctan(np.sinh(np.radians(merc))))
+
+def tile_bounds(z, x, y):
+    """Returns (lon_min, lon_max, merc_min, merc_max) for tile z/x/y."""
+    n = 2 ** z
+    lon_min = x / n * 360.0 - 180.0
+    lon_max = (x + 1) / n * 360.0 - 180.0
+    merc_max = 180.0 - y / n * 360.0
+    merc_min = 180.0 - (y + 1) / n * 360.0
+    return lon_min, lon_max, merc_min, merc_max
+
+def get_style_name(args):
+    """Names the cache directory after the scale plus a hash of the other render options."""
+    options = [args.bg, args.alpha, args.dots, args.lines, args.noextra]
+    if getattr(args, "colorby", "wind") != "wind":
+        options.append(args.colorby)
+    if getattr(args, "lod", False):
+        options.append("lod")
+    return f"{args.scale}-{hashlib.sha1(json.dumps(options).encode()).hexdigest()[:8]}"
+
+def get_touched_tiles(storm, z, args):
+    """Returns the set of (x, y) tiles at zoom z that the storm's dots and lines reach."""
+    positions = [pos for pos in storm["positions"] if not (args.noextra and pos.get("type") == "EXTRATROPICAL")]
+    if not positions:
+        return set()
+
+    n = 2 ** z
+    lons = np.array([pos["lon"] for pos in positions], dtype=float)
+    lats = np.array([pos["lat"] for pos in positions], dtype=float)
+    # keep each segment continuous across the dateline
+    lons = lons[0] + np.cumsum(np.concatenate(([0.0], (np.diff(lons) + 180) % 360 - 180)))
+
+    pixel_deg = 360.0 / (n * TILE_SIZE)
+    pad = max(0.9 * args.dots, args.lines, 4 * pixel_deg)
+
+    if len(lons) > 1:
+        lons_a, lons_b, lats_a, lats_b = lons[:-1], lons[1:], lats[:-1], lats[1:]
+    else:
+        lons_a = lons_b = lons
+        lats_a = lats_b = lats
+    lon_lo = np.minimum(lons_a, lons_b) - pad
+    lon_hi = np.maximum(lons_a, lons_b) + pad
+    lat_lo = np.minimum(lats_a, lats_b) - pad
+    lat_hi = np.maximum(lats_a, lats_b) + pad
+
+    x_lo = np.floor((lon_lo + 180.0) / 360.0 * n).astype(int)
+    x_hi = np.floor((lon_hi + 180.0) / 360.0 * n).astype(int)
+    y_lo = np.clip(np.floor((180.0 - lat_to_merc(lat_hi)) / 360.0 * n), 0, n - 1).astype(int)
+    y_hi = np.clip(np.floor((180.0 - lat_to_merc(lat_lo)) / 360.0 * n), 0, n - 1).astype(int)
+
+    tiles = set()
+    for x0, x1, y0, y1 in zip(x_lo, x_hi, y_lo, y_hi):
+        for x in range(x0, min(x1, x0 + n - 1) + 1):
+            for y in range(y0, y1 + 1):
+                tiles.add((x % n, y))
+    return tiles
+
+def link_or_copy(src, dst):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+class TileCache:
+    """On-disk z/x/y tile cache laid out as <root>/<scale>-<style>/<version>/z/x/y.png.
+
+    The dataset version is a hash of the storms' contents, so a data update
+    gets a fresh directory. Tiles untouched by changed storms are hard-linked
+    from the previous version instead of being rendered again.
+    """
+
+    def __init__(self, root, storms, args):
+        self.root = root
+        self.args = args
+        self.storms = storms
+        self.keys = get_storm_keys(storms)
+        self.hashes = {key: hash_storm(storm) for key, storm in zip(self.keys, storms)}
+        self.version = hashlib.sha1("".join(sorted(self.hashes.values())).encode()).hexdigest()[:12]
+        self.style_dir = os.path.join(root, get_style_name(args))
+        self.version_dir = os.path.join(self.style_dir, self.version)
+        self.index = {"storms": {key: {"hash": h, "tiles": {}} for key, h in self.hashes.items()}}
+        self._touched = {}
+        self._bg_img = None
+        self._fig = None
+        self.rendered = 0
+        self.linked = 0
+
+    def get_tile_path(self, z, x, y, version=None):
+        return os.path.join(self.style_dir, version or self.version, str(z), str(x), f"{y}.png")
+
+    def get_base_tile_path(self, z, x, y):
+        return os.path.join(self.style_dir, "base", str(z), str(x), f"{y}.png")
+
+    def get_touched(self, z):
+        """Maps each touched (x, y) tile at zoom z to the indices of storms drawn on it."""
+        if z not in self._touched:
+            touched = {}
+            for i, (key, storm) in enumerate(zip(self.keys, self.storms)):
+                tiles = get_touched_tiles(storm, z, self.args)
+                self.index["storms"][key]["tiles"][str(z)] = sorted(tiles)
+                for tile in tiles:
+                    touched.setdefault(tile, []).append(i)
+            self._touched[z] = touched
+        return self._touched[z]
+
+    def get_tile(self, z, x, y):
+        """Returns the path of tile z/x/y, rendering it on a cache miss."""
+        touched = self.get_touched(z)
+        if (x, y) not in touched:
+            path = self.get_base_tile_path(z, x, y)
+            if not os.path.exists(path):
+                self.render_tile(z, x, y, [], path)
+            return path
+
+        path = self.get_tile_path(z, x, y)
+        if not os.path.exists(path):
+            self.render_tile(z, x, y, [self.storms[i] for i in touched[(x, y)]], path)
+        return path
+
+    def update(self, zooms):
+        """Brings every storm tile at the given zooms up to date with the current data."""
+        previous = self.read_latest()
+        previous_index = self.read_index(previous) if previous and previous != self.version else None
+
+        for z in zooms:
+            touched = self.get_touched(z)
+            # an older version that never indexed this zoom gives nothing to reuse
+            reusable = previous_index is not None and all(
+                str(z) in entry["tiles"] for entry in previous_index["storms"].values())
+            dirty = set()
+            if reusable:
+                old_storms = previous_index["storms"]
+                for key in set(old_storms) | set(self.hashes):
+                    old = old_storms.get(key)
+                    if old is not None and old["hash"] == self.hashes.get(key):
+                        continue
+                    if old is not None:
+                        dirty.update(tuple(tile) for tile in old["tiles"][str(z)])
+                    if key in self.hashes:
+                        dirty.update(tuple(tile) for tile in self.index["storms"][key]["tiles"][str(z)])
+
+            for (x, y), indices in touched.items():
+                path = self.get_tile_path(z, x, y)
+                if os.path.exists(path):
+                    continue
+                if reusable and (x, y) not in dirty:
+                    old_path = self.get_tile_path(z, x, y, previous)
+                    if os.path.exists(old_path):
+                        link_or_copy(old_path, path)
+                        self.linked += 1
+                        continue
+                self.render_tile(z, x, y, [self.storms[i] for i in indices], path)
+
+        self.write_index()
+
+    def read_latest(self):
+        try:
+            with open(os.path.join(self.style_dir, "LATEST")) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def read_index(self, version):
+        try:
+            with open(os.path.join(self.style_dir, version, "index.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def write_index(self):
+        os.makedirs(self.version_dir, exist_ok=True)
+        index = self.read_index(self.version)
+        if index is not None:
+            for key, entry in index["storms"].items():
+                if key in self.index["storms"]:
+                    for z, tiles in entry["tiles"].items():
+                        self.index["storms"][key]["tiles"].setdefault(z, tiles)
+        with open(os.path.join(self.version_dir, "index.json"), "w") as f:
+            json.dump(self.index, f)
+        with open(os.path.join(self.style_dir, "LATEST"), "w") as f:
+            f.write(self.version)
+
+    def render_tile(self, z, x, y, storms, path):
+        if self._fig is None:
+            self._bg_img = load_background(self.args.bg)
+            dpi = 100
+            self._fig = plt.figure(figsize=(TILE_SIZE / dpi, TILE_SIZE / dpi), dpi=dpi, facecolor='black')
+
+        fig = self._fig
+        fig.clear()
+        ax = fig.add_axes([0, 0, 1, 1])
+        ax.set_axis_off()
+
+        lon_min, lon_max, merc_min, merc_max = tile_bounds(z, x, y)
+        draw_tile_background(ax, self._bg_img, lon_min, lon_max, merc_min, merc_max)
+
+        lon_span = lon_max - lon_min
+        line_width = calculate_line_width(self.args.lines, TILE_SIZE, lon_span)
+        dot_area = calculate_dot_area(self.args.dots, TILE_SIZE, lon_span)
+        center_lon = (lon_min + lon_max) / 2
+        for storm in storms:
+            adjusted_positions = adjust_positions(storm, self.args, center_lon)
+            for pos in adjusted_positions:
+                pos["lat"] = float(lat_to_merc(pos["lat"]))
+            if adjusted_positions:
+                draw_storm_track(ax, adjusted_positions, self.args, line_width, dot_area, lon_span / TILE_SIZE)
+
+        ax.set_xlim(lon_min, lon_max)
+        ax.set_ylim(merc_min, merc_max)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fig.savefig(path, dpi=fig.dpi, facecolor='black')
+        self.rendered += 1
+
+def draw_tile_background(ax, bg_img, lon_min, lon_max, merc_min, merc_max):
+    """Crops the equirectangular background to the tile and stretches its rows to Mercator."""
+    if bg_img is None:
+        ax.set_facecolor('black')
+        return
+
+    full_height, full_width = bg_img.shape[:2]
+    lat_min, lat_max = merc_to_lat(merc_min), merc_to_lat(merc_max)
+    img_y_min, img_y_max = crop_background_rows(full_height, lat_min, lat_max)
+    img_y_max = max(img_y_max, img_y_min + 1)
+    img_x_min = max(0, int(math.floor((lon_min + 180.0) / 360.0 * full_width)))
+    img_x_max = min(full_width, max(img_x_min + 1, int(math.ceil((lon_max + 180.0) / 360.0 * full_width))))
+
+    # sample one background row per output pixel row, evenly spaced in Mercator
+    mercs = merc_max - (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE * (merc_max - merc_min)
+    rows = ((90.0 - merc_to_lat(mercs)) * (full_height / 180.0)).astype(int)
+    rows = np.clip(rows, img_y_min, img_y_max - 1)
+    cropped_bg = bg_img[rows, img_x_min:img_x_max]
+
+    ax.imshow(cropped_bg,
+              extent=[img_x_min / full_width * 360.0 - 180.0, img_x_max / full_width * 360.0 - 180.0,
+                      merc_min, merc_max],
+              interpolation='lanczos', aspect='auto')
+
+def parse_zooms(text):
+    if "-" in text:
+        first, last = text.split("-")
+        return list(range(int(first), int(last) + 1))
+    return [int(z) for z in text.split(",")]
+
+def main():
+    parser = build_parser()
+    parser.description = "Render and cache z/x/y track map tiles"
+    parser.add_argument("--tilecache", type=str, default="../tiles", help="Directory of the tile cache")
+    parser.add_argument("--zoom", type=str, default="0-4", help="Zoom levels to bring up to date, e.g. 0-5 or 3,4")
+    parser.add_argument("--tile", type=str, help="Render a single z/x/y tile and print its path")
+    args = parser.parse_args()
+
+    if not args.input:
+        print("Please specify --input.")
+        return
+
+    storms = read_storms(args)
+    storms = filter_storms(storms, args)
+    if not storms:
+        print("No storms found after filtering. Please check your filters.")
+        return
+
+    cache = TileCache(args.tilecache, storms, args)
+    if args.tile:
+        z, x, y = (int(part) for part in args.tile.split("/"))
+        print(cache.get_tile(z, x, y))
+        cache.write_index()
+        return
+
+    print(f"Updating tiles for dataset version {cache.version}...")
+    cache.update(parse_zooms(args.zoom))
+    print(f"Rendered {cache.rendered} tiles and reused {cache.linked} tiles in {cache.version_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,35 @@
 import argparse
+import glob
+import hashlib
+import io
+import json
 import os
 import math
+import pickle
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.image as mpimg
 from matplotlib.colors import to_rgba
 import matplotlib.patheffects as path_effects
-from atcf import read_stormdata_atcf
-from hurdat import read_stormdata_hurdat
-from hurdat2 import read_stormdata_hurdat2
-from jma import read_stormdata_jma
-from md import read_stormdata_md
-from tcr import read_stormdata_tcr
-from scales import SSHWS_ENTRIES, AUS_ENTRIES, IMD_ENTRIES, JMA_ENTRIES, MFR_ENTRIES, JMADOM_ENTRIES
+from PIL import Image
+from atcf import read_stormdata_atcf, iter_stormdata_atcf
+from hurdat import read_stormdata_hurdat, iter_stormdata_hurdat
+from hurdat2 import read_stormdata_hurdat2, iter_stormdata_hurdat2
+from jma import read_stormdata_jma, iter_stormdata_jma
+from md import read_stormdata_md, iter_stormdata_md
+from tcr import read_stormdata_tcr, iter_stormdata_tcr
+from inputs import open_input, input_exists, get_input_stat
+from scales import SSHWS_ENTRIES, AUS_ENTRIES, IMD_ENTRIES, JMA_ENTRIES, MFR_ENTRIES, JMADOM_ENTRIES, SPEED_ENTRIES
+from motion import add_motion, get_max_speed
+from lod import simplify_track, thin_dots
+from pngio import ENCODINGS, save_figure, write_png
+from profiling import stage, count, count_artists, add_profile_arguments, start_profile, finish_profile
+
+# bumped whenever the parsed storm layout changes, so stale parse caches are ignored
+PARSE_CACHE_VERSION = 1
+
+FORMATS = ["hurdat", "tcr", "atcf", "md", "tab", "jma", "hurdat2"]
 
 def get_color_from_wind(wind, scale="SSHWS"):
     if scale == "AUS":
@@ -37,16 +54,64 @@ def get_color_from_wind(wind, scale="SSHWS"):
     
     return entries[-2].value
 
-def parse_args():
-    parser = argparse.ArgumentParser(description="Create hurricane track maps")
+def get_color_from_speed(speed):
+    if speed is None:
+        return (0.75, 0.75, 0.75)
+    for i in range(len(SPEED_ENTRIES) - 1):
+        if speed < SPEED_ENTRIES[i + 1].wind:
+            return SPEED_ENTRIES[i].value
+    return SPEED_ENTRIES[-2].value
+
+def get_point_color(pos, args):
+    if getattr(args, 'colorby', 'wind') == 'speed':
+        return get_color_from_speed(pos.get("speed"))
+    return get_color_from_wind(pos["wind"], args.scale)
+
+class OptionParser(argparse.ArgumentParser):
+    """An ArgumentParser that keeps its options by argument name in options.
+
+    Lets callers such as server.py map named fields (query strings, config
+    keys) to flags without reaching into argparse internals.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.options = {}
+        super().__init__(*args, **kwargs)
+
+    def add_argument(self, *args, **kwargs):
+        action = super().add_argument(*args, **kwargs)
+        if action.option_strings:
+            self.options[action.dest] = action
+        return action
+
+    def fields_to_argv(self, fields):
+        """Turns (argument name, string value) pairs into parse_args-style arguments; flags take "", 0, false or no as off."""
+        argv = []
+        for name, value in fields:
+            action = self.options.get(name)
+            if action is None:
+                raise ValueError(f"Unknown parameter: {name}")
+            if action.nargs == 0:
+                if value.lower() not in ("", "0", "false", "no"):
+                    argv.append(action.option_strings[-1])
+            else:
+                argv.extend([action.option_strings[-1], value])
+        return argv
+
+def build_parser():
+    parser = OptionParser(description="Create hurricane track maps")
     parser.add_argument("--year", type=int, help="Select tropical cyclones from a specific year")
     parser.add_argument("--name", type=str, help="Select tropical cyclones with a specific name")
-    parser.add_argument("--input", type=str, help="Use a text file to create tracking map")
+    parser.add_argument("--input", type=str, nargs="+", help="Input files or glob patterns, each optionally prefixed with its format (e.g. jma:bst_all.txt); they are merged into one map")
     parser.add_argument("--id", type=int, help="Storm ID number in its year")
-    parser.add_argument("--format", type=str, choices=["hurdat", "tcr", "atcf", "md", "tab", "jma", "hurdat2"], help="Set format for input files")
+    parser.add_argument("--format", type=str, choices=FORMATS, help="Set format for input files without a format prefix (default: detected from their contents)")
     parser.add_argument("--negx", type=int, default=1, help="Set to non-zero value for longitude west of the prime meridian")
     parser.add_argument("--negy", type=int, default=0, help="Set to non-zero value for latitude south of the equator")
+    parser.add_argument("--dedupe", action="store_true", help="Drop storms already found in an earlier --input, matched by their fixes")
+    parser.add_argument("--basin", type=str, help="Select tropical cyclones from a basin (AL, EP, CP, WP, IO, SH)")
     parser.add_argument("--wind", type=int, help="Look for storms with at least this wind")
+    parser.add_argument("--minspeed", type=float, help="Look for storms that moved at least this fast at some point, in knots")
+    parser.add_argument("--maxspeed", type=float, help="Look for storms that never moved faster than this, in knots")
     parser.add_argument("--next", action="store_true", help="Add on another storm")
     parser.add_argument("--res", type=int, default=1024, help="Set the horizontal resolution of output image")
     parser.add_argument("--bg", type=str, default="../data/bg8192.png", help="Set the map to use for background")
@@ -66,6 +131,27 @@ def parse_args():
     parser.add_argument("--ymax", type=float, help="Maximum latitude")
     parser.add_argument("--show_names", action="store_true", help="Display storm names on the map")
     parser.add_argument("--show_legend", action="store_true", help="Display a color legend for storm categories")
+    parser.add_argument("--colorby", type=str, default="wind", choices=["wind", "speed"], help="Color dots by wind (scale categories) or by forward speed")
+    parser.add_argument("--parsecache", type=str, help="Keep parsed storms, with their motion columns, in this directory")
+    parser.add_argument("--lod", action="store_true", help="Simplify tracks and skip overlapping dots to the map's pixel size")
+    parser.add_argument("--strips", type=int, default=0, help="Render in horizontal strips of this many pixels, streaming them into the PNG, for very large --res")
+    parser.add_argument("--backend", type=str, default="matplotlib", choices=["matplotlib", "numpy"], help="Render with matplotlib, or rasterize directly with NumPy (faster for thumbnails and bulk jobs, no text)")
+    parser.add_argument("--layout", type=str, default="tight", choices=["tight", "fixed"], help="Crop the saved map to its contents (tight), or size the figure to the map and write it in one draw (fixed)")
+    parser.add_argument("--encoding", type=str, default="png", choices=ENCODINGS, help="Save an RGB PNG, or a smaller 256-color indexed PNG (palette)")
+    parser.add_argument("--compress", type=int, default=6, choices=range(10), metavar="0-9", help="zlib compression level of the saved PNG")
+    parser.add_argument("--swath", action="store_true", help="Overlay the 34/50/64 kt wind swath from ATCF wind radii")
+    parser.add_argument("--swathres", type=float, default=0.1, help="Grid spacing of the wind swath, in degrees")
+    parser.add_argument("--animate", action="store_true", help="Animate the tracks fix by fix; --output may end in .gif, .mp4 or .png (numbered frames)")
+    parser.add_argument("--fps", type=int, default=10, help="Frames per second for animations")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes used to render animation frames")
+    parser.add_argument("--cache", type=str, help="Reuse identical renders stored in this render cache directory")
+    parser.add_argument("--cachesize", type=int, default=512, help="Maximum size of the render cache in megabytes")
+    parser.add_argument("--cachelink", action="store_true", help="Hard-link cached renders to the output instead of copying them")
+    return parser
+
+def parse_args():
+    parser = build_parser()
+    add_profile_arguments(parser)
     return parser.parse_args()
 
 def circular_mean(angles_deg):
@@ -84,33 +170,201 @@ def circular_distance(angle1_deg, angle2_deg):
     diff = abs(angle1_deg - angle2_deg)
     return min(diff, 360 - diff)
 
-def read_storm_data(args):
-    if not os.path.isfile(args.input):
-        print(f"Error: Input file '{args.input}' not found.")
+def get_parse_cache_path(path, fmt, skipasynoptic, parsecache):
+    stat = get_input_stat(path)
+    key = json.dumps([os.path.abspath(path), stat.st_size, stat.st_mtime_ns,
+                      fmt, bool(skipasynoptic), PARSE_CACHE_VERSION])
+    return os.path.join(parsecache, hashlib.sha1(key.encode()).hexdigest() + ".pickle")
+
+def detect_format(path):
+    """Guesses an input's format from its first lines; returns None when nothing matches."""
+    try:
+        with open_input(path) as file:
+            for number, line in enumerate(file):
+                line = line.strip()
+                if number >= 50:
+                    break
+                if not line:
+                    continue
+                if line.startswith("66666"):
+                    return "jma"
+                if line in ("Best track", "Date/Time"):
+                    return "tcr"
+                if "DATE/TIME" in line.upper():
+                    return "md"
+                tokens = [token.strip() for token in line.split(",")]
+                if len(tokens) >= 9 and tokens[0].isalpha() and tokens[2].isdigit() and len(tokens[2]) == 10:
+                    return "atcf"
+                if len(tokens) >= 3 and tokens[0][:2].isalpha() and tokens[0][2:].isdigit() and len(tokens[0]) == 8:
+                    return "hurdat" if len(tokens) > 3 and "/" in tokens[3] else "hurdat2"
+    except Exception as e:
+        print(f"Error reading file '{path}': {str(e)}")
+    return None
+
+def get_inputs(args):
+    """Expands each --input entry into its (path, format) pairs.
+
+    Each entry is a path or glob pattern, optionally written format:path;
+    entries without a prefix take --format, or the format detected from
+    their contents. Patterns that match nothing are kept as given, so the
+    missing file is reported.
+    """
+    inputs = []
+    for entry in args.input:
+        prefix, sep, rest = entry.partition(":")
+        fmt, pattern = (prefix, rest) if sep and prefix in FORMATS else (args.format, entry)
+        paths = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else []
+        inputs.append([(path, fmt or (detect_format(path) if input_exists(path) else None))
+                       for path in paths or [pattern]])
+    return inputs
+
+def read_sources(args):
+    """Parses every --input entry with its reader; returns one storm list per entry, without filtering.
+
+    Several files are parsed concurrently in worker processes. Storms
+    keep their file order, and each is tagged with its basin (see
+    get_basin) when its reader does not set one.
+    """
+    inputs = get_inputs(args)
+    jobs = [(path, fmt, args.skipasynoptic, getattr(args, 'parsecache', None)) for entry in inputs for path, fmt in entry]
+    if len(jobs) > 1:
+        with ProcessPoolExecutor(min(len(jobs), os.cpu_count() or 1)) as pool:
+            results = iter(pool.map(read_input, *zip(*jobs)))
+    else:
+        results = iter([read_input(*job) for job in jobs])
+
+    sources = []
+    for entry in inputs:
+        storms = []
+        for _ in entry:
+            storms.extend(next(results))
+        for storm in storms:
+            tag_basin(storm)
+        sources.append(storms)
+    return sources
+
+def read_storms(args):
+    """Merges the storms of every --input entry, without filtering.
+
+    With --dedupe, a storm already found in an earlier entry is dropped
+    (see join.dedupe_storms).
+    """
+    sources = read_sources(args)
+    if getattr(args, 'dedupe', False) and len(sources) > 1:
+        from join import dedupe_storms
+        storms, duplicates = dedupe_storms(sources)
+        print(f"Dropped {len(duplicates)} storm(s) already found in an earlier input.")
+        return storms
+    return [storm for storms in sources for storm in storms]
+
+def read_input(path, fmt, skipasynoptic=True, parsecache=None):
+    """Parses one input with the reader for fmt.
+
+    Every fix gets its motion columns (see motion.add_motion). With a
+    parsecache directory the result is kept on disk until the input changes.
+    """
+    if not input_exists(path):
+        print(f"Error: Input file '{path}' not found.")
         return []
-    
+    if fmt is None:
+        print(f"Error: Could not detect the format of '{path}'; please specify --format.")
+        return []
+
+    cache_path = get_parse_cache_path(path, fmt, skipasynoptic, parsecache) if parsecache else None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+
     storms = []
     try:
-        if args.format == "hurdat":
-            storms = read_stormdata_hurdat(args.input)
-        elif args.format == "atcf":
-            storms = read_stormdata_atcf(args.input, args.skipasynoptic)
-        elif args.format == "jma":
-            storms = read_stormdata_jma(args.input, args.skipasynoptic)
-        elif args.format == "hurdat2":
-            storms = read_stormdata_hurdat2(args.input, args.skipasynoptic)
-        elif args.format == "md":
-            storms = read_stormdata_md(args.input)
-        elif args.format == "tcr":
-            storms = read_stormdata_tcr(args.input)
+        if fmt == "hurdat":
+            storms = read_stormdata_hurdat(path)
+        elif fmt == "atcf":
+            storms = read_stormdata_atcf(path, skipasynoptic)
+        elif fmt == "jma":
+            storms = read_stormdata_jma(path, skipasynoptic)
+        elif fmt == "hurdat2":
+            storms = read_stormdata_hurdat2(path, skipasynoptic)
+        elif fmt == "md":
+            storms = read_stormdata_md(path)
+        elif fmt == "tcr":
+            storms = read_stormdata_tcr(path)
     except Exception as e:
-        print(f"Error reading file '{args.input}': {str(e)}")
+        print(f"Error reading file '{path}': {str(e)}")
         return []
     
     if not storms:
-        print(f"No storms found in {args.input}. Check the file format and content.")
+        print(f"No storms found in {path}. Check the file format and content.")
         return []
-    
+
+    add_motion(storms)
+    if cache_path:
+        os.makedirs(parsecache, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(storms, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    return storms
+
+def iter_input(path, fmt, skipasynoptic=True, batch=256):
+    """Yields the storms of one input as they are parsed, with motion columns and a basin tag.
+
+    Unlike read_input at most batch storms are held at a time (motion
+    columns are added a batch at once), for consumers that stream a whole
+    archive; there is no parse cache.
+    """
+    if fmt == "hurdat":
+        storms = iter_stormdata_hurdat(path)
+    elif fmt == "atcf":
+        storms = iter_stormdata_atcf(path, skipasynoptic)
+    elif fmt == "jma":
+        storms = iter_stormdata_jma(path, skipasynoptic)
+    elif fmt == "hurdat2":
+        storms = iter_stormdata_hurdat2(path, skipasynoptic)
+    elif fmt == "md":
+        storms = iter_stormdata_md(path)
+    elif fmt == "tcr":
+        storms = iter_stormdata_tcr(path)
+    else:
+        return
+    pending = []
+    for storm in storms:
+        pending.append(storm)
+        if len(pending) == batch:
+            yield from finish_batch(pending)
+            pending = []
+    yield from finish_batch(pending)
+
+def finish_batch(storms):
+    add_motion(storms)
+    for storm in storms:
+        tag_basin(storm)
+    return storms
+
+def tag_basin(storm):
+    if not storm.get("basin") and storm["positions"]:
+        storm["basin"] = get_basin(storm["positions"][0])
+
+def get_basin(pos):
+    """Returns the ATCF basin code (AL, EP, CP, WP, IO or SH) of a fix from its position."""
+    lat, lon = pos["lat"], wrap_longitude(pos["lon"])
+    if lat < 0:
+        return "SH"
+    if lon >= 100:
+        return "WP"
+    if lon >= 30:
+        return "IO"
+    if lon < -140:
+        return "CP"
+    # the Central American isthmus, roughly from (100W, 18N) to (77W, 7N)
+    if lon < -100 or (lon < -77 and lat < 18 - (lon + 100) * 11 / 23):
+        return "EP"
+    return "AL"
+
+def filter_storms(storms, args):
     filtered_storms = []
     for storm in storms:
         if args.year and storm["year"] != args.year:
@@ -119,28 +373,75 @@ def read_storm_data(args):
             continue
         if args.id and storm["id"] != args.id:
             continue
+        if getattr(args, 'basin', None) and storm.get("basin", "").upper() != args.basin.upper():
+            continue
         if args.wind:
             max_wind = max([pos["wind"] for pos in storm["positions"]], default=0)
             if max_wind < args.wind:
                 continue
+        if getattr(args, 'minspeed', None) is not None and get_max_speed(storm) < args.minspeed:
+            continue
+        if getattr(args, 'maxspeed', None) is not None and get_max_speed(storm) > args.maxspeed:
+            continue
         filtered_storms.append(storm)
-    
+    return filtered_storms
+
+def hash_storm(storm):
+    return hashlib.sha1(json.dumps(storm, sort_keys=True).encode()).hexdigest()
+
+def get_storm_keys(storms):
+    """Returns a stable key for each storm, numbering duplicates in file order."""
+    keys = []
+    seen = {}
+    for storm in storms:
+        key = f"{storm.get('year', 0)}-{storm['id']}-{storm['name']}"
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(key if seen[key] == 1 else f"{key}-{seen[key]}")
+    return keys
+
+def read_storm_data(args):
+    with stage("parse"):
+        storms = read_storms(args)
+    if not storms:
+        return []
+    count("storms_parsed", len(storms))
+    count("fixes_parsed", sum(len(storm["positions"]) for storm in storms))
+
+    with stage("filter"):
+        filtered_storms = filter_storms(storms, args)
+    count("storms_filtered", len(filtered_storms))
     if not filtered_storms:
         print("No system found with the specified parameters. Check the filters.")
         return []
 
-    lat_positions = [pos["lat"] for storm in filtered_storms for pos in storm["positions"]]
+    with stage("bounds"):
+        compute_view(filtered_storms, args)
+    return filtered_storms
+
+def compute_view(filtered_storms, args):
+    """Fills in the view bounds on args from the storms and any explicit limits."""
+    for key, value in get_view(filtered_storms, args.xmin, args.xmax, args.ymin, args.ymax).items():
+        setattr(args, key, value)
+
+def get_view(storms, xmin=None, xmax=None, ymin=None, ymax=None):
+    """Returns the view bounds for the storms, padded and widened or heightened to 16:9.
+
+    Explicit limits replace the computed ones. The result holds
+    view_lon_min/view_lon_max, which may run past +-180 to keep the view
+    continuous, the wrapped xmin/xmax, and ymin/ymax.
+    """
+    lat_positions = [pos["lat"] for storm in storms for pos in storm["positions"]]
     if lat_positions:
         min_lat = min(lat_positions)
         max_lat = max(lat_positions)
         padding_lat = 10.0
-        args.ymin = min_lat - padding_lat if args.ymin is None else args.ymin
-        args.ymax = max_lat + padding_lat if args.ymax is None else args.ymax
+        ymin = min_lat - padding_lat if ymin is None else ymin
+        ymax = max_lat + padding_lat if ymax is None else ymax
     else:
-        args.ymin = -90 if args.ymin is None else args.ymin
-        args.ymax = 90 if args.ymax is None else args.ymax
+        ymin = -90 if ymin is None else ymin
+        ymax = 90 if ymax is None else ymax
 
-    lon_positions = [pos["lon"] for storm in filtered_storms for pos in storm["positions"]]
+    lon_positions = [pos["lon"] for storm in storms for pos in storm["positions"]]
     padding_lon = 10.0
     if lon_positions:
         lons_360 = [(lon + 360) % 360 for lon in lon_positions]
@@ -151,31 +452,17 @@ def read_storm_data(args):
         
         view_span = min(360.0, (2 * max_dist) + (2 * padding_lon))
         
-        view_lon_min = center_lon_360 - view_span / 2
-        view_lon_max = center_lon_360 + view_span / 2
-
-        args.view_lon_min = view_lon_min if args.xmin is None else args.xmin
-        args.view_lon_max = view_lon_max if args.xmax is None else args.xmax
-
-        if args.xmin is None: args.xmin = wrap_longitude(view_lon_min)
-        if args.xmax is None: args.xmax = wrap_longitude(view_lon_max)
-
+        view_lon_min = center_lon_360 - view_span / 2 if xmin is None else xmin
+        view_lon_max = center_lon_360 + view_span / 2 if xmax is None else xmax
     else:
-        args.view_lon_min = -180.0 if args.xmin is None else args.xmin
-        args.view_lon_max = 180.0 if args.xmax is None else args.xmax
-        if args.xmin is None: args.xmin = -180.0
-        if args.xmax is None: args.xmax = 180.0
-
-    initial_view_lon_min = args.view_lon_min
-    initial_view_lon_max = args.view_lon_max
-    initial_ymin = args.ymin
-    initial_ymax = args.ymax
+        view_lon_min = -180.0 if xmin is None else xmin
+        view_lon_max = 180.0 if xmax is None else xmax
 
-    center_lon_initial = (initial_view_lon_min + initial_view_lon_max) / 2
-    center_lat_initial = (initial_ymin + initial_ymax) / 2
+    center_lon_initial = (view_lon_min + view_lon_max) / 2
+    center_lat_initial = (ymin + ymax) / 2
 
-    lon_span_initial = initial_view_lon_max - initial_view_lon_min
-    lat_span_initial = initial_ymax - initial_ymin
+    lon_span_initial = view_lon_max - view_lon_min
+    lat_span_initial = ymax - ymin
     if lat_span_initial <= 0: lat_span_initial = 1
     
     target_ratio = 16 / 9
@@ -184,28 +471,21 @@ def read_storm_data(args):
     if abs(current_ratio - target_ratio) > 1e-6:
         if current_ratio < target_ratio:
             target_lon_span = target_ratio * lat_span_initial
-            args.view_lon_min = center_lon_initial - target_lon_span / 2
-            args.view_lon_max = center_lon_initial + target_lon_span / 2
-
-            args.ymin = initial_ymin
-            args.ymax = initial_ymax
+            view_lon_min = center_lon_initial - target_lon_span / 2
+            view_lon_max = center_lon_initial + target_lon_span / 2
         else: # current_ratio > target_ratio
             target_lat_span = lon_span_initial / target_ratio
-            args.ymin = center_lat_initial - target_lat_span / 2
-            args.ymax = center_lat_initial + target_lat_span / 2
-
-            args.view_lon_min = initial_view_lon_min
-            args.view_lon_max = initial_view_lon_max
-    else:
-         args.view_lon_min = initial_view_lon_min
-         args.view_lon_max = initial_view_lon_max
-         args.ymin = initial_ymin
-         args.ymax = initial_ymax
-
-    args.xmin = wrap_longitude(args.view_lon_min)
-    args.xmax = wrap_longitude(args.view_lon_max)
-
-    return filtered_storms
+            ymin = center_lat_initial - target_lat_span / 2
+            ymax = center_lat_initial + target_lat_span / 2
+
+    return {
+        "view_lon_min": view_lon_min,
+        "view_lon_max": view_lon_max,
+        "xmin": wrap_longitude(view_lon_min),
+        "xmax": wrap_longitude(view_lon_max),
+        "ymin": ymin,
+        "ymax": ymax,
+    }
 
 def wrap_longitude(lon):
     """Wraps longitude to the range [-180, 180]."""
@@ -244,9 +524,115 @@ def calculate_dimensions(width, height, args):
         
     return xres, yres
 
-def generate_track_map(storms, args):
-    print(f"Loading background image: {args.bg}")
+# decoded backgrounds kept in memory by long-running processes (see preload_background)
+BACKGROUNDS = {}
+
+def load_background(path):
+    """Loads the background image, or returns None when it is missing."""
+    if path in BACKGROUNDS:
+        return BACKGROUNDS[path]
+    try:
+        return mpimg.imread(path)
+    except FileNotFoundError:
+        print(f"Background image not found: {path}")
+        print("Using solid black background instead")
+        return None
+
+def preload_background(path):
+    """Decodes a background once and keeps it for every later load_background call."""
+    BACKGROUNDS[path] = load_background(path)
+    return BACKGROUNDS[path]
+
+def crop_background_rows(full_height, view_lat_min, view_lat_max):
+    """Returns the background rows [img_y_min, img_y_max) covering a latitude range."""
+    img_y_min = (90 - view_lat_max) * (full_height / 180.0)
+    img_y_max = (90 - view_lat_min) * (full_height / 180.0)
+    return max(0, int(img_y_min)), min(full_height, int(img_y_max))
+
+def draw_background(ax, bg_img, view_lon_min, view_lon_max, view_lat_min, view_lat_max):
+    """Tiles the equirectangular background across the view."""
+    if bg_img is None:
+        ax.set_facecolor('black')
+        return
 
+    print("Tiling background...")
+    full_height, full_width = bg_img.shape[:2]
+    img_y_min, img_y_max = crop_background_rows(full_height, view_lat_min, view_lat_max)
+    if img_y_min >= img_y_max: return
+
+    base_lon_min = -180
+    base_lon_max = 180
+    base_lon_span = base_lon_max - base_lon_min # 360
+
+    start_tile_index = math.floor((view_lon_min - base_lon_max) / base_lon_span)
+    end_tile_index = math.ceil((view_lon_max - base_lon_min) / base_lon_span)
+
+    for i in range(start_tile_index, end_tile_index + 1):
+        tile_lon_min = base_lon_min + i * base_lon_span
+        tile_lon_max = base_lon_max + i * base_lon_span
+        
+        img_x_min = 0
+        img_x_max = full_width
+
+        cropped_bg = bg_img[img_y_min:img_y_max, img_x_min:img_x_max]
+        
+        ax.imshow(cropped_bg, 
+                  extent=[tile_lon_min, tile_lon_max, view_lat_min, view_lat_max], 
+                  interpolation='lanczos', aspect='auto')
+
+def get_legend_categories(scale):
+    if scale == "SSHWS":
+        return [
+            ((0.75, 0.75, 0.75), "Depression"),
+            ((0, 0, 1), "Storm"),
+            ((0, 1, 1), "Category 1"),
+            ((0, 1, 0), "Category 2"),
+            ((1, 1, 0), "Category 3"),
+            ((1, 0.5, 0), "Category 4"),
+            ((1, 0, 0), "Category 5")
+        ]
+    elif scale == "AUS":
+        entries = AUS_ENTRIES
+    elif scale == "IMD":
+        entries = IMD_ENTRIES
+    elif scale == "JMA":
+        entries = JMA_ENTRIES
+    elif scale == "MFR":
+        entries = MFR_ENTRIES
+    elif scale == "JMADOM":
+        entries = JMADOM_ENTRIES
+    elif scale == "SPEED":
+        return [(entry.value, entry.name) for entry in SPEED_ENTRIES[:-1]]
+    else:
+        return []
+    return [(entry.value, entry.name) for entry in entries]
+
+def draw_legend(ax, scale, **kwargs):
+    legend_entries = []
+    legend_labels = []
+    for color, label in get_legend_categories(scale):
+        legend_entries.append(plt.Line2D([0], [0], marker='o', color='w', 
+                                      markerfacecolor=color, markersize=8, 
+                                      linewidth=0))
+        legend_labels.append(label)
+    
+    legend = ax.legend(legend_entries, legend_labels, loc='lower left', 
+                     frameon=True, facecolor='black', framealpha=0.7, 
+                     fontsize=8, **kwargs)
+    
+    for text in legend.get_texts():
+        text.set_color('white')
+
+def calculate_line_width(lines_param, width, lon_span):
+    return max(1, lines_param / max(1e-6, lon_span) * width)
+
+def calculate_dot_area(dots_param, width, lon_span, scale=1.8):
+    diameter = scale * dots_param / max(1e-6, lon_span) * width
+    area = (diameter / 2) ** 2 * math.pi
+    return max(10, area)
+
+def get_map_layout(args):
+    """Widens narrow views to MIN_DIM degrees; returns the figure size in pixels and the longitude span."""
     EXTRA_SPACE = 5.0
     MIN_DIM = 45.0
 
@@ -260,193 +646,201 @@ def generate_track_map(storms, args):
         args.view_lon_max += diff / 2
 
     width, height = calculate_dimensions(lon_span, lat_span, args)
+    return width, height, lon_span
+
+def get_fixed_layout(args, width, height, lon_span):
+    """Returns the pixel size of the map alone, filling width or height, and the width to size lines and dots for.
+
+    The regular layout sizes lines and dots for the figure width but draws
+    the map in the default subplot box; scaling that width by the map's
+    share of the box keeps the same look.
+    """
+    lat_span = args.ymax - args.ymin
+    map_w, map_h = width, int(round(width * lat_span / lon_span))
+    if map_h > height:
+        map_w, map_h = int(round(height * lon_span / lat_span)), height
+    subplot_w = plt.rcParams['figure.subplot.right'] - plt.rcParams['figure.subplot.left']
+    subplot_h = plt.rcParams['figure.subplot.top'] - plt.rcParams['figure.subplot.bottom']
+    regular_w = min(subplot_w * width, subplot_h * height * lon_span / lat_span)
+    return map_w, map_h, width * map_w / regular_w
+
+def setup_map_figure(args):
+    """Builds the figure, background and legend shared by every track render.
+
+    Returns the figure, the axes, the width in pixels to size lines and
+    dots for and the longitude span of the view. With --layout fixed the
+    figure is exactly the map, with the axes filling it.
+    """
+    print(f"Loading background image: {args.bg}")
+
+    width, height, lon_span = get_map_layout(args)
+    fixed = getattr(args, 'layout', 'tight') == 'fixed'
 
     dpi = 100
-    fig = plt.figure(figsize=(width/dpi, height/dpi), dpi=dpi, facecolor='black')
-    ax = fig.add_subplot(111)
+    if fixed:
+        map_w, map_h, width = get_fixed_layout(args, width, height, lon_span)
+        # Agg truncates the size in pixels, so aim half a pixel past it
+        fig = plt.figure(figsize=((map_w + 0.5)/dpi, (map_h + 0.5)/dpi), dpi=dpi, facecolor='black')
+        ax = fig.add_axes([0, 0, 1, 1])
+    else:
+        fig = plt.figure(figsize=(width/dpi, height/dpi), dpi=dpi, facecolor='black')
+        ax = fig.add_subplot(111)
 
-    try:
-        bg_img = mpimg.imread(args.bg)
-        full_height, full_width = bg_img.shape[:2]
-    except FileNotFoundError:
-        print(f"Background image not found: {args.bg}")
-        print("Using solid black background instead")
-        bg_img = None
-        full_height, full_width = 1800, 3600
+    bg_img = load_background(args.bg)
+    draw_background(ax, bg_img, args.view_lon_min, args.view_lon_max, args.ymin, args.ymax)
 
-    view_lon_min = args.view_lon_min
-    view_lon_max = args.view_lon_max
-    view_lat_min = args.ymin
-    view_lat_max = args.ymax
-    center_lon_view = (view_lon_min + view_lon_max) / 2
-
-    if bg_img is not None:
-        print("Tiling background...")
-        base_lon_min = -180
-        base_lon_max = 180
-        base_lon_span = base_lon_max - base_lon_min # 360
-
-        start_tile_index = math.floor((view_lon_min - base_lon_max) / base_lon_span)
-        end_tile_index = math.ceil((view_lon_max - base_lon_min) / base_lon_span)
-
-        for i in range(start_tile_index, end_tile_index + 1):
-            tile_lon_min = base_lon_min + i * base_lon_span
-            tile_lon_max = base_lon_max + i * base_lon_span
-            
-            img_x_min = 0
-            img_x_max = full_width
-            img_y_min = (90 - view_lat_max) * (full_height / 180.0)
-            img_y_max = (90 - view_lat_min) * (full_height / 180.0)
-
-            img_y_min = max(0, int(img_y_min))
-            img_y_max = min(full_height, int(img_y_max))
-            
-            if img_y_min >= img_y_max: continue
-
-            cropped_bg = bg_img[img_y_min:img_y_max, img_x_min:img_x_max]
-            
-            ax.imshow(cropped_bg, 
-                      extent=[tile_lon_min, tile_lon_max, view_lat_min, view_lat_max], 
-                      interpolation='lanczos', aspect='auto')
+    ax.set_xlim(args.view_lon_min, args.view_lon_max)
+    ax.set_ylim(args.ymin, args.ymax)
+
+    if not fixed:
+        ax.set_aspect('equal', adjustable='box')
+    ax.set_axis_off()
+
+    if hasattr(args, 'show_legend') and args.show_legend:
+        draw_legend(ax, "SPEED" if getattr(args, 'colorby', 'wind') == 'speed' else args.scale)
+
+    return fig, ax, width, lon_span
+
+def adjust_positions(storm, args, center_lon_view):
+    """Returns the storm's drawable positions shifted into the view's longitudes."""
+    adjusted_positions = []
+    for pos in storm["positions"]:
+        if args.noextra and pos.get("type") == "EXTRATROPICAL":
+            continue
+        adj_pos = pos.copy()
+        adj_pos["lon"] = adjust_longitude_for_view(pos["lon"], center_lon_view)
+        adjusted_positions.append(adj_pos)
+    return adjusted_positions
+
+def get_marker_style(pos, dot_area):
+    if pos.get("type") == "SUBTROPICAL":
+        return 's', dot_area * 0.60
+    elif pos.get("type") == "EXTRATROPICAL":
+        return '^', dot_area * 0.70
     else:
-        ax.set_facecolor('black')
+        return 'o', dot_area
+
+def draw_storm_name(ax, storm, label_pos, view_lat_min, view_lat_max, **kwargs):
+    offset_y = (view_lat_max - view_lat_min) * 0.05
+    label_text = ax.text(label_pos["lon"], label_pos["lat"] - offset_y,
+                       storm["name"],
+                       color='white', fontsize=8, fontweight='bold',
+                       ha='center', va='top', zorder=30, **kwargs)
+    label_text.set_path_effects([
+        path_effects.Stroke(linewidth=2, foreground='black'),
+        path_effects.Normal()
+    ])
+    return label_text
+
+def draw_storm_track(ax, adjusted_positions, args, line_width, dot_area, deg_per_px=None):
+    """Draws one storm's track line and intensity dots.
+
+    With --lod and the map's degrees per pixel, the line is simplified to
+    half a pixel and dots hidden under an identical dot are skipped.
+    """
+    lod = getattr(args, 'lod', False) and deg_per_px
+    if len(adjusted_positions) > 1:
+        lons = [pos["lon"] for pos in adjusted_positions]
+        lats = [pos["lat"] for pos in adjusted_positions]
+        if lod:
+            keep = simplify_track(lons, lats, deg_per_px / 2)
+            lons = [lons[i] for i in keep]
+            lats = [lats[i] for i in keep]
+        ax.plot(lons, lats, color=(1, 1, 1, args.alpha), linewidth=line_width, zorder=10)
+
+    lons = []
+    lats = []
+    colors = []
+    sizes = []
+    markers = []
+    for pos in adjusted_positions:
+        lons.append(pos["lon"])
+        lats.append(pos["lat"])
+        r, g, b = get_point_color(pos, args)
+        colors.append((r, g, b, args.alpha))
+        marker, size = get_marker_style(pos, dot_area)
+        markers.append(marker)
+        sizes.append(size)
+
+    if lod:
+        radius = math.sqrt(dot_area / math.pi) * ax.figure.dpi / 72 * deg_per_px
+        keep = thin_dots(lons, lats, list(zip(colors, markers)), radius)
+        lons, lats, colors, markers, sizes = ([values[i] for i in keep] for values in (lons, lats, colors, markers, sizes))
+
+    for marker in set(markers):
+        idxs = [i for i, m in enumerate(markers) if m == marker]
+        marker_lons = [lons[i] for i in idxs]
+        marker_lats = [lats[i] for i in idxs]
+        marker_colors = [colors[i] for i in idxs]
+        marker_sizes = [sizes[i] for i in idxs]
+        ax.scatter(marker_lons, marker_lats, c=marker_colors, s=marker_sizes,
+                   marker=marker, zorder=20, edgecolor='none', linewidths=0)
 
-    def calculate_line_width(lines_param, width, lon_span):
-        return max(1, lines_param / max(1e-6, lon_span) * width)
+def generate_track_map(storms, args):
+    if getattr(args, 'backend', 'matplotlib') == 'numpy':
+        from raster import generate_track_map_raster
+        generate_track_map_raster(storms, args)
+        return
+    if getattr(args, 'strips', 0):
+        from strips import generate_track_map_strips
+        generate_track_map_strips(storms, args)
+        return
 
-    line_width = calculate_line_width(args.lines, width, lon_span)
+    with stage("background"):
+        fig, ax, width, lon_span = setup_map_figure(args)
 
-    def calculate_dot_area(dots_param, width, lon_span, scale=1.8):
-        diameter = scale * dots_param / max(1e-6, lon_span) * width
-        area = (diameter / 2) ** 2 * math.pi
-        return max(10, area)
+    view_lat_min = args.ymin
+    view_lat_max = args.ymax
+    center_lon_view = (args.view_lon_min + args.view_lon_max) / 2
 
+    line_width = calculate_line_width(args.lines, width, lon_span)
     dot_area = calculate_dot_area(args.dots, width, lon_span)
 
-    for storm in storms:
-        adjusted_positions = []
-        for pos in storm["positions"]:
-            if args.noextra and pos.get("type") == "EXTRATROPICAL":
-                continue
-            adj_pos = pos.copy()
-            adj_pos["lon"] = adjust_longitude_for_view(pos["lon"], center_lon_view)
-            adjusted_positions.append(adj_pos)
-
-        if not adjusted_positions: continue
-
-        if hasattr(args, 'show_names') and args.show_names:
-            label_pos = adjusted_positions[0]
-            offset_y = (view_lat_max - view_lat_min) * 0.05
-            label_text = ax.text(label_pos["lon"], label_pos["lat"] - offset_y,
-                               storm["name"],
-                               color='white', fontsize=8, fontweight='bold',
-                               ha='center', va='top', zorder=30)
-            label_text.set_path_effects([
-                path_effects.Stroke(linewidth=2, foreground='black'),
-                path_effects.Normal()
-            ])
-
-        if len(adjusted_positions) > 1:
-            lons = [pos["lon"] for pos in adjusted_positions]
-            lats = [pos["lat"] for pos in adjusted_positions]
-            ax.plot(lons, lats, color=(1, 1, 1, args.alpha), linewidth=line_width, zorder=10)
-
-        lons = []
-        lats = []
-        colors = []
-        sizes = []
-        markers = []
-        for pos in adjusted_positions:
-            lons.append(pos["lon"])
-            lats.append(pos["lat"])
-            r, g, b = get_color_from_wind(pos["wind"], args.scale)
-            colors.append((r, g, b, args.alpha))
-            if pos.get("type") == "SUBTROPICAL":
-                markers.append('s')
-                sizes.append(dot_area * 0.60)
-            elif pos.get("type") == "EXTRATROPICAL":
-                markers.append('^')
-                sizes.append(dot_area * 0.70)
-            else:
-                markers.append('o')
-                sizes.append(dot_area)
-
-        for marker in set(markers):
-            idxs = [i for i, m in enumerate(markers) if m == marker]
-            marker_lons = [lons[i] for i in idxs]
-            marker_lats = [lats[i] for i in idxs]
-            marker_colors = [colors[i] for i in idxs]
-            marker_sizes = [sizes[i] for i in idxs]
-            ax.scatter(marker_lons, marker_lats, c=marker_colors, s=marker_sizes,
-                       marker=marker, zorder=20, edgecolor='none', linewidths=0)
-
-    ax.set_xlim(view_lon_min, view_lon_max)
-    ax.set_ylim(view_lat_min, view_lat_max)
-
-    ax.set_aspect('equal', adjustable='box')
-    ax.set_axis_off()
+    with stage("draw"):
+        adjusted_storms = [(storm, adjust_positions(storm, args, center_lon_view)) for storm in storms]
+
+        if getattr(args, 'swath', False):
+            from swath import compute_swath, draw_swath
+            extent = [args.view_lon_min, args.view_lon_max, view_lat_min, view_lat_max]
+            levels = compute_swath([positions for storm, positions in adjusted_storms], extent, args.swathres)
+            draw_swath(ax, levels, extent)
+
+        for storm, adjusted_positions in adjusted_storms:
+            if not adjusted_positions: continue
+
+            if hasattr(args, 'show_names') and args.show_names:
+                draw_storm_name(ax, storm, adjusted_positions[0], view_lat_min, view_lat_max)
+
+            draw_storm_track(ax, adjusted_positions, args, line_width, dot_area, lon_span / width)
+    count_artists(ax)
 
-    if hasattr(args, 'show_legend') and args.show_legend:
-        legend_entries = []
-        legend_labels = []
-        
-        if args.scale == "SSHWS":
-            categories = [
-                ((0.75, 0.75, 0.75), "Depression"),
-                ((0, 0, 1), "Storm"),
-                ((0, 1, 1), "Category 1"),
-                ((0, 1, 0), "Category 2"),
-                ((1, 1, 0), "Category 3"),
-                ((1, 0.5, 0), "Category 4"),
-                ((1, 0, 0), "Category 5")
-            ]
-        elif args.scale == "AUS":
-            categories = []
-            for entry in AUS_ENTRIES:
-                categories.append((entry.value, entry.name))
-        elif args.scale == "IMD":
-            categories = []
-            for entry in IMD_ENTRIES:
-                categories.append((entry.value, entry.name))
-        elif args.scale == "JMA":
-            categories = []
-            for entry in JMA_ENTRIES:
-                categories.append((entry.value, entry.name))
-        elif args.scale == "MFR":
-            categories = []
-            for entry in MFR_ENTRIES:
-                categories.append((entry.value, entry.name))
-        elif args.scale == "JMADOM":
-            categories = []
-            for entry in JMADOM_ENTRIES:
-                categories.append((entry.value, entry.name))
-        
-        for color, label in categories:
-            legend_entries.append(plt.Line2D([0], [0], marker='o', color='w', 
-                                          markerfacecolor=color, markersize=8, 
-                                          linewidth=0))
-            legend_labels.append(label)
-        
-        legend = ax.legend(legend_entries, legend_labels, loc='lower left', 
-                         frameon=True, facecolor='black', framealpha=0.7, 
-                         fontsize=8)
-        
-        for text in legend.get_texts():
-            text.set_color('white')
-    
     try:
         os.makedirs(os.path.dirname(args.output), exist_ok=True)
-        plt.savefig(args.output, bbox_inches='tight', pad_inches=0, dpi=dpi)
+        with stage("save"):
+            save_track_map(fig, args.output, args)
         plt.close(fig)
         print(f"Map generated and saved to {args.output}")
     except Exception as e:
         print(f"Error saving image: {str(e)}")
         # fallback to saving in the current directory
         fallback_path = os.path.join(os.getcwd(), "track_map_fallback.png")
-        plt.savefig(fallback_path, bbox_inches='tight', pad_inches=0, dpi=dpi)
+        save_track_map(fig, fallback_path, args)
         plt.close(fig)
         print(f"Map saved to fallback location: {fallback_path}")
 
+def save_track_map(fig, path, args):
+    """Saves a track map with the --layout, --encoding and --compress options."""
+    encoding = getattr(args, 'encoding', 'png')
+    level = getattr(args, 'compress', 6)
+    if getattr(args, 'layout', 'tight') == 'fixed':
+        save_figure(fig, path, encoding, level)
+    elif encoding == 'palette':
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', bbox_inches='tight', pad_inches=0, dpi=fig.dpi, pil_kwargs={'compress_level': 0})
+        write_png(path, np.asarray(Image.open(buf).convert('RGB')), encoding, level)
+    else:
+        fig.savefig(path, bbox_inches='tight', pad_inches=0, dpi=fig.dpi, pil_kwargs={'compress_level': level})
+
 def get_pos(pos, img_size, args):
     if None in [args.xmin, args.xmax, args.ymin, args.ymax]:
         xmin = args.xmin if args.xmin is not None else -180
@@ -467,28 +861,46 @@ def get_pos(pos, img_size, args):
 
 def main():
     args = parse_args()
-    
+    if args.profile or args.profilehook:
+        start_profile("track")
+    try:
+        run(args)
+    finally:
+        finish_profile(args)
+
+def run(args):
     if not args.input:
         print("Input file not specified; please specify --input.")
         return
     
-    if not args.format:
-        if args.input.endswith('.txt'):
-            print("Format not specified; assuming hurdat format.")
-            args.format = "hurdat"
-        else:
-            print("Jinkies. No format specified; please specify --format.")
-            return
-    
-    print(f"Reading storm data from {args.input}...")
+    print(f"Reading storm data from {', '.join(args.input)}...")
     storms = read_storm_data(args)
     
     if not storms:
         print("No storms found after filtering. Please check your filters.")
         return
     
+    if args.animate:
+        from animate import generate_track_animation
+        print(f"Generating track animation for {len(storms)} storms...")
+        with stage("render"):
+            generate_track_animation(storms, args)
+        return
+
     print(f"Generating track map for {len(storms)} storms...")
-    generate_track_map(storms, args)
+    if args.cache:
+        from render_cache import RenderCache, cached_generate_track_map
+        cache = RenderCache(args.cache, args.cachesize * 1024 * 1024, link=args.cachelink)
+        with stage("render"):
+            cached_generate_track_map(storms, args, cache)
+        hits, misses = cache.hits, cache.misses
+        count("cache_hits", hits)
+        count("cache_misses", misses)
+        stats = cache.save_stats()
+        print(f"Render cache: {hits} hit(s), {misses} miss(es) this run; {stats['hits']} hit(s), {stats['misses']} miss(es) in total")
+    else:
+        with stage("render"):
+            generate_track_map(storms, args)
     print("Track map generated successfully.")
 
 if __name__ == "__main__":